@@ -0,0 +1,9 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def thumbnails_in_request_thread(settings):
+    """Миниатюры создаются в потоке запроса, а не в фоновом пуле: иначе
+    пул дописывает файлы во временный MEDIA_ROOT, пока тест его удаляет,
+    и ходит в базу, которую тест уже очищает."""
+    settings.THUMBNAIL_WORKERS = 0
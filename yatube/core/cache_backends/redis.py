@@ -0,0 +1,291 @@
+import pickle
+import socket
+import threading
+import time
+from urllib.parse import urlparse
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from .stats import CacheStatsMixin
+
+
+class RedisError(Exception):
+    pass
+
+
+class NotSentError(ConnectionError):
+    """Команда не ушла на сервер: её можно безопасно повторить."""
+
+
+# INCRBY только для существующего ключа — одной командой, атомарно
+INCR_EXISTING = (
+    'if redis.call("EXISTS", KEYS[1]) == 1 then '
+    'return redis.call("INCRBY", KEYS[1], ARGV[1]) end '
+    "return false"
+)
+
+
+def encode_command(*args):
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if isinstance(arg, str):
+            arg = arg.encode()
+        elif isinstance(arg, int):
+            arg = str(arg).encode()
+        parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+    return b"".join(parts)
+
+
+class RedisConnection:
+    """Минимальный клиент протокола RESP2 поверх одного сокета."""
+
+    def __init__(self, host, port, db=0, timeout=5):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.reader = self.sock.makefile("rb")
+        if db:
+            self.execute("SELECT", db)
+
+    def close(self):
+        self.reader.close()
+        self.sock.close()
+
+    def read_reply(self):
+        line = self.reader.readline()
+        if not line:
+            raise ConnectionError("Соединение с Redis закрыто")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b"+":
+            return payload.decode()
+        if kind == b"-":
+            raise RedisError(payload.decode())
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            if length == -1:
+                return None
+            data = self.reader.read(length + 2)
+            return data[:-2]
+        if kind == b"*":
+            length = int(payload)
+            if length == -1:
+                return None
+            return [self.read_reply() for _ in range(length)]
+        raise RedisError(f"Неизвестный ответ: {line!r}")
+
+    def send(self, data):
+        try:
+            self.sock.sendall(data)
+        except OSError as error:
+            raise NotSentError(str(error)) from error
+
+    def execute(self, *args):
+        self.send(encode_command(*args))
+        return self.read_reply()
+
+    def pipeline(self, commands):
+        """Отправляет команды одним пакетом и читает все ответы. Ошибка
+        одной команды поднимается только после того, как прочитаны
+        ответы остальных, — иначе они достались бы следующим запросам."""
+        self.send(b"".join(encode_command(*cmd) for cmd in commands))
+        replies = []
+        errors = []
+        for _ in commands:
+            try:
+                replies.append(self.read_reply())
+            except RedisError as error:
+                errors.append(error)
+                replies.append(error)
+        if errors:
+            raise errors[0]
+        return replies
+
+
+class BaseRedisCache(BaseCache):
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        url = urlparse(location)
+        self._host = url.hostname or "127.0.0.1"
+        self._port = url.port or 6379
+        self._db = int(url.path.lstrip("/") or 0)
+        self._socket_timeout = params.get("OPTIONS", {}).get(
+            "SOCKET_TIMEOUT", 5
+        )
+        self._connections = threading.local()
+
+    @property
+    def _client(self):
+        client = getattr(self._connections, "client", None)
+        if client is None:
+            client = RedisConnection(
+                self._host, self._port, self._db, self._socket_timeout
+            )
+            self._connections.client = client
+        return client
+
+    def _call(self, method, args, idempotent):
+        try:
+            return method(self._client, *args)
+        except RedisError:
+            # ответ с ошибкой прочитан целиком, соединение исправно
+            raise
+        except Exception as error:
+            # ответ мог остаться недочитанным: в таком соединении он
+            # достался бы следующей команде
+            self._drop_client()
+            # повторяем, только если команда точно не выполнена или её
+            # можно выполнить дважды, а сервер закрыл простаивавшее
+            # соединение; после тайм-аута не повторяем никогда
+            retry = isinstance(error, NotSentError) or (
+                idempotent and isinstance(error, ConnectionError)
+            )
+            if not retry:
+                raise
+        return method(self._client, *args)
+
+    def _execute(self, *args, idempotent=True):
+        return self._call(RedisConnection.execute, args, idempotent)
+
+    def _pipeline(self, commands):
+        # конвейер только из SET: их можно повторить
+        return self._call(RedisConnection.pipeline, [commands], True)
+
+    def _drop_client(self):
+        client = getattr(self._connections, "client", None)
+        if client is not None:
+            try:
+                client.close()
+            except OSError:
+                pass
+        self._connections.client = None
+
+    # целые числа храним как есть, чтобы работал INCRBY
+    def _dump(self, value):
+        if isinstance(value, int) and not isinstance(value, bool):
+            return str(value).encode()
+        return pickle.dumps(value, self.pickle_protocol)
+
+    def _load(self, value):
+        try:
+            return int(value)
+        except ValueError:
+            return pickle.loads(value)
+
+    def _expiry_args(self, timeout):
+        timeout = self.get_backend_timeout(timeout)
+        if timeout is None:
+            return []
+        milliseconds = max(int((timeout - time.time()) * 1000), 1)
+        return ["PX", milliseconds]
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        if timeout == 0:
+            return False
+        reply = self._execute(
+            "SET", key, self._dump(value), *self._expiry_args(timeout), "NX"
+        )
+        return reply == "OK"
+
+    def get(self, key, default=None, version=None):
+        value = self._execute("GET", self._key(key, version))
+        if value is None:
+            return default
+        return self._load(value)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        if timeout == 0:
+            self._execute("DEL", key)
+            return
+        self._execute(
+            "SET", key, self._dump(value), *self._expiry_args(timeout)
+        )
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        if timeout is None:
+            self._execute("PERSIST", key)
+            return bool(self._execute("EXISTS", key))
+        if timeout == 0:
+            return bool(self._execute("DEL", key))
+        _, milliseconds = self._expiry_args(timeout)
+        return bool(self._execute("PEXPIRE", key, milliseconds))
+
+    def delete(self, key, version=None):
+        self._execute("DEL", self._key(key, version))
+
+    def has_key(self, key, version=None):
+        return bool(self._execute("EXISTS", self._key(key, version)))
+
+    def get_many(self, keys, version=None):
+        keys = {self._key(key, version): key for key in keys}
+        if not keys:
+            return {}
+        values = self._execute("MGET", *keys)
+        return {
+            keys[key]: self._load(value)
+            for key, value in zip(keys, values)
+            if value is not None
+        }
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        if not data:
+            return []
+        if timeout == 0:
+            self.delete_many(data, version=version)
+            return []
+        expiry = self._expiry_args(timeout)
+        self._pipeline(
+            [
+                ("SET", self._key(key, version), self._dump(value), *expiry)
+                for key, value in data.items()
+            ]
+        )
+        return []
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        if keys:
+            self._execute("DEL", *keys)
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        value = self._execute(
+            "EVAL", INCR_EXISTING, 1, key, delta, idempotent=False
+        )
+        if value is None:
+            raise ValueError("Key '%s' not found" % key)
+        return value
+
+    def clear(self):
+        """Очищает только ключи своего пространства имён (KEY_PREFIX)."""
+        if not self.key_prefix:
+            self._execute("FLUSHDB")
+            return
+        cursor = b"0"
+        pattern = self.key_prefix.replace("*", r"\*") + ":*"
+        while True:
+            cursor, keys = self._execute(
+                "SCAN", cursor, "MATCH", pattern, "COUNT", 1000
+            )
+            if keys:
+                self._execute("DEL", *keys)
+            if cursor in (b"0", 0):
+                break
+
+    def close(self, **kwargs):
+        # соединение живёт вместе с потоком, а не с запросом
+        pass
+
+
+class RedisCache(CacheStatsMixin, BaseRedisCache):
+    """Кэш в Redis (или любом сервере с протоколом RESP).
+    LOCATION — адрес вида redis://host:port/db."""
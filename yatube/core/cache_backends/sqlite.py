@@ -0,0 +1,236 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from .stats import CacheStatsMixin
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires REAL
+)
+"""
+# не больше 999 параметров в одном запросе SQLite
+CHUNK_SIZE = 500
+
+
+def _chunks(items):
+    for start in range(0, len(items), CHUNK_SIZE):
+        stop = start + CHUNK_SIZE
+        yield items[start:stop]
+
+
+class BaseSQLiteCache(BaseCache):
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+    cull_every = 100
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = location
+        self._connections = threading.local()
+        self._writes = 0
+
+    @property
+    def _db(self):
+        db = getattr(self._connections, "db", None)
+        if db is None:
+            directory = os.path.dirname(self._path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            db = sqlite3.connect(self._path, timeout=30, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute(SCHEMA)
+            self._connections.db = db
+        return db
+
+    def _expires(self, timeout):
+        return self.get_backend_timeout(timeout)
+
+    def _load(self, value):
+        return pickle.loads(value)
+
+    def _dump(self, value):
+        return sqlite3.Binary(pickle.dumps(value, self.pickle_protocol))
+
+    def _write(self, sql, params):
+        db = self._db
+        with db:
+            db.execute("BEGIN IMMEDIATE")
+            cursor = db.execute(sql, params)
+        self._maybe_cull()
+        return cursor.rowcount
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return bool(
+            self._write(
+                "INSERT INTO cache (key, value, expires) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value, "
+                "expires = excluded.expires "
+                "WHERE cache.expires IS NOT NULL AND cache.expires <= ?",
+                (key, self._dump(value), self._expires(timeout), time.time()),
+            )
+        )
+
+    def get(self, key, default=None, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        row = self._db.execute(
+            "SELECT value FROM cache WHERE key = ? "
+            "AND (expires IS NULL OR expires > ?)",
+            (key, time.time()),
+        ).fetchone()
+        if row is None:
+            return default
+        return self._load(row[0])
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        self._write(
+            "INSERT OR REPLACE INTO cache (key, value, expires) "
+            "VALUES (?, ?, ?)",
+            (key, self._dump(value), self._expires(timeout)),
+        )
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return bool(
+            self._write(
+                "UPDATE cache SET expires = ? WHERE key = ? "
+                "AND (expires IS NULL OR expires > ?)",
+                (self._expires(timeout), key, time.time()),
+            )
+        )
+
+    def delete(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        self._write("DELETE FROM cache WHERE key = ?", (key,))
+
+    def has_key(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        row = self._db.execute(
+            "SELECT 1 FROM cache WHERE key = ? "
+            "AND (expires IS NULL OR expires > ?)",
+            (key, time.time()),
+        ).fetchone()
+        return row is not None
+
+    def get_many(self, keys, version=None):
+        keys = {self.make_key(key, version=version): key for key in keys}
+        for key in keys:
+            self.validate_key(key)
+        found = {}
+        now = time.time()
+        for chunk in _chunks(list(keys)):
+            placeholders = ", ".join("?" * len(chunk))
+            rows = self._db.execute(
+                f"SELECT key, value FROM cache WHERE key IN ({placeholders}) "
+                "AND (expires IS NULL OR expires > ?)",
+                (*chunk, now),
+            )
+            for key, value in rows:
+                found[keys[key]] = self._load(value)
+        return found
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self._expires(timeout)
+        rows = []
+        for key, value in data.items():
+            key = self.make_key(key, version=version)
+            self.validate_key(key)
+            rows.append((key, self._dump(value), expires))
+        db = self._db
+        with db:
+            db.execute("BEGIN IMMEDIATE")
+            db.executemany(
+                "INSERT OR REPLACE INTO cache (key, value, expires) "
+                "VALUES (?, ?, ?)",
+                rows,
+            )
+        self._maybe_cull()
+        return []
+
+    def delete_many(self, keys, version=None):
+        keys = [self.make_key(key, version=version) for key in keys]
+        for key in keys:
+            self.validate_key(key)
+        db = self._db
+        with db:
+            db.execute("BEGIN IMMEDIATE")
+            for chunk in _chunks(keys):
+                placeholders = ", ".join("?" * len(chunk))
+                db.execute(
+                    f"DELETE FROM cache WHERE key IN ({placeholders})", chunk
+                )
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        db = self._db
+        with db:
+            db.execute("BEGIN IMMEDIATE")
+            row = db.execute(
+                "SELECT value FROM cache WHERE key = ? "
+                "AND (expires IS NULL OR expires > ?)",
+                (key, time.time()),
+            ).fetchone()
+            if row is None:
+                raise ValueError("Key '%s' not found" % key)
+            value = self._load(row[0]) + delta
+            db.execute(
+                "UPDATE cache SET value = ? WHERE key = ?",
+                (self._dump(value), key),
+            )
+        return value
+
+    def clear(self):
+        """Очищает только ключи своего пространства имён (KEY_PREFIX)."""
+        db = self._db
+        with db:
+            db.execute("BEGIN IMMEDIATE")
+            if self.key_prefix:
+                db.execute(
+                    "DELETE FROM cache WHERE substr(key, 1, ?) = ?",
+                    (len(self.key_prefix) + 1, self.key_prefix + ":"),
+                )
+            else:
+                db.execute("DELETE FROM cache")
+
+    def close(self, **kwargs):
+        # соединение живёт вместе с потоком, а не с запросом
+        pass
+
+    def _maybe_cull(self):
+        self._writes += 1
+        if self._writes % self.cull_every:
+            return
+        db = self._db
+        with db:
+            db.execute("BEGIN IMMEDIATE")
+            db.execute(
+                "DELETE FROM cache WHERE expires IS NOT NULL AND expires <= ?",
+                (time.time(),),
+            )
+            (count,) = db.execute("SELECT COUNT(*) FROM cache").fetchone()
+            if count > self._max_entries:
+                db.execute(
+                    "DELETE FROM cache WHERE key IN (SELECT key FROM cache "
+                    "ORDER BY expires IS NULL, expires LIMIT ?)",
+                    (count // self._cull_frequency or 1,),
+                )
+
+
+class SQLiteCache(CacheStatsMixin, BaseSQLiteCache):
+    """Кэш в файле SQLite: общий для всех процессов-воркеров на одном
+    сервере. LOCATION — путь к файлу базы."""
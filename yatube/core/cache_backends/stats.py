@@ -0,0 +1,82 @@
+import threading
+from contextlib import contextmanager
+
+from django.core.cache.backends import filebased, locmem
+
+from .. import metrics
+
+_missing = object()
+# Django создаёт объект кэша на каждый поток, поэтому счётчики общие
+# для всех объектов с одинаковым бэкендом, адресом и пространством имён.
+_counters = {}
+_counters_lock = threading.Lock()
+
+
+class CacheCounters:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+
+class CacheStatsMixin:
+    """Считает попадания и промахи get()/get_many() в пределах процесса."""
+
+    def __init__(self, location, params):
+        super().__init__(location, params)
+        name = (type(self).__name__, location, self.key_prefix)
+        with _counters_lock:
+            self._counters = _counters.setdefault(name, CacheCounters())
+        self._local = threading.local()
+
+    def _count(self, hits, misses):
+        if getattr(self._local, "depth", 0):
+            return
+        metrics.count_cache(hits, misses)
+        with self._counters.lock:
+            self._counters.hits += hits
+            self._counters.misses += misses
+
+    @contextmanager
+    def _not_counted(self):
+        self._local.depth = getattr(self._local, "depth", 0) + 1
+        try:
+            yield
+        finally:
+            self._local.depth -= 1
+
+    def get(self, key, default=None, version=None):
+        with self._not_counted():
+            value = super().get(key, _missing, version=version)
+        if value is _missing:
+            self._count(0, 1)
+            return default
+        self._count(1, 0)
+        return value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        with self._not_counted():
+            found = super().get_many(keys, version=version)
+        self._count(len(found), len(keys) - len(found))
+        return found
+
+    def stats(self):
+        with self._counters.lock:
+            return {
+                "hits": self._counters.hits,
+                "misses": self._counters.misses,
+            }
+
+    def reset_stats(self):
+        with self._counters.lock:
+            self._counters.hits = 0
+            self._counters.misses = 0
+
+
+class LocMemCache(CacheStatsMixin, locmem.LocMemCache):
+    pass
+
+
+class FileBasedCache(CacheStatsMixin, filebased.FileBasedCache):
+    pass
@@ -0,0 +1,9 @@
+from django.conf import settings
+
+
+def ttl(request):
+    """Добавляет время жизни кэша лент и карточек постов."""
+    return {
+        'feed_ttl': settings.SECONDS_TO_CACHE_FEED,
+        'post_card_ttl': settings.SECONDS_TO_CACHE_POST_CARD,
+    }
@@ -0,0 +1,77 @@
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core import slow_queries
+
+
+class Command(BaseCommand):
+    help = (
+        "Сводка журнала медленных SQL-запросов по отпечаткам: сколько раз, "
+        "сколько времени в сумме, из каких представлений, план"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--log",
+            default=None,
+            help="Файл журнала (по умолчанию SLOW_QUERY_LOG_FILE)",
+        )
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=20,
+            help="Сколько самых затратных запросов показать",
+        )
+        parser.add_argument(
+            "--json", action="store_true", help="Вывести сводку в JSON"
+        )
+        parser.add_argument(
+            "--clear",
+            action="store_true",
+            help="Очистить журнал после вывода сводки",
+        )
+
+    def handle(self, *args, **options):
+        path = options["log"] or settings.SLOW_QUERY_LOG_FILE
+        if not path:
+            raise CommandError(
+                "Журнал не задан: укажите --log или "
+                "YATUBE_SLOW_QUERY_LOG_FILE"
+            )
+        if not os.path.exists(path):
+            self.stdout.write("Медленных запросов не было")
+            return
+        summary = slow_queries.aggregate(slow_queries.read(path))
+        summary = summary[: options["limit"]]
+        if options["json"]:
+            self.stdout.write(
+                json.dumps(summary, ensure_ascii=False, indent=2)
+            )
+        else:
+            for item in summary:
+                self.write_item(item)
+        if options["clear"]:
+            os.remove(path)
+
+    def write_item(self, item):
+        views = ", ".join(
+            f"{view} ×{count}"
+            for view, count in sorted(
+                item["views"].items(), key=lambda view: -view[1]
+            )
+        )
+        self.stdout.write(
+            self.style.SQL_KEYWORD(
+                f"{item['total_ms']:.1f} мс всего, {item['count']} раз, "
+                f"в среднем {item['mean_ms']:.1f} мс, "
+                f"максимум {item['max_ms']:.1f} мс"
+            )
+        )
+        self.stdout.write(f"  представления: {views}")
+        self.stdout.write(f"  {item['fingerprint']}")
+        for line in item["plan"] or []:
+            self.stdout.write(f"    {line}")
+        self.stdout.write("")
@@ -0,0 +1,271 @@
+"""Метрики запросов: время ответа, SQL, шаблоны и кэш по каждому
+представлению.
+
+Замеры текущего запроса копятся в Sample, который живёт в
+thread-local, пока запрос обрабатывается (core.middleware). В конце
+запроса Sample сливается в гистограммы Registry одним захватом
+блокировки. Гистограммы свои у каждого процесса: Prometheus собирает их
+с каждого воркера отдельно."""
+
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+
+# верхние границы корзин гистограмм, как в клиентах Prometheus
+TIME_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)  # fmt: skip
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+HISTOGRAMS = {
+    "request_duration_seconds": ("Время обработки запроса", TIME_BUCKETS),
+    "db_duration_seconds": ("Время SQL-запросов за запрос", TIME_BUCKETS),
+    "db_queries": ("Число SQL-запросов за запрос", COUNT_BUCKETS),
+    "template_duration_seconds": (
+        "Время отрисовки шаблонов за запрос",
+        TIME_BUCKETS,
+    ),
+}
+COUNTERS = {
+    "cache_hits_total": "Попадания в кэш",
+    "cache_misses_total": "Промахи кэша",
+}
+# счётчики по шаблонам, только при TEMPLATE_PROFILING
+TEMPLATE_COUNTERS = {
+    "template_renders_total": "Отрисовки шаблона",
+    "template_seconds_total": "Время отрисовки шаблона вместе с вложенными",
+    "template_self_seconds_total": "Время отрисовки шаблона без вложенных",
+}
+PREFIX = "yatube_"
+
+_local = threading.local()
+
+
+class Sample:
+    """Замеры одного запроса."""
+
+    __slots__ = (
+        "started",
+        "db_time",
+        "db_queries",
+        "template_time",
+        "template_depth",
+        "cache_hits",
+        "cache_misses",
+        "templates",
+    )
+
+    def __init__(self, profile_templates=False):
+        self.started = time.perf_counter()
+        self.db_time = 0.0
+        self.db_queries = 0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.templates = TemplateProfile() if profile_templates else None
+
+    def time_query(self, execute, sql, params, many, context):
+        """Обёртка для connection.execute_wrapper."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.db_queries += 1
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+
+def start(profile_templates=False):
+    _local.sample = Sample(profile_templates)
+    return _local.sample
+
+
+def stop():
+    _local.sample = None
+
+
+def current():
+    return getattr(_local, "sample", None)
+
+
+def count_cache(hits, misses):
+    sample = current()
+    if sample is not None:
+        sample.cache_hits += hits
+        sample.cache_misses += misses
+
+
+class timed_template:
+    """Засекает отрисовку шаблона. Вложенные шаблоны уже входят во
+    время внешнего и не складываются второй раз."""
+
+    def __enter__(self):
+        self.sample = current()
+        if self.sample is not None:
+            self.sample.template_depth += 1
+            self.started = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        sample = self.sample
+        if sample is not None:
+            sample.template_depth -= 1
+            if not sample.template_depth:
+                sample.template_time += time.perf_counter() - self.started
+
+
+class TemplateProfile:
+    """Время отрисовки по именам шаблонов, включая подключённые через
+    {% include %} и {% extends %}. Для каждого шаблона считается время
+    вместе с вложенными шаблонами и собственное — без них."""
+
+    def __init__(self):
+        # имя шаблона: [отрисовок, всего секунд, собственных секунд]
+        self.stats = {}
+        # время вложенных шаблонов для каждого открытого уровня
+        self._children = []
+
+    def measure(self, name, render, *args):
+        self._children.append(0.0)
+        started = time.perf_counter()
+        try:
+            return render(*args)
+        finally:
+            elapsed = time.perf_counter() - started
+            children = self._children.pop()
+            if self._children:
+                self._children[-1] += elapsed
+            stats = self.stats.setdefault(name, [0, 0.0, 0.0])
+            stats[0] += 1
+            stats[1] += elapsed
+            stats[2] += elapsed - children
+
+    def slowest(self, limit):
+        """(имя, отрисовок, всего, собственное) по убыванию собственного
+        времени."""
+        items = [(name, *stats) for name, stats in self.stats.items()]
+        items.sort(key=lambda item: -item[3])
+        return items[:limit]
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        # последняя корзина — +Inf
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+def _label(value):
+    return value.replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n")
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            # (метрика, представление): Histogram или число
+            self.histograms = {}
+            self.counters = defaultdict(int)
+            # (метрика, представление, шаблон): число
+            self.template_counters = defaultdict(int)
+
+    def _observe(self, name, view, value):
+        histogram = self.histograms.get((name, view))
+        if histogram is None:
+            histogram = Histogram(HISTOGRAMS[name][1])
+            self.histograms[name, view] = histogram
+        histogram.observe(value)
+
+    def record(self, view, sample, duration):
+        with self.lock:
+            self._observe("request_duration_seconds", view, duration)
+            self._observe("db_duration_seconds", view, sample.db_time)
+            self._observe("db_queries", view, sample.db_queries)
+            self._observe(
+                "template_duration_seconds", view, sample.template_time
+            )
+            self.counters["cache_hits_total", view] += sample.cache_hits
+            self.counters["cache_misses_total", view] += sample.cache_misses
+            if sample.templates is not None:
+                self._count_templates(view, sample.templates)
+
+    def _count_templates(self, view, profile):
+        counters = self.template_counters
+        for name, (renders, total, own) in profile.stats.items():
+            counters["template_renders_total", view, name] += renders
+            counters["template_seconds_total", view, name] += total
+            counters["template_self_seconds_total", view, name] += own
+
+    def render(self):
+        """Метрики в текстовом формате Prometheus 0.0.4."""
+        with self.lock:
+            histograms = {
+                key: (list(histogram.counts), histogram.sum)
+                for key, histogram in self.histograms.items()
+            }
+            counters = dict(self.counters)
+            template_counters = dict(self.template_counters)
+        lines = []
+        for name, (help_text, buckets) in HISTOGRAMS.items():
+            lines.append(f"# HELP {PREFIX}{name} {help_text}")
+            lines.append(f"# TYPE {PREFIX}{name} histogram")
+            for (metric, view), (counts, total) in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                view = _label(view)
+                cumulative = 0
+                for bound, count in zip((*buckets, "+Inf"), counts):
+                    cumulative += count
+                    lines.append(
+                        f'{PREFIX}{name}_bucket{{view="{view}",le="{bound}"}}'
+                        f" {cumulative}"
+                    )
+                lines.append(f'{PREFIX}{name}_sum{{view="{view}"}} {total}')
+                lines.append(
+                    f'{PREFIX}{name}_count{{view="{view}"}} {cumulative}'
+                )
+        for name, help_text in COUNTERS.items():
+            lines.append(f"# HELP {PREFIX}{name} {help_text}")
+            lines.append(f"# TYPE {PREFIX}{name} counter")
+            for (metric, view), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(
+                        f'{PREFIX}{name}{{view="{_label(view)}"}} {value}'
+                    )
+        lines.extend(_template_lines(template_counters))
+        return "\n".join(lines) + "\n"
+
+
+def _template_lines(template_counters):
+    lines = []
+    for name, help_text in TEMPLATE_COUNTERS.items():
+        items = sorted(
+            (key[1:], value)
+            for key, value in template_counters.items()
+            if key[0] == name
+        )
+        if not items:
+            continue
+        lines.append(f"# HELP {PREFIX}{name} {help_text}")
+        lines.append(f"# TYPE {PREFIX}{name} counter")
+        for (view, template), value in items:
+            lines.append(
+                f'{PREFIX}{name}{{view="{_label(view)}",'
+                f'template="{_label(template)}"}} {value}'
+            )
+    return lines
+
+
+registry = Registry()
@@ -0,0 +1,81 @@
+import random
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import metrics
+from .slow_queries import SlowQueryWrapper
+
+UNRESOLVED = "unresolved"
+
+
+class MetricsMiddleware:
+    """Собирает core.metrics для доли запросов METRICS_SAMPLE_RATE и,
+    если включено METRICS_SERVER_TIMING, отдаёт замеры в заголовке
+    Server-Timing. Остальные запросы проходят без накладных расходов."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        rate = settings.METRICS_SAMPLE_RATE
+        if rate < 1 and random.random() >= rate:
+            return self.get_response(request)
+        sample = metrics.start(settings.TEMPLATE_PROFILING)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(sample.time_query)
+                    )
+                response = self.get_response(request)
+        finally:
+            metrics.stop()
+        duration = sample.elapsed()
+        match = request.resolver_match
+        view = match.view_name if match else UNRESOLVED
+        metrics.registry.record(view, sample, duration)
+        if settings.METRICS_SERVER_TIMING:
+            response["Server-Timing"] = server_timing(sample, duration)
+        return response
+
+
+def server_timing(sample, duration):
+    def ms(seconds):
+        return f"{seconds * 1000:.1f}"
+
+    entries = [
+        f"total;dur={ms(duration)}",
+        f'db;dur={ms(sample.db_time)};desc="{sample.db_queries} SQL"',
+        f"tpl;dur={ms(sample.template_time)}",
+        f'cache;desc="{sample.cache_hits} hit, {sample.cache_misses} miss"',
+    ]
+    if sample.templates is not None:
+        # собственное время самых затратных шаблонов
+        slowest = sample.templates.slowest(settings.TEMPLATE_PROFILING_TOP)
+        for number, (name, renders, _, own) in enumerate(slowest, 1):
+            entries.append(
+                f'tpl-{number};dur={ms(own)};desc="{name} x{renders}"'
+            )
+    return ", ".join(entries)
+
+
+class SlowQueryMiddleware:
+    """Пишет SQL-запросы дольше SLOW_QUERY_THRESHOLD_MS в журнал
+    core.slow_queries; при SLOW_QUERY_THRESHOLD_MS = None выключен."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if settings.SLOW_QUERY_THRESHOLD_MS is None:
+            return self.get_response(request)
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(
+                    connection.execute_wrapper(
+                        SlowQueryWrapper(connection, request)
+                    )
+                )
+            return self.get_response(request)
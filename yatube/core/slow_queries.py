@@ -0,0 +1,162 @@
+"""Журнал медленных SQL-запросов.
+
+Запрос дольше SLOW_QUERY_THRESHOLD_MS пишется предупреждением в логгер
+модуля — дальше его разбирают обычные обработчики LOGGING. Если задан
+SLOW_QUERY_LOG_FILE, запрос ещё и записывается туда строкой JSON:
+представление, отпечаток запроса (SQL без значений), время и план
+выполнения. План снимается один раз на отпечаток в каждом процессе.
+Журнал общий для всех воркеров, сводку по отпечаткам строит команда
+slow_queries."""
+
+import json
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# отпечатков, для которых процесс помнит, что план уже снят
+EXPLAINED_LIMIT = 1000
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%s|\?")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_SPACES = re.compile(r"\s+")
+
+_local = threading.local()
+_lock = threading.Lock()
+_explained = OrderedDict()
+
+
+def fingerprint(sql):
+    """SQL без конкретных значений: запросы, которые отличаются только
+    параметрами или длиной списка в IN (...), получают один отпечаток."""
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _PLACEHOLDER.sub("?", sql)
+    sql = _IN_LIST.sub("(...)", sql)
+    return _SPACES.sub(" ", sql).strip()
+
+
+def _first_time(key):
+    with _lock:
+        if key in _explained:
+            return False
+        _explained[key] = True
+        if len(_explained) > EXPLAINED_LIMIT:
+            _explained.popitem(last=False)
+        return True
+
+
+def explain(connection, sql, params):
+    """План выполнения запроса или None, если его не снять."""
+    if not sql.lstrip().upper().startswith("SELECT"):
+        return None
+    prefix = (
+        "EXPLAIN QUERY PLAN" if connection.vendor == "sqlite" else "EXPLAIN"
+    )
+    _local.explaining = True
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f"{prefix} {sql}", params)
+            return [" ".join(map(str, row)) for row in cursor.fetchall()]
+    except Exception:
+        logger.exception("Не удалось снять план запроса")
+        return None
+    finally:
+        _local.explaining = False
+
+
+def write(entry):
+    line = json.dumps(entry, ensure_ascii=False) + "\n"
+    with _lock:
+        with open(settings.SLOW_QUERY_LOG_FILE, "a", encoding="utf-8") as log:
+            log.write(line)
+
+
+class SlowQueryWrapper:
+    """Обёртка для connection.execute_wrapper на время одного запроса к
+    сайту; представление берётся из request.resolver_match в момент
+    выполнения SQL."""
+
+    def __init__(self, connection, request):
+        self.connection = connection
+        self.request = request
+
+    def __call__(self, execute, sql, params, many, context):
+        if getattr(_local, "explaining", False):
+            return execute(sql, params, many, context)
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = (time.perf_counter() - started) * 1000
+            if duration >= settings.SLOW_QUERY_THRESHOLD_MS:
+                self.record(sql, params, many, duration)
+
+    def record(self, sql, params, many, duration):
+        match = self.request.resolver_match
+        key = fingerprint(sql)
+        entry = {
+            "time": timezone.now().isoformat(),
+            "view": match.view_name if match else None,
+            "path": self.request.path,
+            "fingerprint": key,
+            "sql": sql,
+            "duration_ms": round(duration, 3),
+            "plan": None,
+        }
+        if settings.SLOW_QUERY_LOG_FILE and not many and _first_time(key):
+            entry["plan"] = explain(self.connection, sql, params)
+        logger.warning(
+            "Медленный запрос %.1f мс в %s: %s",
+            duration,
+            entry["view"],
+            key,
+            extra={"slow_query": entry},
+        )
+        if settings.SLOW_QUERY_LOG_FILE:
+            write(entry)
+
+
+def read(path):
+    with open(path, encoding="utf-8") as log:
+        for line in log:
+            if line.strip():
+                yield json.loads(line)
+
+
+def aggregate(entries):
+    """Сводка по отпечаткам, самые затратные в сумме — первыми."""
+    stats = {}
+    for entry in entries:
+        item = stats.setdefault(
+            entry["fingerprint"],
+            {
+                "fingerprint": entry["fingerprint"],
+                "count": 0,
+                "total_ms": 0,
+                "max_ms": 0,
+                "views": {},
+                "sql": entry["sql"],
+                "plan": None,
+            },
+        )
+        item["count"] += 1
+        item["total_ms"] += entry["duration_ms"]
+        if entry["duration_ms"] >= item["max_ms"]:
+            item["max_ms"] = entry["duration_ms"]
+            item["sql"] = entry["sql"]
+        view = entry["view"] or "unresolved"
+        item["views"][view] = item["views"].get(view, 0) + 1
+        item["plan"] = entry["plan"] or item["plan"]
+    for item in stats.values():
+        item["total_ms"] = round(item["total_ms"], 3)
+        item["mean_ms"] = round(item["total_ms"] / item["count"], 3)
+    return sorted(stats.values(), key=lambda item: -item["total_ms"])
@@ -0,0 +1,43 @@
+from django.template import base
+from django.template.backends.django import DjangoTemplates, Template
+
+from . import metrics
+
+
+class ProfiledTemplate(base.Template):
+    """Шаблон, время отрисовки которого при TEMPLATE_PROFILING попадает в
+    метрики запроса под его именем. Такие шаблоны собирают загрузчики
+    core.template_loaders."""
+
+    def _render(self, context):
+        sample = metrics.current()
+        if sample is None or sample.templates is None:
+            return super()._render(context)
+        return sample.templates.measure(
+            self.name or "<string>", super()._render, context
+        )
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        with metrics.timed_template():
+            return super().render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """Шаблоны Django, время отрисовки которых попадает в метрики
+    запроса.
+
+    При TEMPLATE_PROFILING время считается и по каждому шаблону,
+    включая {% include %} и родительские шаблоны {% extends %}, — если
+    в OPTIONS["loaders"] стоят загрузчики из core.template_loaders."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(
+            ProfiledTemplate(template_code, engine=self.engine), self
+        )
+
+    def get_template(self, template_name):
+        return TimedTemplate(
+            super().get_template(template_name).template, self
+        )
@@ -0,0 +1,41 @@
+"""Загрузчики шаблонов Django, которые собирают ProfiledTemplate.
+
+Шаблоны из {% include %} и родительские шаблоны {% extends %} движок
+берёт прямо у загрузчиков, мимо бэкенда, поэтому время по каждому
+шаблону можно посчитать, только если их собирают сами загрузчики."""
+
+from django.template import TemplateDoesNotExist
+from django.template.loaders import app_directories, base, cached, filesystem
+
+from .template_backends import ProfiledTemplate
+
+
+class ProfiledLoader(base.Loader):
+    def get_template(self, template_name, skip=None):
+        # base.Loader.get_template, только с ProfiledTemplate
+        tried = []
+        for origin in self.get_template_sources(template_name):
+            if skip is not None and origin in skip:
+                tried.append((origin, "Skipped"))
+                continue
+            try:
+                contents = self.get_contents(origin)
+            except TemplateDoesNotExist:
+                tried.append((origin, "Source does not exist"))
+                continue
+            return ProfiledTemplate(
+                contents, origin, origin.template_name, self.engine
+            )
+        raise TemplateDoesNotExist(template_name, tried=tried)
+
+
+class FilesystemLoader(filesystem.Loader, ProfiledLoader):
+    pass
+
+
+class AppDirectoriesLoader(app_directories.Loader, ProfiledLoader):
+    pass
+
+
+class CachedLoader(cached.Loader, ProfiledLoader):
+    pass
@@ -0,0 +1,187 @@
+"""Сервер Redis в памяти для тестов core.cache_backends.redis: понимает
+только команды, которые отправляет бэкенд."""
+
+import fnmatch
+import socketserver
+import threading
+import time
+
+from ..cache_backends.redis import INCR_EXISTING
+
+
+class FakeRedisState:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.data = {}
+        self.expires = {}
+
+    def alive(self, key):
+        expires = self.expires.get(key)
+        if expires is not None and expires <= time.time():
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        return key in self.data
+
+
+def _bulk(value):
+    if value is None:
+        return b"$-1\r\n"
+    return b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+def _array(items):
+    return b"*%d\r\n" % len(items) + b"".join(items)
+
+
+def _int(value):
+    return b":%d\r\n" % value
+
+
+OK = b"+OK\r\n"
+
+
+class FakeRedisHandler(socketserver.StreamRequestHandler):
+    def read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        count = int(line[1:-2])
+        args = []
+        for _ in range(count):
+            length = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def handle(self):
+        while True:
+            args = self.read_command()
+            if args is None:
+                return
+            name = args[0].decode().upper()
+            handler = getattr(self, f"cmd_{name.lower()}", None)
+            if handler is None:
+                reply = b"-ERR unknown command '%s'\r\n" % args[0]
+            else:
+                with self.server.state.lock:
+                    reply = handler(*args[1:])
+            self.wfile.write(reply)
+
+    @property
+    def state(self):
+        return self.server.state
+
+    def cmd_ping(self):
+        return b"+PONG\r\n"
+
+    def cmd_select(self, db):
+        return OK
+
+    def cmd_get(self, key):
+        if not self.state.alive(key):
+            return _bulk(None)
+        return _bulk(self.state.data[key])
+
+    def cmd_mget(self, *keys):
+        return _array(
+            [
+                _bulk(self.state.data[key] if self.state.alive(key) else None)
+                for key in keys
+            ]
+        )
+
+    def cmd_set(self, key, value, *options):
+        options = [option.upper() for option in options]
+        expires = None
+        if b"PX" in options:
+            milliseconds = int(options[options.index(b"PX") + 1])
+            expires = time.time() + milliseconds / 1000
+        if b"NX" in options and self.state.alive(key):
+            return _bulk(None)
+        self.state.data[key] = value
+        self.state.expires.pop(key, None)
+        if expires is not None:
+            self.state.expires[key] = expires
+        return OK
+
+    def cmd_del(self, *keys):
+        deleted = 0
+        for key in keys:
+            if self.state.alive(key):
+                deleted += 1
+            self.state.data.pop(key, None)
+            self.state.expires.pop(key, None)
+        return _int(deleted)
+
+    def cmd_exists(self, *keys):
+        return _int(sum(self.state.alive(key) for key in keys))
+
+    def cmd_incrby(self, key, delta):
+        value = int(self.state.data.get(key, b"0")) + int(delta)
+        self.state.data[key] = str(value).encode()
+        return _int(value)
+
+    def cmd_eval(self, script, numkeys, *args):
+        # скрипты Lua не исполняются: известен только скрипт RedisCache
+        if script.decode() != INCR_EXISTING:
+            return b"-ERR unsupported script\r\n"
+        key, delta = args
+        if not self.state.alive(key):
+            return _bulk(None)
+        return self.cmd_incrby(key, delta)
+
+    def cmd_pexpire(self, key, milliseconds):
+        if not self.state.alive(key):
+            return _int(0)
+        self.state.expires[key] = time.time() + int(milliseconds) / 1000
+        return _int(1)
+
+    def cmd_persist(self, key):
+        if not self.state.alive(key):
+            return _int(0)
+        return _int(int(self.state.expires.pop(key, None) is not None))
+
+    def cmd_scan(self, cursor, *options):
+        pattern = b"*"
+        if b"MATCH" in options:
+            pattern = options[options.index(b"MATCH") + 1]
+        pattern = pattern.decode().replace(r"\*", "[*]")
+        keys = [
+            key
+            for key in list(self.state.data)
+            if self.state.alive(key)
+            and fnmatch.fnmatchcase(key.decode(), pattern)
+        ]
+        return _array([_bulk(b"0"), _array([_bulk(key) for key in keys])])
+
+    def cmd_flushdb(self):
+        self.state.data.clear()
+        self.state.expires.clear()
+        return OK
+
+
+class FakeRedisServer(socketserver.ThreadingTCPServer):
+    """Сервер в том же процессе, понимающий подмножество команд Redis,
+    которое использует RedisCache. Нужен для тестов и локального запуска
+    без Redis."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host="127.0.0.1", port=0):
+        super().__init__((host, port), FakeRedisHandler)
+        self.state = FakeRedisState()
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address
+        return f"redis://{host}:{port}/0"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,141 @@
+import os
+import shutil
+import socket
+import tempfile
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from ..cache_backends.redis import RedisCache, RedisConnection, RedisError
+from ..cache_backends.sqlite import SQLiteCache
+from ..cache_backends.stats import LocMemCache
+from .fake_redis import FakeRedisServer
+
+
+class CacheBackendContract:
+    """Общие проверки для всех бэкендов кэша."""
+
+    def make_cache(self, prefix="test"):
+        raise NotImplementedError
+
+    def setUp(self):
+        self.cache = self.make_cache()
+        self.cache.clear()
+        self.cache.reset_stats()
+
+    def test_set_get_delete(self):
+        """Значение сохраняется, читается и удаляется."""
+        self.cache.set("key", {"value": [1, 2]})
+        self.assertEqual(self.cache.get("key"), {"value": [1, 2]})
+        self.assertTrue(self.cache.has_key("key"))
+        self.cache.delete("key")
+        self.assertIsNone(self.cache.get("key"))
+
+    def test_add_incr_and_expiry(self):
+        """add не перезаписывает ключ, incr работает, ключи истекают."""
+        self.assertTrue(self.cache.add("counter", 1))
+        self.assertFalse(self.cache.add("counter", 5))
+        self.assertEqual(self.cache.incr("counter", 2), 3)
+        self.assertEqual(self.cache.get("counter"), 3)
+        with self.assertRaises(ValueError):
+            self.cache.incr("missing")
+        self.cache.set("short", "value", timeout=0.05)
+        time.sleep(0.1)
+        self.assertIsNone(self.cache.get("short"))
+        self.assertTrue(self.cache.add("short", "again"))
+
+    def test_many(self):
+        """set_many, get_many и delete_many работают пачками."""
+        self.cache.set_many({"a": 1, "b": "два", "c": []})
+        self.assertEqual(
+            self.cache.get_many(["a", "b", "c", "d"]),
+            {"a": 1, "b": "два", "c": []},
+        )
+        self.cache.delete_many(["a", "b"])
+        self.assertEqual(self.cache.get_many(["a", "b", "c"]), {"c": []})
+
+    def test_hit_miss_counters(self):
+        """Попадания и промахи считаются без двойного учёта."""
+        self.cache.set("key", "value")
+        self.cache.get("key")
+        self.cache.get("missing")
+        self.cache.get_many(["key", "missing", "other"])
+        self.assertEqual(self.cache.stats(), {"hits": 2, "misses": 3})
+
+    def test_clear_keeps_other_namespaces(self):
+        """clear удаляет только ключи своего пространства имён."""
+        other = self.make_cache(prefix="other")
+        other.set("key", "other value")
+        self.cache.set("key", "value")
+        self.cache.clear()
+        self.assertIsNone(self.cache.get("key"))
+        self.assertEqual(other.get("key"), "other value")
+        other.clear()
+
+
+class LocMemCacheTest(CacheBackendContract, SimpleTestCase):
+    def make_cache(self, prefix="test"):
+        return LocMemCache(f"test-{prefix}", {"KEY_PREFIX": prefix})
+
+
+class SQLiteCacheTest(CacheBackendContract, SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.directory = tempfile.mkdtemp()
+        cls.path = os.path.join(cls.directory, "cache.sqlite3")
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(cls.directory, ignore_errors=True)
+
+    def make_cache(self, prefix="test"):
+        return SQLiteCache(self.path, {"KEY_PREFIX": prefix})
+
+    def test_shared_between_workers(self):
+        """Два независимых объекта (как два воркера) видят одни данные."""
+        worker = self.make_cache()
+        self.cache.set("shared", "value")
+        self.assertEqual(worker.get("shared"), "value")
+        worker.delete("shared")
+        self.assertIsNone(self.cache.get("shared"))
+
+
+class RedisCacheTest(CacheBackendContract, SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = FakeRedisServer().start()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.server.stop()
+
+    def make_cache(self, prefix="test"):
+        return RedisCache(self.server.url, {"KEY_PREFIX": prefix})
+
+    def test_pipeline_error_keeps_replies_in_order(self):
+        """Ошибка в середине конвейера не оставляет в соединении
+        непрочитанных ответов."""
+        first = self.cache.make_key("first")
+        second = self.cache.make_key("second")
+        with self.assertRaises(RedisError):
+            self.cache._pipeline(
+                [("SET", first, b"1"), ("BOGUS",), ("SET", second, b"2")]
+            )
+        self.assertEqual(self.cache.get("second"), 2)
+        self.assertEqual(self.cache.get("first"), 1)
+
+    def test_incr_is_not_repeated_after_timeout(self):
+        """Ответ на INCRBY не дошёл — команда не повторяется, а
+        соединение заменяется новым."""
+        self.cache.set("counter", 1)
+        with mock.patch.object(
+            RedisConnection, "read_reply", side_effect=socket.timeout
+        ):
+            with self.assertRaises(socket.timeout):
+                self.cache.incr("counter")
+        self.assertEqual(self.cache.get("counter"), 2)
@@ -0,0 +1,159 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.template import Template, engines
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .. import metrics, template_backends
+
+
+@override_settings(METRICS_SAMPLE_RATE=1, METRICS_SERVER_TIMING=True)
+class MetricsTest(TestCase):
+    def setUp(self):
+        metrics.registry.reset()
+        cache.clear()
+
+    def histogram(self, name, view):
+        return metrics.registry.histograms[name, view]
+
+    def test_records_view_metrics(self):
+        """По каждому представлению копятся время ответа, SQL-запросы,
+        отрисовка шаблонов и обращения к кэшу."""
+        user = get_user_model().objects.create_user(username="reader")
+        self.client.force_login(user)
+        for _ in range(2):
+            response = self.client.get(reverse("posts:index"))
+        requests = self.histogram("request_duration_seconds", "posts:index")
+        self.assertEqual(sum(requests.counts), 2)
+        self.assertGreater(requests.sum, 0)
+        self.assertGreater(self.histogram("db_queries", "posts:index").sum, 0)
+        self.assertGreater(
+            self.histogram("template_duration_seconds", "posts:index").sum, 0
+        )
+        counters = metrics.registry.counters
+        self.assertGreater(counters["cache_misses_total", "posts:index"], 0)
+        self.assertGreater(counters["cache_hits_total", "posts:index"], 0)
+        self.assertRegex(
+            response["Server-Timing"],
+            r'^total;dur=[\d.]+, db;dur=[\d.]+;desc="\d+ SQL", tpl;dur=',
+        )
+
+    def test_unresolved_paths_share_one_label(self):
+        self.client.get("/nonexist-page/")
+        self.client.get("/another-missing-page/")
+        requests = self.histogram("request_duration_seconds", "unresolved")
+        self.assertEqual(sum(requests.counts), 2)
+
+    @override_settings(METRICS_SAMPLE_RATE=0)
+    def test_unsampled_requests_are_not_measured(self):
+        response = self.client.get(reverse("about:tech"))
+        self.assertNotIn("Server-Timing", response)
+        self.assertEqual(metrics.registry.histograms, {})
+
+    @override_settings(METRICS_SERVER_TIMING=False)
+    def test_server_timing_can_be_disabled(self):
+        response = self.client.get(reverse("about:tech"))
+        self.assertNotIn("Server-Timing", response)
+        self.assertTrue(metrics.registry.histograms)
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_prometheus_endpoint(self):
+        """Гистограммы накопительные, адрес отвечает только с токеном."""
+        sample = metrics.Sample()
+        sample.db_queries = 3
+        metrics.registry.record("posts:index", sample, 0.02)
+        metrics.registry.record("posts:index", sample, 0.2)
+        response = self.client.get(
+            reverse("metrics"), HTTP_AUTHORIZATION="Bearer secret"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        text = response.content.decode()
+        prefix = 'yatube_request_duration_seconds_bucket{view="posts:index"'
+        self.assertIn(f'{prefix},le="0.01"}} 0', text)
+        self.assertIn(f'{prefix},le="0.025"}} 1', text)
+        self.assertIn(f'{prefix},le="0.25"}} 2', text)
+        self.assertIn(f'{prefix},le="+Inf"}} 2', text)
+        self.assertIn(
+            'yatube_db_queries_bucket{view="posts:index",le="2"} 0', text
+        )
+        self.assertIn(
+            'yatube_db_queries_bucket{view="posts:index",le="5"} 2', text
+        )
+        self.assertIn("# TYPE yatube_cache_hits_total counter", text)
+
+        for header in ("", "Bearer wrong", "secret"):
+            with self.subTest(header=header):
+                response = self.client.get(
+                    reverse("metrics"), HTTP_AUTHORIZATION=header
+                )
+                self.assertEqual(response.status_code, 404)
+
+    @override_settings(METRICS_TOKEN=None)
+    def test_prometheus_endpoint_closed_without_token(self):
+        """Без METRICS_TOKEN адрес закрыт, в том числе для INTERNAL_IPS."""
+        for header in ("", "Bearer ", "Bearer None"):
+            with self.subTest(header=header):
+                response = self.client.get(
+                    reverse("metrics"), HTTP_AUTHORIZATION=header
+                )
+                self.assertEqual(response.status_code, 404)
+
+    @override_settings(TEMPLATE_PROFILING=True)
+    def test_template_profiling(self):
+        """Время считается по каждому шаблону, включая include и
+        родительские шаблоны, а самые затратные попадают в
+        Server-Timing."""
+        user = get_user_model().objects.create_user(username="reader")
+        self.client.force_login(user)
+        response = self.client.get(reverse("posts:index"))
+        counters = metrics.registry.template_counters
+        for template in (
+            "posts/index.html",
+            "base.html",
+            "includes/header.html",
+            "posts/includes/switcher.html",
+            "posts/includes/paginator.html",
+        ):
+            with self.subTest(template=template):
+                key = ("posts:index", template)
+                self.assertEqual(counters[("template_renders_total", *key)], 1)
+                self.assertGreater(
+                    counters[("template_seconds_total", *key)], 0
+                )
+        own = counters[
+            "template_self_seconds_total", "posts:index", "base.html"
+        ]
+        total = counters["template_seconds_total", "posts:index", "base.html"]
+        self.assertLess(own, total)
+        self.assertRegex(
+            response["Server-Timing"], r'tpl-1;dur=[\d.]+;desc="[^"]+ x\d+"'
+        )
+        text = metrics.registry.render()
+        self.assertIn(
+            'yatube_template_renders_total{view="posts:index",'
+            'template="posts/includes/switcher.html"} 1',
+            text,
+        )
+
+    def test_template_profiling_does_not_patch_django(self):
+        """Замер идёт в своём классе шаблона, который собирают
+        загрузчики core.template_loaders; Template Django не меняется."""
+        engine = engines.all()[0]
+        for template in (
+            engine.get_template("base.html"),
+            engine.from_string("{% include 'includes/header.html' %}"),
+        ):
+            with self.subTest(template=template.template.name):
+                self.assertIsInstance(
+                    template.template, template_backends.ProfiledTemplate
+                )
+        self.assertNotEqual(
+            Template._render.__module__,
+            template_backends.__name__,
+        )
+
+    def test_template_profiling_is_off_by_default(self):
+        response = self.client.get(reverse("about:tech"))
+        self.assertNotIn("tpl-1", response["Server-Timing"])
+        self.assertEqual(metrics.registry.template_counters, {})
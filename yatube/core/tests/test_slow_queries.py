@@ -0,0 +1,87 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .. import slow_queries
+
+
+class SlowQueryLogTest(TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, "slow.jsonl")
+        slow_queries._explained.clear()
+
+    def test_fingerprint_drops_values(self):
+        self.assertEqual(
+            slow_queries.fingerprint(
+                "SELECT t1.id FROM t1 WHERE t1.id IN (%s, %s, %s)\n"
+                "  AND name = 'it''s' LIMIT 21"
+            ),
+            "SELECT t1.id FROM t1 WHERE t1.id IN (...) AND name = ? LIMIT ?",
+        )
+        self.assertEqual(
+            slow_queries.fingerprint("SELECT 1 FROM t WHERE id IN (%s)"),
+            slow_queries.fingerprint("SELECT 2 FROM t WHERE id IN (%s, %s)"),
+        )
+
+    def test_slow_queries_are_logged_with_view_and_plan(self):
+        """Запросы дольше порога попадают в журнал с именем
+        представления; план снимается один раз на отпечаток."""
+        with override_settings(
+            SLOW_QUERY_THRESHOLD_MS=0, SLOW_QUERY_LOG_FILE=self.path
+        ), self.assertLogs("core.slow_queries", "WARNING"):
+            # с прогретым кэшем лента не обращается к базе
+            for _ in range(2):
+                cache.clear()
+                self.client.get(reverse("posts:index"))
+        entries = list(slow_queries.read(self.path))
+        self.assertTrue(entries)
+        self.assertEqual({entry["view"] for entry in entries}, {"posts:index"})
+        plans = [entry for entry in entries if entry["plan"]]
+        self.assertEqual(
+            len(plans), len({entry["fingerprint"] for entry in plans})
+        )
+
+        out = StringIO()
+        call_command(
+            "slow_queries", log=self.path, json=True, clear=True, stdout=out
+        )
+        summary = json.loads(out.getvalue())
+        self.assertEqual(sum(item["count"] for item in summary), len(entries))
+        self.assertTrue(all(item["count"] >= 2 for item in summary))
+        self.assertEqual(
+            summary[0]["views"], {"posts:index": summary[0]["count"]}
+        )
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_fast_queries_are_not_logged(self):
+        with override_settings(
+            SLOW_QUERY_THRESHOLD_MS=10_000, SLOW_QUERY_LOG_FILE=self.path
+        ):
+            self.client.get(reverse("posts:index"))
+        self.assertFalse(os.path.exists(self.path))
+        out = StringIO()
+        call_command("slow_queries", log=self.path, stdout=out)
+        self.assertIn("не было", out.getvalue())
+
+    def test_without_log_file_only_logger_is_used(self):
+        """Без SLOW_QUERY_LOG_FILE запросы уходят только в логгер."""
+        with override_settings(
+            SLOW_QUERY_THRESHOLD_MS=0, SLOW_QUERY_LOG_FILE=None
+        ), self.assertLogs("core.slow_queries", "WARNING") as logs:
+            cache.clear()
+            self.client.get(reverse("posts:index"))
+        self.assertEqual(logs.records[0].slow_query["view"], "posts:index")
+        self.assertIsNone(logs.records[0].slow_query["plan"])
+        self.assertFalse(os.path.exists(self.path))
+        with override_settings(SLOW_QUERY_LOG_FILE=None):
+            with self.assertRaises(CommandError):
+                call_command("slow_queries", stdout=StringIO())
@@ -1,5 +1,11 @@
+import hmac
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
 from django.shortcuts import render
 
+from . import metrics as core_metrics
+
 
 def page_not_found(request, exception):
     return render(
@@ -14,10 +20,25 @@ def server_error(request):
 
 
 def csrf_failure(request, reason=""):
-    return render(request, "core/403csrf.html")
+    return render(request, "core/403csrf.html", status=403)
 
 
 def page_forbidden(request, exception):
     return render(
         request, 'core/403.html', {'path': request.path}, status=403
     )
+
+
+def metrics(request):
+    """Метрики процесса для Prometheus; доступны только с токеном из
+    METRICS_TOKEN, без него адрес закрыт."""
+    token = settings.METRICS_TOKEN
+    header = request.META.get("HTTP_AUTHORIZATION", "")
+    if not token or not hmac.compare_digest(
+        header.encode(), f"Bearer {token}".encode()
+    ):
+        raise Http404
+    return HttpResponse(
+        core_metrics.registry.render(),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
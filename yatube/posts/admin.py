@@ -1,6 +1,15 @@
 from django.contrib import admin
 
-from .models import Comment, Follow, Group, Post
+from .models import (
+    ApiToken,
+    AuthorStats,
+    Comment,
+    FeedStats,
+    Follow,
+    Group,
+    Post,
+)
+from .search import SearchResults
 
 
 @admin.register(Post)
@@ -17,7 +26,28 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ("pub_date",)
     empty_value_display = "-пусто-"
 
+    def get_search_results(self, request, queryset, search_term):
+        # вместо LIKE по тексту ищем по полнотекстовому индексу
+        results = SearchResults(search_term)
+        if not results.match:
+            return queryset, False
+        return queryset.filter(pk__in=results.matching_ids()), False
+
 
 admin.site.register(Group)
 admin.site.register(Comment)
 admin.site.register(Follow)
+admin.site.register(AuthorStats)
+admin.site.register(FeedStats)
+
+
+@admin.register(ApiToken)
+class ApiTokenAdmin(admin.ModelAdmin):
+    # ключ показывается только при выдаче, в админке токен можно лишь
+    # отозвать
+    list_display = ("user", "created")
+    fields = ("user", "created")
+    readonly_fields = ("user", "created")
+
+    def has_add_permission(self, request):
+        return False
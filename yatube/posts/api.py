@@ -0,0 +1,272 @@
+"""JSON API v1: ленты, посты, комментарии и подписки.
+
+Ленты и комментарии листаются курсором, как курсорные ленты сайта, и
+читают те же QuerySet, только с меньшим набором полей. Страницы
+отдаются потоком (serializers.stream_page): записи читаются из базы
+через QuerySet.iterator() по мере отправки (paginators.StreamedPage).
+
+Пользователь определяется одним из двух способов:
+
+- токеном: клиенты вне сайта (мобильное приложение, SPA) получают его
+  запросом POST /api/v1/token/ с username и password и присылают в
+  заголовке «Authorization: Token <ключ>». Cookie такие запросы не
+  используют, поэтому CSRF для них не проверяется; неверный токен —
+  ответ 401, а не анонимный запрос;
+- сессией сайта, для скриптов его страниц. Запросы вошедшего
+  пользователя, которые меняют данные (POST и DELETE), проверяются как
+  формы сайта: нужен заголовок X-CSRFToken со значением cookie
+  csrftoken, иначе ответ — 403."""
+
+import json
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth import authenticate
+from django.http import (
+    Http404,
+    HttpResponse,
+    JsonResponse,
+    StreamingHttpResponse,
+)
+from django.middleware.csrf import CsrfViewMiddleware
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.views.decorators.csrf import csrf_exempt
+
+from . import follow_graph, views
+from .conditional import conditional_page
+from .forms import CommentForm
+from .models import ApiToken, Follow, Group, Post, User
+from .paginators import CommentPaginator, CursorPaginator
+from .serializers import POST_FIELDS, comment_data, post_data, stream_page
+from .timeline import TimelineFeed
+
+JSON_PARAMS = {"ensure_ascii": False}
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+def json_response(data, status=200):
+    return JsonResponse(data, status=status, json_dumps_params=JSON_PARAMS)
+
+
+def error(status, detail, **extra):
+    return json_response({"detail": detail, **extra}, status=status)
+
+
+def authenticate_request(request):
+    """Определяет пользователя по токену из заголовка Authorization, а
+    без заголовка — по сессии, проверяя CSRF у запросов, которые меняют
+    данные. Возвращает ответ с ошибкой или None."""
+    header = request.META.get("HTTP_AUTHORIZATION")
+    if header is not None:
+        scheme, _, key = header.partition(" ")
+        token = ApiToken.find(key) if scheme == "Token" and key else None
+        if token is None:
+            return error(401, "Неверный токен")
+        request.user = token.user
+        request.api_token = token
+        return None
+    if request.method in SAFE_METHODS or not request.user.is_authenticated:
+        return None
+    # view помечены csrf_exempt, чтобы пропустить запросы с токеном, —
+    # запросы по сессии проверяем здесь, как их проверил бы middleware
+    rejected = CsrfViewMiddleware().process_view(request, None, (), {})
+    if rejected is not None:
+        return error(403, "Нужен заголовок X-CSRFToken")
+    return None
+
+
+def api_view(*methods, login_required=False):
+    """Проверяет метод запроса и вход пользователя; ошибки отдаются в
+    JSON, а не HTML-страницами сайта."""
+    allowed = set(methods)
+    if "GET" in allowed:
+        allowed.add("HEAD")
+
+    def decorator(view):
+        @csrf_exempt
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in allowed:
+                response = error(405, "Метод не поддерживается")
+                response["Allow"] = ", ".join(sorted(allowed))
+                return response
+            rejected = authenticate_request(request)
+            if rejected is not None:
+                return rejected
+            if login_required and not request.user.is_authenticated:
+                return error(401, "Нужно войти на сайт")
+            try:
+                return view(request, *args, **kwargs)
+            except Http404:
+                return error(404, "Не найдено")
+
+        return wrapper
+
+    return decorator
+
+
+def page_size(request):
+    """Размер страницы из ?limit=, не больше API_MAX_PAGE_SIZE."""
+    try:
+        size = int(request.GET.get("limit", settings.CONST_POST_ON_PAGE))
+    except ValueError:
+        size = settings.CONST_POST_ON_PAGE
+    return min(max(size, 1), settings.API_MAX_PAGE_SIZE)
+
+
+def stream_response(paginator, cursor, serialize):
+    page = paginator.stream_page(cursor)
+    return StreamingHttpResponse(
+        stream_page(
+            page,
+            serialize,
+            next_cursor=lambda: page.next_cursor,
+            previous_cursor=lambda: page.previous_cursor,
+        ),
+        content_type="application/json",
+    )
+
+
+def feed_response(request, post_list):
+    paginator = CursorPaginator(
+        post_list.only(*POST_FIELDS), page_size(request)
+    )
+    return stream_response(paginator, request.GET.get("cursor"), post_data)
+
+
+def request_data(request):
+    """Данные формы из тела запроса: JSON-объект или обычная форма.
+    None, если JSON не разобрать."""
+    if request.content_type != "application/json":
+        return request.POST
+    try:
+        data = json.loads(request.body or b"{}")
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+@api_view("POST", "DELETE")
+def token(request):
+    """POST — выдать токен по username и password, DELETE — отозвать
+    токен из заголовка Authorization."""
+    if request.method == "DELETE":
+        if getattr(request, "api_token", None) is None:
+            return error(401, "Нужен токен в заголовке Authorization")
+        request.api_token.delete()
+        return HttpResponse(status=204)
+    data = request_data(request)
+    if data is None:
+        return error(400, "Тело запроса — не JSON-объект")
+    user = authenticate(
+        request,
+        username=data.get("username"),
+        password=data.get("password"),
+    )
+    if user is None:
+        return error(400, "Неверное имя пользователя или пароль")
+    return json_response({"token": ApiToken.issue(user)}, status=201)
+
+
+@api_view("GET")
+@conditional_page(views.index_versions)
+def index(request):
+    return feed_response(request, Post.objects.for_feed())
+
+
+@api_view("GET")
+@conditional_page(views.group_versions)
+def group_posts(request, slug):
+    group = get_object_or_404(Group.objects.only("pk"), slug=slug)
+    return feed_response(request, group.posts.for_feed())
+
+
+@api_view("GET")
+@conditional_page(views.profile_versions)
+def profile_posts(request, username):
+    author = get_object_or_404(User.objects.only("pk"), username=username)
+    return feed_response(request, author.posts.for_feed())
+
+
+@api_view("GET", login_required=True)
+@conditional_page(views.follow_versions)
+def follow_posts(request):
+    return feed_response(request, TimelineFeed(request.user).queryset)
+
+
+@api_view("GET")
+@conditional_page(views.post_detail_versions)
+def post_detail(request, post_id):
+    post = get_object_or_404(
+        Post.objects.select_related("author", "group").only(*POST_FIELDS),
+        pk=post_id,
+    )
+    data = post_data(post)
+    data["comments"] = reverse("api:comments", args=[post.pk])
+    return json_response(data)
+
+
+@api_view("GET", "POST")
+@conditional_page(views.post_comments_versions)
+def comments(request, post_id):
+    """GET — комментарии от новых к старым, POST — новый комментарий."""
+    post = get_object_or_404(Post.objects.only("pk"), pk=post_id)
+    if request.method == "POST":
+        return create_comment(request, post)
+    paginator = CommentPaginator(
+        views.comments_for_post(post.pk), settings.COMMENTS_ON_PAGE
+    )
+    return stream_response(paginator, request.GET.get("cursor"), comment_data)
+
+
+def create_comment(request, post):
+    if not request.user.is_authenticated:
+        return error(401, "Нужно войти на сайт")
+    data = request_data(request)
+    if data is None:
+        return error(400, "Тело запроса — не JSON-объект")
+    form = CommentForm(data)
+    if not form.is_valid():
+        return error(400, "Неверные данные", errors=form.errors)
+    comment = form.save(commit=False)
+    comment.author = request.user
+    comment.post = post
+    comment.save()
+    return json_response(comment_data(comment), status=201)
+
+
+@api_view("POST", "DELETE", login_required=True)
+def follow(request, username):
+    """POST — подписаться на автора, DELETE — отписаться."""
+    author = get_object_or_404(User.objects.only("pk"), username=username)
+    if request.method == "DELETE":
+        get_object_or_404(Follow, user=request.user, author=author).delete()
+        return HttpResponse(status=204)
+    if author == request.user:
+        return error(400, "Нельзя подписаться на себя")
+    created = follow_graph.follow(request.user, author)
+    return json_response(
+        {"author": username, "following": True},
+        status=201 if created else 200,
+    )
+
+
+@api_view("GET", login_required=True)
+def following(request):
+    """Подписки читателя на авторов из ?authors=1,2,3 — одним чтением
+    графа подписок, для кнопок подписки в списках."""
+    try:
+        author_ids = [
+            int(author_id)
+            for author_id in request.GET.get("authors", "").split(",")
+            if author_id
+        ]
+    except ValueError:
+        return error(400, "authors — список id через запятую")
+    if len(author_ids) > settings.API_MAX_PAGE_SIZE:
+        return error(400, "Слишком много авторов")
+    followed = follow_graph.is_following_many(request.user.pk, author_ids)
+    return json_response(
+        {"following": [pk for pk in author_ids if pk in followed]}
+    )
@@ -0,0 +1,111 @@
+"""Замеры времени ответа и числа SQL-запросов страниц через тестовый
+клиент Django, без сети и веб-сервера."""
+
+import math
+import time
+
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.urls import reverse
+
+from .models import Follow, Post, User
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+def percentile(values, percent):
+    """Перцентиль по методу ближайшего ранга."""
+    ordered = sorted(values)
+    rank = math.ceil(percent / 100 * len(ordered))
+    return ordered[max(rank, 1) - 1]
+
+
+def sample_urls():
+    """Адреса страниц с самыми тяжёлыми данными: профиль автора с
+    наибольшим числом постов, пост с наибольшим числом комментариев,
+    лента читателя с наибольшим числом подписок, который и открывает
+    все страницы."""
+    urls = {"posts:index": reverse("posts:index")}
+    author = (
+        User.objects.annotate(amount=Count("posts"))
+        .order_by("-amount")
+        .values_list("username", flat=True)
+        .first()
+    )
+    if author:
+        urls["posts:profile"] = reverse("posts:profile", args=[author])
+    post_id = (
+        Post.objects.annotate(amount=Count("comments"))
+        .order_by("-amount")
+        .values_list("pk", flat=True)
+        .first()
+    )
+    if post_id:
+        urls["posts:post_detail"] = reverse(
+            "posts:post_detail", args=[post_id]
+        )
+    reader_id = (
+        Follow.objects.values("user_id")
+        .annotate(amount=Count("pk"))
+        .order_by("-amount")
+        .values_list("user_id", flat=True)
+        .first()
+    )
+    reader = User.objects.filter(pk=reader_id).first()
+    if reader:
+        urls["posts:follow_index"] = reverse("posts:follow_index")
+    return urls, reader
+
+
+class QueryCounter:
+    """Считает запросы и при DEBUG = False, в отличие от
+    connection.queries."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def measure(client, url, requests, warmup=1):
+    for _ in range(warmup):
+        client.get(url)
+    timings = []
+    queries = []
+    for _ in range(requests):
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            started = time.perf_counter()
+            response = client.get(url)
+            timings.append((time.perf_counter() - started) * 1000)
+        queries.append(counter.count)
+    result = {
+        "url": url,
+        "status": response.status_code,
+        "requests": requests,
+        "mean_ms": round(sum(timings) / len(timings), 3),
+        "max_ms": round(max(timings), 3),
+        "queries_min": min(queries),
+        "queries_max": max(queries),
+    }
+    for percent in PERCENTILES:
+        result[f"p{percent}_ms"] = round(percentile(timings, percent), 3)
+    return result
+
+
+def run(requests=50, warmup=1, anonymous=False):
+    """Результаты по каждой странице; ключи — имена адресов."""
+    urls, reader = sample_urls()
+    # адрес не из INTERNAL_IPS: debug_toolbar не должен попасть в замеры
+    client = Client(REMOTE_ADDR="192.0.2.1")
+    if reader and not anonymous:
+        client.force_login(reader)
+    if anonymous:
+        urls.pop("posts:follow_index", None)
+    return {
+        name: measure(client, url, requests, warmup)
+        for name, url in urls.items()
+    }
@@ -0,0 +1,99 @@
+import hashlib
+import time
+from uuid import uuid4
+
+from django.core.cache import cache
+
+KEY_PREFIX = "posts:version:"
+VERSION_TTL = None
+# Версия всех карточек постов: меняется, когда меняется то, что
+# показывается в карточке, но не хранится в самом посте (группа).
+CARDS = "cards"
+INDEX = "index"
+
+
+def group_feed(group_id):
+    return f"group:{group_id}"
+
+
+def author_feed(author_id):
+    return f"author:{author_id}"
+
+
+def follow_feed(user_id):
+    return f"follow:{user_id}"
+
+
+def followees(user_id):
+    return f"followees:{user_id}"
+
+
+def followers(author_id):
+    return f"followers:{author_id}"
+
+
+def post_page(post_id):
+    return f"post:{post_id}"
+
+
+def _new_version():
+    # время создания версии в миллисекундах: по нему страницы получают
+    # заголовок Last-Modified
+    return f"{int(time.time() * 1000):x}-{uuid4().hex[:8]}"
+
+
+def timestamp(version):
+    """Время создания версии в секундах или None для версий без него."""
+    try:
+        return int(version.split("-", 1)[0], 16) / 1000
+    except (AttributeError, ValueError):
+        return None
+
+
+def get_versions(*names):
+    """Возвращает версии по именам одним обращением к кэшу. Для
+    вытесненных из кэша версий заводит новые, чтобы не отдать фрагменты,
+    сохранённые под старой версией."""
+    keys = {KEY_PREFIX + name: name for name in names}
+    versions = cache.get_many(keys)
+    missing = {key: _new_version() for key in keys if key not in versions}
+    for key, version in missing.items():
+        if not cache.add(key, version, VERSION_TTL):
+            version = cache.get(key, version)
+        versions[key] = version
+    return {keys[key]: version for key, version in versions.items()}
+
+
+def version(name):
+    return get_versions(name)[name]
+
+
+def combine(versions):
+    """Одна короткая строка из нескольких версий — для ключей кэша."""
+    if len(versions) == 1:
+        return versions[0]
+    return hashlib.sha1("\n".join(versions).encode()).hexdigest()[:20]
+
+
+def combined_version(*names):
+    versions = get_versions(*names)
+    return combine([versions[name] for name in names])
+
+
+def feed_context(*names):
+    """Версии для ключей кэша страницы ленты и её карточек. Лента может
+    зависеть от нескольких версий (лента подписок — от версий всех
+    авторов, на которых подписан читатель)."""
+    versions = get_versions(*names, CARDS)
+    feed_version = combine([versions[name] for name in names])
+    return {
+        "feed_version": f"{feed_version}.{versions[CARDS]}",
+        "cards_version": versions[CARDS],
+    }
+
+
+def bump(*names):
+    """Меняет версии: все фрагменты, зависящие от них, устаревают."""
+    cache.set_many(
+        {KEY_PREFIX + name: _new_version() for name in names}, VERSION_TTL
+    )
@@ -0,0 +1,65 @@
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from . import cache_versions
+
+
+def page_validators(request, names):
+    """ETag и Last-Modified страницы по версиям её данных.
+
+    Кроме версий в ETag входят адрес с параметрами, пользователь и его
+    CSRF-cookie: от них зависят шапка страницы и формы на ней."""
+    versions = cache_versions.get_versions(*names, cache_versions.CARDS)
+    parts = [
+        request.get_full_path(),
+        str(request.user.pk),
+        request.COOKIES.get(settings.CSRF_COOKIE_NAME, ""),
+        *(versions[name] for name in sorted(versions)),
+    ]
+    etag = quote_etag(
+        hashlib.sha1("\n".join(parts).encode()).hexdigest()[:20]
+    )
+    timestamps = [
+        cache_versions.timestamp(version) for version in versions.values()
+    ]
+    if None in timestamps:
+        return etag, None
+    return etag, int(max(timestamps))
+
+
+def conditional_page(versions_func):
+    """Отвечает 304 Not Modified без рендеринга, если данные страницы
+    не менялись. versions_func(request, *args, **kwargs) возвращает
+    имена версий из posts.cache_versions, от которых зависит страница,
+    или None, если проверить их нельзя (например, объекта нет)."""
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return view(request, *args, **kwargs)
+            names = versions_func(request, *args, **kwargs)
+            if names is None:
+                return view(request, *args, **kwargs)
+            etag, last_modified = page_validators(request, names)
+            response = get_conditional_response(
+                request, etag=etag, last_modified=last_modified
+            )
+            if response is None:
+                response = view(request, *args, **kwargs)
+            if response.status_code in (200, 304):
+                response["ETag"] = etag
+                if last_modified is not None:
+                    response["Last-Modified"] = http_date(last_modified)
+                # страница своя у каждого пользователя, и браузер должен
+                # каждый раз спрашивать, не изменилась ли она
+                patch_cache_control(response, private=True, no_cache=True)
+            return response
+
+        return wrapper
+
+    return decorator
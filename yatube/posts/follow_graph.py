@@ -0,0 +1,83 @@
+"""Граф подписок: кого читает пользователь и кто читает автора.
+
+Множества id хранятся в кэше отсортированными массивами целых чисел —
+так они занимают меньше места, чем списки или set, — под ключом с
+версией (posts.cache_versions). Сигналы подписок меняют версии обоих
+пользователей, поэтому устаревшие массивы никогда не читаются. Проверка
+подписки — двоичный поиск по массиву без запроса к базе.
+
+Граф — только для показа (кнопки подписки). Всё, что пишет в базу, —
+раскладка постов по лентам, подписка и отписка — читает Follow из базы:
+кэш процесса может отставать от неё."""
+
+from array import array
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+
+from . import cache_versions
+from .models import Follow
+
+KEY_PREFIX = "posts:follow_graph:"
+
+
+def _ids(name, queryset, field):
+    version = cache_versions.version(name)
+    key = f"{KEY_PREFIX}{name}:{version}"
+    ids = cache.get(key)
+    if ids is None:
+        ids = array(
+            "q", queryset.order_by(field).values_list(field, flat=True)
+        )
+        cache.set(key, ids, settings.SECONDS_TO_CACHE_FEED)
+    return ids
+
+
+def followee_ids(user_id):
+    """Отсортированный массив id авторов, на которых подписан
+    пользователь."""
+    if user_id is None:
+        return array("q")
+    return _ids(
+        cache_versions.followees(user_id),
+        Follow.objects.filter(user_id=user_id),
+        "author_id",
+    )
+
+
+def follower_ids(author_id):
+    """Отсортированный массив id подписчиков автора."""
+    return _ids(
+        cache_versions.followers(author_id),
+        Follow.objects.filter(author_id=author_id),
+        "user_id",
+    )
+
+
+def _contains(ids, value):
+    position = bisect_left(ids, value)
+    return position < len(ids) and ids[position] == value
+
+
+def is_following(user_id, author_id):
+    return _contains(followee_ids(user_id), author_id)
+
+
+def is_following_many(user_id, author_ids):
+    """Множество тех author_ids, на которых подписан пользователь, —
+    одним чтением его подписок."""
+    ids = followee_ids(user_id)
+    return {author_id for author_id in author_ids if _contains(ids, author_id)}
+
+
+def follow(user, author):
+    """Подписывает user на author. False, если подписка уже есть, — это
+    решает уникальность в базе, а не граф."""
+    try:
+        with transaction.atomic():
+            Follow.objects.create(user=user, author=author)
+    except IntegrityError:
+        return False
+    return True
@@ -18,6 +18,22 @@ class PostForm(forms.ModelForm):
             "image": "Выберете картинку",
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # загрузку отклонил posts.uploads.ImageUploadHandler: полю
+        # картинки её не отдаём, а причину показываем как ошибку поля
+        image = self.files.get("image")
+        self.image_upload_error = getattr(image, "upload_error", None)
+        if self.image_upload_error:
+            self.files = self.files.copy()
+            del self.files["image"]
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if self.image_upload_error:
+            self.add_error("image", self.image_upload_error)
+        return cleaned_data
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
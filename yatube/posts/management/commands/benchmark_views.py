@@ -0,0 +1,75 @@
+import json
+import platform
+import subprocess
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import benchmark
+from posts.models import Comment, Follow, Group, Post, User
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Замеряет перцентили времени ответа и число SQL-запросов ленты, "
+        "профиля, ленты подписок и страницы поста; результат в JSON"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=50,
+            help="Сколько замеров сделать на каждую страницу",
+        )
+        parser.add_argument(
+            "--warmup",
+            type=int,
+            default=1,
+            help="Сколько запросов сделать до замеров, чтобы прогреть кэш",
+        )
+        parser.add_argument(
+            "--anonymous",
+            action="store_true",
+            help="Открывать страницы без входа на сайт",
+        )
+        parser.add_argument(
+            "--output", default="-", help="Файл для результата в JSON"
+        )
+
+    def handle(self, *args, **options):
+        report = {
+            "commit": current_commit(),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "dataset": {
+                "users": User.objects.count(),
+                "groups": Group.objects.count(),
+                "posts": Post.objects.count(),
+                "comments": Comment.objects.count(),
+                "follows": Follow.objects.count(),
+            },
+            "views": benchmark.run(
+                options["requests"], options["warmup"], options["anonymous"]
+            ),
+        }
+        text = json.dumps(report, ensure_ascii=False, indent=2) + "\n"
+        if options["output"] == "-":
+            self.stdout.write(text, ending="")
+            return
+        with open(options["output"], "w", encoding="utf-8") as output:
+            output.write(text)
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from posts import media
+
+
+class Command(BaseCommand):
+    help = "Удаляет картинки, на которые не ссылается ни один пост"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--grace",
+            type=int,
+            default=None,
+            help="Не трогать файлы, к которым обращались за последние "
+            "столько секунд (по умолчанию MEDIA_GC_GRACE_SECONDS)",
+        )
+
+    def handle(self, *args, **options):
+        removed = media.collect(options["grace"])
+        for name in removed:
+            self.stdout.write(name)
+        self.stdout.write(
+            self.style.SUCCESS(f"Удалено картинок: {len(removed)}")
+        )
@@ -0,0 +1,157 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+
+BATCH_SIZE = 500
+# страницы отрисовываются без кэша: иначе запросы лент, чьи фрагменты
+# уже в кэше, не выполнятся, а страницы с засеянными и потом
+# откатанными постами попадут в общий кэш сайта
+NO_CACHE = {
+    "default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}
+}
+# subquery — подзапрос с LIMIT (ограниченный подсчёт постов ленты), а
+# не таблица. SCAN ... USING INDEX — тоже полный просмотр, только по
+# индексу; допустим лишь в запросе с LIMIT: обход индекса по порядку
+# сортировки читает первые строки и останавливается
+FULL_SCAN = re.compile(r"\bSCAN (?:TABLE )?(?!subquery\b)(\w+)")
+INDEX_SCAN = re.compile(r"\bUSING (?:COVERING )?INDEX\b")
+LIMIT = re.compile(r"\bLIMIT\b")
+
+
+def is_full_scan(detail, sql):
+    if not FULL_SCAN.search(detail):
+        return False
+    return not (INDEX_SCAN.search(detail) and LIMIT.search(sql))
+
+
+class Rollback(Exception):
+    pass
+
+
+def seed(posts_amount):
+    User.objects.bulk_create(
+        (
+            User(username=f"explain-user-{i}")
+            for i in range(max(posts_amount // 10, 2))
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    Group.objects.bulk_create(
+        (
+            Group(title=f"{i}", slug=f"explain-group-{i}", description="-")
+            for i in range(max(posts_amount // 100, 1))
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    # SQLite не возвращает id из bulk_create
+    users = list(User.objects.filter(username__startswith="explain-user-"))
+    groups = list(Group.objects.filter(slug__startswith="explain-group-"))
+    Post.objects.bulk_create(
+        (
+            Post(
+                text=f"Пост {i}",
+                author=users[i % len(users)],
+                group=groups[i % len(groups)],
+            )
+            for i in range(posts_amount)
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    post = Post.objects.filter(author=users[0]).first()
+    Comment.objects.bulk_create(
+        (
+            Comment(post=post, author=users[i % len(users)], text=f"{i}")
+            for i in range(posts_amount // 10)
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    Follow.objects.bulk_create(
+        (Follow(user=users[0], author=author) for author in users[1:]),
+        batch_size=BATCH_SIZE,
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Выполняет EXPLAIN QUERY PLAN для SQL-запросов лент и страницы поста "
+        "и завершается с ошибкой, если какой-то запрос читает таблицу целиком"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--posts",
+            type=int,
+            default=0,
+            help=(
+                "Перед проверкой засеять базу N постами; все изменения "
+                "откатываются после проверки"
+            ),
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("EXPLAIN QUERY PLAN есть только в SQLite")
+        try:
+            with override_settings(CACHES=NO_CACHE), transaction.atomic():
+                if options["posts"]:
+                    seed(options["posts"])
+                full_scans = self.explain_views()
+                raise Rollback
+        except Rollback:
+            pass
+        if full_scans:
+            raise CommandError(
+                "Полный просмотр таблиц:\n" + "\n".join(full_scans)
+            )
+        self.stdout.write(self.style.SUCCESS("Полных просмотров таблиц нет"))
+
+    def sample_urls(self):
+        urls = [reverse("posts:index")]
+        group = Group.objects.filter(posts__isnull=False).first()
+        if group:
+            urls.append(reverse("posts:group_post", args=[group.slug]))
+        post = Post.objects.select_related("author").last()
+        if post:
+            urls.append(reverse("posts:profile", args=[post.author.username]))
+            urls.append(reverse("posts:post_detail", args=[post.pk]))
+        follow = Follow.objects.select_related("user").first()
+        reader = follow.user if follow else None
+        if reader:
+            urls.append(reverse("posts:follow_index"))
+        return urls, reader
+
+    def explain_views(self):
+        urls, reader = self.sample_urls()
+        client = Client()
+        if reader:
+            client.force_login(reader)
+        full_scans = []
+        for url in urls:
+            queries = []
+
+            def capture(execute, sql, params, many, context):
+                queries.append((sql, params))
+                return execute(sql, params, many, context)
+
+            with connection.execute_wrapper(capture):
+                client.get(url)
+            for sql, params in queries:
+                if not sql.lstrip().upper().startswith("SELECT"):
+                    continue
+                for detail in self.query_plan(sql, params):
+                    self.stdout.write(
+                        f"{url}: {detail}", self.style.SQL_KEYWORD
+                    )
+                    if is_full_scan(detail, sql):
+                        full_scans.append(f"{url}: {detail}\n    {sql}")
+        return full_scans
+
+    def query_plan(self, sql, params):
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            return [row[-1] for row in cursor.fetchall()]
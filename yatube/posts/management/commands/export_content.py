@@ -0,0 +1,31 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = "Выгружает пользователей, группы, посты, комментарии и подписки"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--output",
+            default="-",
+            help="Файл для выгрузки (по умолчанию стандартный вывод)",
+        )
+        parser.add_argument(
+            "--models",
+            nargs="+",
+            choices=transfer.MODELS,
+            default=transfer.MODELS,
+            help="Какие записи выгрузить (по умолчанию все)",
+        )
+
+    def handle(self, *args, **options):
+        lines = transfer.export_lines(options["models"])
+        if options["output"] == "-":
+            sys.stdout.writelines(lines)
+            return
+        with open(options["output"], "w", encoding="utf-8") as output:
+            output.writelines(lines)
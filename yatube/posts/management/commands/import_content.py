@@ -0,0 +1,40 @@
+import sys
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from posts import stats, transfer
+
+
+class Command(BaseCommand):
+    help = "Загружает выгрузку export_content пачками"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "path", help="Файл JSON Lines или - для стандартного ввода"
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Сколько записей сохранять за одну транзакцию",
+        )
+        parser.add_argument(
+            "--skip-rebuild",
+            action="store_true",
+            help="Не пересчитывать счётчики авторов и ленты подписок",
+        )
+
+    def handle(self, *args, **options):
+        if options["path"] == "-":
+            counts = transfer.import_lines(sys.stdin, options["batch_size"])
+        else:
+            with open(options["path"], encoding="utf-8") as lines:
+                counts = transfer.import_lines(lines, options["batch_size"])
+        if not options["skip_rebuild"]:
+            stats.rebuild_all()
+            call_command("rebuild_timelines", stdout=self.stdout)
+        loaded = ", ".join(
+            f"{model}: {count}" for model, count in counts.items()
+        )
+        self.stdout.write(self.style.SUCCESS(f"Загружено — {loaded}"))
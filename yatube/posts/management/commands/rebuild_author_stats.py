@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from posts import stats
+from posts.models import AuthorStats
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает счётчики постов, комментариев и подписок авторов"
+
+    def handle(self, *args, **options):
+        stats.rebuild_all()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Пересчитано: {AuthorStats.objects.count()} авторов"
+            )
+        )
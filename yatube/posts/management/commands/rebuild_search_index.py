@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import search
+from posts.models import Comment, Post
+
+
+class Command(BaseCommand):
+    help = "Пересобирает полнотекстовый индекс постов и комментариев"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Сколько записей вставлять в индекс за раз",
+        )
+
+    def handle(self, *args, **options):
+        if not search.has_index():
+            raise CommandError(
+                "Полнотекстовый индекс есть только на SQLite, "
+                "на этой базе поиск обходится без него"
+            )
+        search.rebuild_index(options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Проиндексировано постов: {Post.objects.count()}, "
+                f"комментариев: {Comment.objects.count()}"
+            )
+        )
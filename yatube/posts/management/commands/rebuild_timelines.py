@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from posts import timeline
+from posts.models import User
+
+
+class Command(BaseCommand):
+    help = "Пересобирает ленты подписок из подписок и постов"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "usernames",
+            nargs="*",
+            help="Пользователи, чьи ленты пересобрать (по умолчанию все)",
+        )
+
+    def handle(self, *args, **options):
+        users = User.objects.all()
+        if options["usernames"]:
+            users = users.filter(username__in=options["usernames"])
+        rebuilt = 0
+        for user_id in users.values_list("pk", flat=True).iterator():
+            timeline.rebuild_for_user(user_id)
+            rebuilt += 1
+        self.stdout.write(self.style.SUCCESS(f"Пересобрано лент: {rebuilt}"))
@@ -0,0 +1,59 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from posts import seeding, stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Засевает базу синтетическими пользователями, группами, постами, "
+        "комментариями и подписками со степенным распределением "
+        "популярности"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=100)
+        parser.add_argument("--groups", type=int, default=10)
+        parser.add_argument("--posts", type=int, default=1000)
+        parser.add_argument("--comments", type=int, default=5000)
+        parser.add_argument(
+            "--follows-per-user",
+            type=float,
+            default=10,
+            help="Среднее число подписок одного пользователя",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=None,
+            help="Зерно генератора, чтобы повторить тот же набор данных",
+        )
+        parser.add_argument(
+            "--prefix",
+            default="seed",
+            help="Префикс имён пользователей и slug групп",
+        )
+
+    def handle(self, *args, **options):
+        if options["users"] < 1 and options["posts"]:
+            raise CommandError("Для постов нужен хотя бы один пользователь")
+        with transaction.atomic():
+            seeding.seed(
+                users=options["users"],
+                groups=options["groups"],
+                posts=options["posts"],
+                comments=options["comments"],
+                follows_per_user=options["follows_per_user"],
+                random_seed=options["seed"],
+                prefix=options["prefix"],
+            )
+        stats.rebuild_all()
+        call_command("rebuild_timelines", stdout=self.stdout)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Создано пользователей: {options['users']}, "
+                f"групп: {options['groups']}, постов: {options['posts']}, "
+                f"комментариев: {options['comments']}"
+            )
+        )
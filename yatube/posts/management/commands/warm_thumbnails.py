@@ -0,0 +1,43 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = "Создаёт уменьшенные копии уже загруженных картинок постов"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=4,
+            help="Сколько миниатюр создавать параллельно (0 — по одной "
+            "в текущем потоке)",
+        )
+        parser.add_argument(
+            "--retry-failed",
+            action="store_true",
+            help="Снова попробовать картинки, которые не удалось обработать",
+        )
+
+    def handle(self, *args, **options):
+        if options["retry_failed"]:
+            Post.objects.filter(image_variants=thumbnails.FAILED).update(
+                image_variants=""
+            )
+        names = (
+            Post.objects.filter(image_variants="")
+            .exclude(image="")
+            .values_list("image", flat=True)
+            .distinct()
+            .iterator()
+        )
+        if options["workers"] < 1:
+            created = sum(map(thumbnails.generate, names))
+        else:
+            with ThreadPoolExecutor(max_workers=options["workers"]) as pool:
+                created = sum(pool.map(thumbnails.generate_in_worker, names))
+        self.stdout.write(self.style.SUCCESS(f"Создано миниатюр: {created}"))
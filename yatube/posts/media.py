@@ -0,0 +1,76 @@
+import os
+import posixpath
+import time
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from sorl.thumbnail import delete
+from sorl.thumbnail.images import ImageFile
+
+from .models import Post
+
+TRASH_SUFFIX = ".deleting"
+
+
+def image_storage():
+    return Post._meta.get_field("image").storage
+
+
+def release(name, grace=None):
+    """Удаляет файл картинки и его миниатюры, если на него больше не
+    ссылается ни один пост и к нему не обращались последние grace
+    секунд. Возвращает True, если файл удалён."""
+    if grace is None:
+        grace = settings.MEDIA_GC_GRACE_SECONDS
+    if not name or Post.objects.filter(image=name).exists():
+        return False
+    storage = image_storage()
+    try:
+        path = storage.path(name)
+    except SuspiciousFileOperation:
+        # файл лежит вне хранилища: удалять его не нам
+        return False
+    trash = path + TRASH_SUFFIX
+    # Переименование атомарно: загрузка того же содержимого после него
+    # не найдёт файл и запишет его заново, а загрузка до него обновит
+    # время изменения, и тогда файл возвращается на место.
+    try:
+        if time.time() - os.path.getmtime(path) < grace:
+            return False
+        os.replace(path, trash)
+    except FileNotFoundError:
+        return False
+    if time.time() - os.path.getmtime(trash) < grace:
+        os.replace(trash, path)
+        return False
+    os.remove(trash)
+    delete(ImageFile(name, storage), delete_file=False)
+    return True
+
+
+def stored_images(directory="posts"):
+    """Имена всех файлов картинок в хранилище."""
+    storage = image_storage()
+    if not storage.exists(directory):
+        return
+    directories, files = storage.listdir(directory)
+    for file_name in files:
+        if not file_name.endswith(TRASH_SUFFIX):
+            yield posixpath.join(directory, file_name)
+    for subdirectory in directories:
+        yield from stored_images(posixpath.join(directory, subdirectory))
+
+
+def collect(grace=None):
+    """Удаляет картинки, на которые не ссылается ни один пост.
+    Возвращает имена удалённых файлов."""
+    used = set(
+        Post.objects.exclude(image="")
+        .values_list("image", flat=True)
+        .distinct()
+    )
+    return [
+        name
+        for name in stored_images()
+        if name not in used and release(name, grace)
+    ]
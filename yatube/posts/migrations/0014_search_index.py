@@ -0,0 +1,41 @@
+from django.db import migrations
+
+# имена и схема таблиц записаны здесь, а не взяты из posts.search:
+# миграция должна делать то же самое, что бы ни стало с модулем.
+# Индекс заполняет обработчик post_migrate (posts.signals): основы слов
+# считает только текущий код поиска.
+POST_TABLE = 'posts_post_search'
+COMMENT_TABLE = 'posts_comment_search'
+
+
+def create_search_tables(apps, schema_editor):
+    # полнотекстовый индекс FTS5 есть только в SQLite
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        f"CREATE VIRTUAL TABLE {POST_TABLE} USING fts5("
+        "text, tokenize='unicode61 remove_diacritics 0', prefix='2 3')"
+    )
+    schema_editor.execute(
+        f"CREATE VIRTUAL TABLE {COMMENT_TABLE} USING fts5("
+        "text, post_id UNINDEXED, "
+        "tokenize='unicode61 remove_diacritics 0', prefix='2 3')"
+    )
+
+
+def drop_search_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(f"DROP TABLE {POST_TABLE}")
+    schema_editor.execute(f"DROP TABLE {COMMENT_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_content_addressed_images'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_tables, drop_search_tables),
+    ]
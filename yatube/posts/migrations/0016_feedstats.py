@@ -0,0 +1,44 @@
+# Generated by Django 2.2.16 on 2026-10-17 05:15
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_feed_stats(apps, schema_editor):
+    FeedStats = apps.get_model('posts', 'FeedStats')
+    Post = apps.get_model('posts', 'Post')
+    groups = (
+        Post.objects.exclude(group=None).values_list('group_id')
+        .annotate(total=Count('pk')).order_by()
+    )
+    FeedStats.objects.bulk_create(
+        [
+            FeedStats(feed='index', posts_count=Post.objects.count()),
+            *(
+                FeedStats(feed=f'group:{group_id}', posts_count=total)
+                for group_id, total in groups
+            ),
+        ]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_post_comment_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedStats',
+            fields=[
+                ('feed', models.CharField(max_length=64, primary_key=True, serialize=False, verbose_name='Лента')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Постов')),
+            ],
+            options={
+                'verbose_name': 'Статистика ленты',
+                'verbose_name_plural': 'Статистика лент',
+            },
+        ),
+        migrations.RunPython(fill_feed_stats, migrations.RunPython.noop),
+    ]
@@ -1,12 +1,55 @@
+import hashlib
+import secrets
+
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import models, transaction
+
+from .storage import ContentAddressedStorage
 
 User = get_user_model()
 
+FEED_FIELDS = (
+    "text",
+    "pub_date",
+    "modified",
+    "image",
+    "image_variants",
+    "author__username",
+    "author__first_name",
+    "author__last_name",
+    "group__slug",
+)
+
+
+class CountedModel(models.Model):
+    """Модель со счётчиками в posts.stats. Сигналы post_save меняют
+    счётчики в той же транзакции, что и сохранение: строка и счётчики
+    записываются вместе или не записываются совсем. Удаление Django и
+    так ведёт в транзакции вместе с сигналами."""
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get("using"), savepoint=False):
+            super().save(*args, **kwargs)
+
+
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        """Посты для лент: автор и группа одним JOIN, без колонок,
+        которые лента не показывает."""
+        return (
+            self.select_related("author", "group")
+            .only(*FEED_FIELDS)
+            .order_by("-pub_date")
+        )
 
-class Post(models.Model):
+
+class Post(CountedModel):
     text = models.TextField("Текст поста", help_text="Введите текст поста")
     pub_date = models.DateTimeField("Дата публикации", auto_now_add=True)
+    modified = models.DateTimeField("Дата изменения", auto_now=True)
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -22,7 +65,37 @@ class Post(models.Model):
         verbose_name="Группа",
         help_text="Выберите группу",
     )
-    image = models.ImageField("Картинка", upload_to="posts/", blank=True)
+    # по имени файла посты ищутся при удалении картинок и создании
+    # миниатюр (posts.media, posts.thumbnails): файл общий у постов с
+    # одинаковой картинкой
+    image = models.ImageField(
+        "Картинка",
+        upload_to="posts/",
+        blank=True,
+        db_index=True,
+        storage=ContentAddressedStorage(),
+    )
+    # JSON со списком уменьшенных копий картинки, см. posts.thumbnails
+    image_variants = models.TextField(
+        "Варианты картинки", blank=True, default="", editable=False
+    )
+    # меняется только через update() в сигналах, см. posts.stats
+    comment_count = models.PositiveIntegerField(
+        "Комментариев", default=0, editable=False
+    )
+
+    objects = PostQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-pub_date"], name="post_pub_date_idx"),
+            models.Index(
+                fields=["author", "-pub_date"], name="post_author_pub_date_idx"
+            ),
+            models.Index(
+                fields=["group", "-pub_date"], name="post_group_pub_date_idx"
+            ),
+        ]
 
     def __str__(self):
         return self.text[:15]
@@ -37,7 +110,7 @@ class Group(models.Model):
         return self.title
 
 
-class Comment(models.Model):
+class Comment(CountedModel):
     post = models.ForeignKey(
         Post,
         on_delete=models.CASCADE,
@@ -55,11 +128,18 @@ class Comment(models.Model):
     )
     created = models.DateTimeField("Дата публикации", auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["post", "-created"], name="comment_post_created_idx"
+            ),
+        ]
+
     def __str__(self):
         return self.text[:15]
 
 
-class Follow(models.Model):
+class Follow(CountedModel):
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -73,5 +153,140 @@ class Follow(models.Model):
         related_name="following",
     )
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "author"], name="unique_follow"
+            ),
+        ]
+
     def __str__(self):
         return f"{self.user}_to_{self.author}"
+
+
+class AuthorStats(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        verbose_name="Пользователь",
+        related_name="stats",
+    )
+    posts_count = models.PositiveIntegerField("Постов", default=0)
+    comments_count = models.PositiveIntegerField("Комментариев", default=0)
+    followers_count = models.PositiveIntegerField("Подписчиков", default=0)
+    following_count = models.PositiveIntegerField("Подписок", default=0)
+
+    class Meta:
+        verbose_name = "Статистика автора"
+        verbose_name_plural = "Статистика авторов"
+
+    def __str__(self):
+        return f"{self.user}: {self.posts_count}"
+
+    @classmethod
+    def for_user(cls, user):
+        """Счётчики пользователя одним запросом по первичному ключу."""
+        stats = cls.objects.filter(user=user).first()
+        return stats or cls(user=user)
+
+
+class FeedStats(models.Model):
+    """Число постов в лентах, у которых нет своих счётчиков: на главной
+    и в группах. Лента называется так же, как её версия в
+    posts.cache_versions."""
+
+    feed = models.CharField("Лента", max_length=64, primary_key=True)
+    posts_count = models.PositiveIntegerField("Постов", default=0)
+
+    class Meta:
+        verbose_name = "Статистика ленты"
+        verbose_name_plural = "Статистика лент"
+
+    def __str__(self):
+        return f"{self.feed}: {self.posts_count}"
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name="Читатель",
+        related_name="timeline",
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        verbose_name="Публикация",
+        related_name="timeline_entries",
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name="Автор",
+        related_name="+",
+    )
+    pub_date = models.DateTimeField("Дата публикации")
+
+    class Meta:
+        verbose_name = "Запись ленты подписок"
+        verbose_name_plural = "Записи лент подписок"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "post"], name="unique_timeline_post"
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["user", "-pub_date", "-post"],
+                name="timeline_user_pub_date_idx",
+            ),
+            models.Index(
+                fields=["user", "author"], name="timeline_user_author_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user}: {self.post_id}"
+
+
+class ApiToken(models.Model):
+    """Токен клиента JSON API (мобильного приложения, SPA). В базе
+    лежит только SHA-256 ключа: сам ключ клиент получает один раз, при
+    выдаче. У пользователя может быть по токену на каждый клиент."""
+
+    key = models.CharField("SHA-256 ключа", max_length=64, unique=True)
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name="Пользователь",
+        related_name="api_tokens",
+    )
+    created = models.DateTimeField("Выдан", auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Токен API"
+        verbose_name_plural = "Токены API"
+
+    def __str__(self):
+        return f"{self.user}: {self.key[:8]}"
+
+    @staticmethod
+    def digest(key):
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    @classmethod
+    def issue(cls, user):
+        """Создаёт токен и возвращает его ключ."""
+        key = secrets.token_urlsafe(32)
+        cls.objects.create(user=user, key=cls.digest(key))
+        return key
+
+    @classmethod
+    def find(cls, key):
+        """Токен активного пользователя по ключу или None."""
+        return (
+            cls.objects.select_related("user")
+            .filter(key=cls.digest(key), user__is_active=True)
+            .first()
+        )
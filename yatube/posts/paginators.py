@@ -0,0 +1,286 @@
+import base64
+import binascii
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+from . import links
+
+NEXT = "n"
+PREVIOUS = "p"
+COUNT_KEY_PREFIX = "posts:count:"
+
+
+def encode_cursor(direction, obj, date_field="pub_date"):
+    raw = f"{direction}|{getattr(obj, date_field).isoformat()}|{obj.pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Возвращает (направление, pub_date, id) или None, если курсор
+    повреждён."""
+    if not cursor:
+        return None
+    padding = "=" * (-len(cursor) % 4)
+    try:
+        raw = base64.urlsafe_b64decode(cursor + padding).decode()
+        direction, pub_date, pk = raw.split("|")
+        pub_date = parse_datetime(pub_date)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if direction not in (NEXT, PREVIOUS) or pub_date is None:
+        return None
+    return direction, pub_date, pk
+
+
+class CursorPage(Page):
+    """Страница ленты без номера и без общего количества записей."""
+
+    is_cursor_page = True
+
+    def __init__(self, object_list, paginator, next_cursor, previous_cursor):
+        super().__init__(object_list, None, paginator)
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return "<Cursor page>"
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+class StreamedPage:
+    """Страница курсорной ленты, которая читает записи из базы через
+    QuerySet.iterator() по мере обхода. Курсоры известны только после
+    того, как страница пройдена целиком."""
+
+    is_cursor_page = True
+
+    def __init__(self, paginator, queryset, has_previous):
+        self.paginator = paginator
+        self.queryset = queryset
+        self.has_previous = has_previous
+        self.next_cursor = None
+        self.previous_cursor = None
+
+    def __iter__(self):
+        per_page = self.paginator.per_page
+        date_field = self.paginator.date_field
+        last = None
+        for number, obj in enumerate(self.queryset.iterator()):
+            if number == per_page:
+                self.next_cursor = encode_cursor(NEXT, last, date_field)
+                break
+            if number == 0 and self.has_previous:
+                self.previous_cursor = encode_cursor(PREVIOUS, obj, date_field)
+            last = obj
+            yield obj
+
+
+class CursorPaginator(Paginator):
+    """Keyset-пагинация по (pub_date, id): стоимость страницы не зависит
+    от её глубины, COUNT(*) не выполняется."""
+
+    date_field = "pub_date"
+
+    def get_page(self, cursor):
+        decoded = decode_cursor(cursor)
+        if decoded is None:
+            return self._first_page()
+        direction, pub_date, pk = decoded
+        if direction == NEXT:
+            return self._page_after(pub_date, pk)
+        return self._page_before(pub_date, pk)
+
+    def stream_page(self, cursor):
+        """Страница для отдачи потоком (StreamedPage). Страница назад
+        читается целиком, как в get_page: её записи выбираются в
+        обратном порядке."""
+        decoded = decode_cursor(cursor)
+        if decoded is None:
+            queryset, has_previous = self._newest(), False
+        elif decoded[0] == NEXT:
+            queryset, has_previous = self._older(*decoded[1:]), True
+        else:
+            return self.get_page(cursor)
+        return StreamedPage(self, queryset[: self.per_page + 1], has_previous)
+
+    def _fetch(self, queryset):
+        return list(queryset[: self.per_page + 1])
+
+    def _newest(self):
+        return self.object_list.order_by(f"-{self.date_field}", "-id")
+
+    def _older(self, pub_date, pk):
+        return self.object_list.filter(
+            Q(**{f"{self.date_field}__lt": pub_date})
+            | Q(**{self.date_field: pub_date, "id__lt": pk})
+        ).order_by(f"-{self.date_field}", "-id")
+
+    def _first_page(self):
+        posts = self._fetch(self._newest())
+        return self._build(
+            posts[: self.per_page], len(posts) > self.per_page, False
+        )
+
+    def _page_after(self, pub_date, pk):
+        posts = self._fetch(self._older(pub_date, pk))
+        return self._build(
+            posts[: self.per_page], len(posts) > self.per_page, True
+        )
+
+    def _page_before(self, pub_date, pk):
+        posts = self._fetch(
+            self.object_list.filter(
+                Q(**{f"{self.date_field}__gt": pub_date})
+                | Q(**{self.date_field: pub_date, "id__gt": pk})
+            ).order_by(self.date_field, "id")
+        )
+        if not posts:
+            return self._first_page()
+        has_previous = len(posts) > self.per_page
+        posts = posts[: self.per_page]
+        posts.reverse()
+        return self._build(posts, True, has_previous)
+
+    def _build(self, posts, has_next, has_previous):
+        next_cursor = None
+        previous_cursor = None
+        if posts and has_next:
+            next_cursor = encode_cursor(NEXT, posts[-1], self.date_field)
+        if posts and has_previous:
+            previous_cursor = encode_cursor(
+                PREVIOUS, posts[0], self.date_field
+            )
+        return CursorPage(posts, self, next_cursor, previous_cursor)
+
+
+class CommentPaginator(CursorPaginator):
+    """Комментарии от новых к старым по (created, id)."""
+
+    date_field = "created"
+
+
+class LinkedPosts:
+    """Посты страницы ленты с готовыми адресами (posts.links). Адреса
+    добавляются при первом чтении постов, поэтому страница, чей фрагмент
+    нашёлся в кэше, не обращается к базе."""
+
+    def __init__(self, posts):
+        self.posts = posts
+
+    def __len__(self):
+        return len(self.posts)
+
+    def __iter__(self):
+        return iter(links.attach_urls(list(self.posts)))
+
+
+class FeedPaginator(Paginator):
+    """Постраничная навигация по ленте.
+
+    Число постов ленты кэшируется под count_key — именем ленты вместе с
+    её версией (posts.cache_versions), поэтому после создания или
+    удаления поста оно считается заново. Точно посты считаются, только
+    пока их не больше FEED_EXACT_COUNT_LIMIT: подсчёт останавливается на
+    этом пределе. Число постов большой ленты возвращает counter —
+    функция, которая читает поддерживаемый сигналами счётчик (см.
+    posts.stats). Если счётчик разошёлся с лентой и страница за этим
+    пределом оказалась пустой, число постов пересчитывается точно, а
+    вместо пустой страницы отдаётся последняя настоящая. Ссылки на страницы
+    ограничены окном вокруг текущей и крайними страницами."""
+
+    ELLIPSIS = "…"
+
+    def __init__(
+        self, object_list, per_page, count_key=None, counter=None, **kwargs
+    ):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_key = count_key
+        self.counter = counter
+
+    @cached_property
+    def count(self):
+        if self.count_key is None:
+            return self._count()
+        key = COUNT_KEY_PREFIX + self.count_key
+        count = cache.get(key)
+        if count is None:
+            count = self._count()
+            cache.set(key, count, settings.SECONDS_TO_CACHE_FEED)
+        return count
+
+    def page(self, number):
+        page = super().page(number)
+        # первые FEED_EXACT_COUNT_LIMIT постов точно есть, поэтому
+        # пустой может быть только страница дальше них
+        bottom = (page.number - 1) * self.per_page
+        if (
+            self.counter is None
+            or bottom <= settings.FEED_EXACT_COUNT_LIMIT
+            or len(page.object_list)
+        ):
+            return page
+        count = self.object_list.count()
+        self.__dict__["count"] = count
+        self.__dict__.pop("num_pages", None)
+        if self.count_key is not None:
+            cache.set(
+                COUNT_KEY_PREFIX + self.count_key,
+                count,
+                settings.SECONDS_TO_CACHE_FEED,
+            )
+        return super().page(min(page.number, self.num_pages))
+
+    def _count(self):
+        if self.counter is None:
+            return super().count
+        limit = settings.FEED_EXACT_COUNT_LIMIT
+        count_up_to = getattr(self.object_list, "count_up_to", None)
+        if count_up_to is not None:
+            count = count_up_to(limit + 1)
+        else:
+            count = self.object_list[: limit + 1].count()
+        if count <= limit:
+            return count
+        return self.counter()
+
+    def get_elided_page_range(self, number=1, on_each_side=2, on_ends=1):
+        """Номера страниц: on_ends первых и последних и on_each_side по
+        обе стороны от текущей; пропуски обозначены ELLIPSIS."""
+        number = self.validate_number(number)
+        num_pages = self.num_pages
+        if num_pages <= (on_each_side + on_ends) * 2:
+            return list(self.page_range)
+        pages = []
+        if number > on_ends + on_each_side + 2:
+            pages.extend(range(1, on_ends + 1))
+            pages.append(self.ELLIPSIS)
+            pages.extend(range(number - on_each_side, number + 1))
+        else:
+            pages.extend(range(1, number + 1))
+        if number < num_pages - on_ends - on_each_side - 1:
+            pages.extend(range(number + 1, number + on_each_side + 1))
+            pages.append(self.ELLIPSIS)
+            pages.extend(range(num_pages - on_ends + 1, num_pages + 1))
+        else:
+            pages.extend(range(number + 1, num_pages + 1))
+        return pages
+
+    def _get_page(self, object_list, number, paginator):
+        page = Page(LinkedPosts(object_list), number, paginator)
+        page.elided_page_range = self.get_elided_page_range(
+            number,
+            settings.PAGINATION_ON_EACH_SIDE,
+            settings.PAGINATION_ON_ENDS,
+        )
+        return page
@@ -0,0 +1,273 @@
+import re
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Comment, Post
+from .stemmer import stem
+
+POST_TABLE = "posts_post_search"
+COMMENT_TABLE = "posts_comment_search"
+# совпадение в комментарии весит меньше совпадения в тексте поста
+COMMENT_WEIGHT = 0.5
+SNIPPET_WORDS = 30
+WORD_RE = re.compile(r"\w+")
+
+
+def has_index():
+    """Таблицы FTS5 создаёт миграция 0014 только на SQLite; на других
+    базах индекса нет, и поиск идёт через icontains."""
+    return connection.vendor == "sqlite"
+
+
+def words(text):
+    return WORD_RE.findall(text.lower())
+
+
+def index_text(text):
+    """Текст для индекса: основы слов через пробел."""
+    return " ".join(stem(word) for word in words(text))
+
+
+def match_query(query):
+    """Запрос FTS5 из пользовательского ввода: все основы слов должны
+    найтись, каждая может оказаться началом слова в индексе."""
+    stems = [stem(word) for word in words(query)]
+    return " ".join(f'"{word}"*' for word in stems if word)
+
+
+def _insert_sql(table, columns):
+    placeholders = ", ".join(["%s"] * (len(columns) + 2))
+    names = ", ".join(["rowid", "text", *columns])
+    return f"INSERT INTO {table}({names}) VALUES ({placeholders})"
+
+
+def _replace(table, rowid, text, **extra):
+    if not has_index():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {table} WHERE rowid = %s", [rowid])
+        cursor.execute(
+            _insert_sql(table, list(extra)),
+            [rowid, index_text(text), *extra.values()],
+        )
+
+
+def _delete(table, rowid):
+    if not has_index():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {table} WHERE rowid = %s", [rowid])
+
+
+def index_post(post):
+    _replace(POST_TABLE, post.pk, post.text)
+
+
+def unindex_post(post_id):
+    _delete(POST_TABLE, post_id)
+
+
+def index_comment(comment):
+    _replace(COMMENT_TABLE, comment.pk, comment.text, post_id=comment.post_id)
+
+
+def unindex_comment(comment_id):
+    _delete(COMMENT_TABLE, comment_id)
+
+
+def _replace_many(table, columns, rows):
+    if not has_index():
+        return
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), 500):
+            stop = start + 500
+            chunk = rows[start:stop]
+            placeholders = ", ".join(["%s"] * len(chunk))
+            cursor.execute(
+                f"DELETE FROM {table} WHERE rowid IN ({placeholders})",
+                [row[0] for row in chunk],
+            )
+        cursor.executemany(_insert_sql(table, columns), rows)
+
+
+def index_posts(posts):
+    """Индексирует пачку постов, сохранённых в обход сигналов."""
+    _replace_many(
+        POST_TABLE, [], [[post.pk, index_text(post.text)] for post in posts]
+    )
+
+
+def index_comments(comments):
+    _replace_many(
+        COMMENT_TABLE,
+        ["post_id"],
+        [
+            [comment.pk, index_text(comment.text), comment.post_id]
+            for comment in comments
+        ],
+    )
+
+
+def rebuild(queryset, table, columns, batch_size=1000):
+    """Заново заполняет таблицу индекса из queryset пачками."""
+    insert_sql = _insert_sql(table, columns)
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {table}")
+        batch = []
+        for row in queryset.values_list("pk", "text", *columns).iterator():
+            pk, text, *extra = row
+            batch.append([pk, index_text(text), *extra])
+            if len(batch) == batch_size:
+                cursor.executemany(insert_sql, batch)
+                batch = []
+        if batch:
+            cursor.executemany(insert_sql, batch)
+        cursor.execute(f"INSERT INTO {table}({table}) VALUES ('optimize')")
+
+
+def rebuild_index(batch_size=1000):
+    """Заново заполняет индекс постов и комментариев."""
+    if not has_index():
+        return
+    with transaction.atomic():
+        rebuild(Post.objects.all(), POST_TABLE, [], batch_size)
+        rebuild(Comment.objects.all(), COMMENT_TABLE, ["post_id"], batch_size)
+
+
+def needs_filling():
+    """True, если таблицы индекса есть, но пусты, а посты — нет: так
+    бывает сразу после миграции 0014 на базе с постами."""
+    if not has_index():
+        return False
+    if POST_TABLE not in connection.introspection.table_names():
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT 1 FROM {POST_TABLE} LIMIT 1")
+        if cursor.fetchone():
+            return False
+    return Post.objects.exists()
+
+
+MATCHES_SQL = f"""
+    SELECT rowid AS post_id, bm25({POST_TABLE}) AS score
+    FROM {POST_TABLE} WHERE {POST_TABLE} MATCH %s
+    UNION ALL
+    SELECT post_id, bm25({COMMENT_TABLE}) * {COMMENT_WEIGHT}
+    FROM {COMMENT_TABLE} WHERE {COMMENT_TABLE} MATCH %s
+"""
+
+
+class SearchResults:
+    """Найденные посты от самых подходящих: последовательность для
+    Paginator, которая читает из индекса только нужную страницу.
+
+    Без индекса посты ищутся по вхождению основ слов в текст поста или
+    его комментариев и идут от новых к старым."""
+
+    def __init__(self, query):
+        self.query = query
+        self.match = match_query(query)
+        self._count = None
+
+    def fallback(self):
+        """Найденные посты без индекса: каждая основа должна найтись в
+        тексте поста или одного из его комментариев."""
+        condition = Q()
+        for word in words(self.query):
+            word = stem(word)
+            if word:
+                condition &= Q(text__icontains=word) | Q(
+                    pk__in=Comment.objects.filter(text__icontains=word).values(
+                        "post_id"
+                    )
+                )
+        return Post.objects.filter(condition).order_by("-pub_date", "-pk")
+
+    def count(self):
+        if self._count is None:
+            self._count = 0
+            if self.match and not has_index():
+                self._count = self.fallback().count()
+            elif self.match:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        f"SELECT COUNT(DISTINCT post_id) FROM ({MATCHES_SQL})",
+                        [self.match, self.match],
+                    )
+                    (self._count,) = cursor.fetchone()
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def matching_ids(self):
+        """Подзапрос с id всех найденных постов, для фильтра pk__in."""
+        if not has_index():
+            return self.fallback().values("pk")
+        return RawSQL(
+            f"SELECT post_id FROM ({MATCHES_SQL})", [self.match, self.match]
+        )
+
+    def post_ids(self, offset=0, limit=-1):
+        if not self.match:
+            return []
+        if not has_index():
+            post_ids = self.fallback().values_list("pk", flat=True)
+            stop = None if limit < 0 else offset + limit
+            return list(post_ids[offset:stop])
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT post_id FROM ({MATCHES_SQL}) GROUP BY post_id "
+                "ORDER BY MIN(score), post_id DESC LIMIT %s OFFSET %s",
+                [self.match, self.match, limit, offset],
+            )
+            return [post_id for (post_id,) in cursor.fetchall()]
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[slice(index, index + 1)][0]
+        offset = index.start or 0
+        limit = -1 if index.stop is None else index.stop - offset
+        post_ids = self.post_ids(offset, limit)
+        posts = Post.objects.for_feed().in_bulk(post_ids)
+        results = [posts[post_id] for post_id in post_ids if post_id in posts]
+        for post in results:
+            post.snippet = snippet(post.text, self.query)
+        return results
+
+
+def snippet(text, query, size=SNIPPET_WORDS):
+    """Отрывок текста вокруг первого совпадения, совпавшие слова
+    выделены тегом <mark>."""
+    stems = [stem(word) for word in words(query)]
+    found = list(WORD_RE.finditer(text))
+    hits = [
+        i
+        for i, match in enumerate(found)
+        if any(stem(match.group()).startswith(s) for s in stems if s)
+    ]
+    if not found:
+        return escape(text)
+    first = hits[0] if hits else 0
+    start = max(first - size // 3, 0)
+    stop = min(start + size, len(found))
+    begin = found[start].start() if start else 0
+    end = found[stop - 1].end() if stop < len(found) else len(text)
+    parts = ["…" if begin else ""]
+    position = begin
+    for i in hits:
+        if not start <= i < stop:
+            continue
+        match = found[i]
+        match_start = match.start()
+        parts.append(escape(text[position:match_start]))
+        parts.append(f"<mark>{escape(match.group())}</mark>")
+        position = match.end()
+    parts.append(escape(text[position:end]))
+    if end < len(text):
+        parts.append("…")
+    return mark_safe("".join(parts))
@@ -0,0 +1,182 @@
+"""Синтетические данные, похожие на боевые: у немногих авторов много
+постов и подписчиков, у большинства — единицы (степенное
+распределение), а комментарии собираются под популярными постами."""
+
+import random
+from datetime import timedelta
+
+from django.db.models import Max
+from django.utils import timezone
+
+from . import cache_versions, search
+from .models import Comment, Follow, Group, Post, User
+from .transfer import bulk_create_keeping_dates
+
+BATCH_SIZE = 1000
+# чем меньше показатель, тем сильнее перекос в сторону популярных
+PARETO_ALPHA = 1.2
+PERIOD = timedelta(days=365)
+WORDS = (
+    "город горы море река лес книга поход утро вечер кофе друзья музыка "
+    "фильм дорога поезд весна лето осень зима дождь снег солнце кошка "
+    "собака работа отпуск фотография рецепт сад дом велосипед"
+).split()
+
+
+class Seeder:
+    def __init__(self, seed=None, prefix="seed"):
+        self.random = random.Random(seed)
+        self.prefix = prefix
+        self.now = timezone.now()
+
+    def weights(self, amount):
+        """Веса популярности: распределение Парето, перемешанное, чтобы
+        популярность не зависела от порядка создания."""
+        weights = [
+            self.random.paretovariate(PARETO_ALPHA) for _ in range(amount)
+        ]
+        self.random.shuffle(weights)
+        return weights
+
+    def text(self, low, high):
+        return " ".join(
+            self.random.choices(WORDS, k=self.random.randint(low, high))
+        ).capitalize()
+
+    def date(self, after=None):
+        start = after or self.now - PERIOD
+        return start + (self.now - start) * self.random.random()
+
+    def next_pk(self, model):
+        return (model.objects.aggregate(pk=Max("pk"))["pk"] or 0) + 1
+
+    def users(self, amount):
+        first_pk = self.next_pk(User)
+        users = []
+        for i in range(amount):
+            user = User(
+                pk=first_pk + i, username=f"{self.prefix}-user-{first_pk + i}"
+            )
+            user.set_unusable_password()
+            users.append(user)
+        User.objects.bulk_create(users)
+        return [user.pk for user in users]
+
+    def groups(self, amount):
+        first_pk = self.next_pk(Group)
+        groups = [
+            Group(
+                pk=first_pk + i,
+                title=self.text(1, 3),
+                slug=f"{self.prefix}-group-{first_pk + i}",
+                description=self.text(5, 20),
+            )
+            for i in range(amount)
+        ]
+        Group.objects.bulk_create(groups)
+        return [group.pk for group in groups]
+
+    def posts(self, amount, author_ids, group_ids):
+        """Посты раскладываются по авторам и группам пропорционально
+        их популярности; у трети постов нет группы."""
+        author_weights = self.weights(len(author_ids))
+        group_weights = self.weights(len(group_ids)) if group_ids else None
+        pk = self.next_pk(Post)
+        post_dates = {}
+        for start in range(0, amount, BATCH_SIZE):
+            size = min(BATCH_SIZE, amount - start)
+            authors = self.random.choices(author_ids, author_weights, k=size)
+            posts = []
+            for author_id in authors:
+                group_id = None
+                if group_ids and self.random.random() > 1 / 3:
+                    (group_id,) = self.random.choices(group_ids, group_weights)
+                date = self.date()
+                posts.append(
+                    Post(
+                        pk=pk,
+                        text=self.text(5, 80),
+                        author_id=author_id,
+                        group_id=group_id,
+                        pub_date=date,
+                        modified=date,
+                    )
+                )
+                post_dates[pk] = date
+                pk += 1
+            bulk_create_keeping_dates(Post, posts, ["pub_date", "modified"])
+            search.index_posts(posts)
+        return post_dates
+
+    def comments(self, amount, post_dates, author_ids):
+        if not post_dates:
+            return
+        post_ids = list(post_dates)
+        post_weights = self.weights(len(post_ids))
+        pk = self.next_pk(Comment)
+        for start in range(0, amount, BATCH_SIZE):
+            size = min(BATCH_SIZE, amount - start)
+            comments = []
+            for post_id in self.random.choices(post_ids, post_weights, k=size):
+                comments.append(
+                    Comment(
+                        pk=pk,
+                        post_id=post_id,
+                        author_id=self.random.choice(author_ids),
+                        text=self.text(1, 30),
+                        created=self.date(after=post_dates[post_id]),
+                    )
+                )
+                pk += 1
+            bulk_create_keeping_dates(Comment, comments, ["created"])
+            search.index_comments(comments)
+
+    def follows(self, per_user, user_ids):
+        """Каждый пользователь подписывается в среднем на per_user
+        авторов, выбирая популярных чаще: число подписчиков
+        распределено по степенному закону."""
+        if len(user_ids) < 2:
+            return
+        author_weights = self.weights(len(user_ids))
+        follows = []
+        for user_id in user_ids:
+            amount = min(
+                int(self.random.expovariate(1 / per_user)) if per_user else 0,
+                len(user_ids) - 1,
+            )
+            authors = set()
+            for _ in range(amount * 3):
+                if len(authors) == amount:
+                    break
+                (author_id,) = self.random.choices(user_ids, author_weights)
+                if author_id != user_id:
+                    authors.add(author_id)
+            follows.extend(
+                Follow(user_id=user_id, author_id=author_id)
+                for author_id in authors
+            )
+            if len(follows) >= BATCH_SIZE:
+                Follow.objects.bulk_create(follows, ignore_conflicts=True)
+                follows = []
+        Follow.objects.bulk_create(follows, ignore_conflicts=True)
+
+
+def seed(
+    users=100,
+    groups=10,
+    posts=1000,
+    comments=5000,
+    follows_per_user=10,
+    random_seed=None,
+    prefix="seed",
+):
+    """Создаёт синтетические данные. Сигналы bulk_create не отправляет:
+    поисковый индекс заполняется здесь же, а счётчики авторов и ленты
+    подписок нужно пересобрать после."""
+    seeder = Seeder(random_seed, prefix)
+    user_ids = seeder.users(users)
+    group_ids = seeder.groups(groups)
+    post_dates = seeder.posts(posts, user_ids, group_ids)
+    seeder.comments(comments, post_dates, user_ids)
+    seeder.follows(follows_per_user, user_ids)
+    cache_versions.bump(cache_versions.INDEX, cache_versions.CARDS)
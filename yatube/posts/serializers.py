@@ -0,0 +1,64 @@
+"""Представление постов и комментариев в JSON для API и подгрузки
+комментариев."""
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+# поля постов, которые читает API, — для QuerySet.only()
+POST_FIELDS = (
+    "text",
+    "pub_date",
+    "modified",
+    "image",
+    "comment_count",
+    "author__username",
+    "author__first_name",
+    "author__last_name",
+    "group__slug",
+)
+COMMENT_FIELDS = ("text", "created", "post", "author__username")
+
+
+def author_data(user):
+    return {"username": user.username, "name": user.get_full_name()}
+
+
+def post_data(post):
+    return {
+        "id": post.pk,
+        "text": post.text,
+        "pub_date": post.pub_date,
+        "modified": post.modified,
+        "author": author_data(post.author),
+        "group": post.group.slug if post.group_id else None,
+        "image": post.image.url if post.image else None,
+        "comment_count": post.comment_count,
+    }
+
+
+def comment_data(comment):
+    return {
+        "id": comment.pk,
+        "author": comment.author.username,
+        "text": comment.text,
+        "created": comment.created,
+    }
+
+
+def stream_page(items, serialize, **extra):
+    """JSON-объект {"results": [...], **extra} по частям: каждый элемент
+    кодируется отдельно и сразу уходит клиенту, весь ответ целиком в
+    памяти не собирается. Значения extra, заданные функциями,
+    вычисляются после results — например, курсоры страницы, которая
+    читается из базы по ходу обхода."""
+    encode = DjangoJSONEncoder(ensure_ascii=False).encode
+    yield '{"results": ['
+    for number, item in enumerate(items):
+        if number:
+            yield ", "
+        yield encode(serialize(item))
+    yield "]"
+    for key, value in extra.items():
+        if callable(value):
+            value = value()
+        yield f", {encode(key)}: {encode(value)}"
+    yield "}"
@@ -0,0 +1,251 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import (
+    post_delete,
+    post_migrate,
+    post_save,
+    pre_save,
+)
+from django.dispatch import receiver
+
+from . import cache_versions, media, search, stats, thumbnails, timeline
+from .models import (
+    AuthorStats,
+    Comment,
+    FeedStats,
+    Follow,
+    Group,
+    Post,
+    User,
+)
+
+# поля пользователя, которые выводятся в карточках и комментариях
+NAME_FIELDS = ("username", "first_name", "last_name")
+
+
+@receiver(post_save, sender=Post)
+def count_created_post(sender, instance, created, **kwargs):
+    if created:
+        stats.increment(instance.author_id, "posts_count")
+        stats.add_feed_posts(stats.post_feeds(instance.group_id), 1)
+        return
+    previous_group_id = getattr(instance, "_previous_group_id", None)
+    if previous_group_id != instance.group_id:
+        stats.move_post(previous_group_id, instance.group_id)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    stats.decrement(instance.author_id, "posts_count")
+    stats.add_feed_posts(stats.post_feeds(instance.group_id), -1)
+
+
+@receiver(post_delete, sender=Group)
+def drop_group_feed_count(sender, instance, **kwargs):
+    FeedStats.objects.filter(
+        feed=cache_versions.group_feed(instance.pk)
+    ).delete()
+
+
+@receiver(post_save, sender=Comment)
+def count_created_comment(sender, instance, created, **kwargs):
+    if created:
+        stats.increment(instance.author_id, "comments_count")
+        stats.add_comments(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    stats.decrement(instance.author_id, "comments_count")
+    stats.add_comments(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def count_created_follow(sender, instance, created, **kwargs):
+    if created:
+        stats.increment(instance.author_id, "followers_count")
+        stats.increment(instance.user_id, "following_count")
+
+
+@receiver(post_delete, sender=Follow)
+def count_deleted_follow(sender, instance, **kwargs):
+    stats.decrement(instance.author_id, "followers_count")
+    stats.decrement(instance.user_id, "following_count")
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, **kwargs):
+    if created:
+        timeline.fan_out(instance)
+
+
+@receiver(post_save, sender=Post)
+def schedule_thumbnail(sender, instance, update_fields=None, **kwargs):
+    # пост, обновлённый после создания миниатюр, снова не ставим
+    if update_fields is not None and "image" not in update_fields:
+        return
+    if not instance.image_variants:
+        thumbnails.schedule(instance.image)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, **kwargs):
+    if created and not timeline.is_popular(instance.author_id):
+        timeline.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def drop_from_timeline(sender, instance, **kwargs):
+    timeline.drop(instance.user_id, instance.author_id)
+    # автор опустился до порога: его посты больше не подмешиваются
+    # при чтении, поэтому их нужно разложить по лентам подписчиков
+    dropped_to_limit = AuthorStats.objects.filter(
+        user_id=instance.author_id,
+        followers_count=settings.TIMELINE_FANOUT_LIMIT,
+    ).exists()
+    if dropped_to_limit:
+        timeline.backfill_followers(instance.author_id)
+
+
+@receiver(pre_save, sender=Post)
+def remember_previous_state(sender, instance, **kwargs):
+    previous = (
+        Post.objects.filter(pk=instance.pk)
+        .values_list("group_id", "image")
+        .first()
+        if instance.pk
+        else None
+    )
+    previous_group_id, previous_image = previous or (None, "")
+    instance._previous_group_id = previous_group_id
+    instance._previous_image = previous_image
+    # варианты старой картинки не подходят к новой
+    if previous and instance.image.name != previous_image:
+        instance.image_variants = ""
+
+
+@receiver(post_save, sender=Post)
+def release_replaced_image(sender, instance, **kwargs):
+    previous_image = getattr(instance, "_previous_image", "")
+    if previous_image and previous_image != instance.image.name:
+        transaction.on_commit(lambda: media.release(previous_image))
+
+
+@receiver(post_delete, sender=Post)
+def release_deleted_image(sender, instance, **kwargs):
+    name = instance.image.name
+    if name:
+        transaction.on_commit(lambda: media.release(name))
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_feeds(sender, instance, **kwargs):
+    feeds = [
+        cache_versions.INDEX,
+        cache_versions.author_feed(instance.author_id),
+        cache_versions.post_page(instance.pk),
+    ]
+    for group_id in {
+        instance.group_id,
+        getattr(instance, "_previous_group_id", None),
+    }:
+        if group_id:
+            feeds.append(cache_versions.group_feed(group_id))
+    cache_versions.bump(*feeds)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_post_page(sender, instance, **kwargs):
+    cache_versions.bump(cache_versions.post_page(instance.post_id))
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group(sender, instance, **kwargs):
+    cache_versions.bump(
+        cache_versions.CARDS, cache_versions.group_feed(instance.pk)
+    )
+
+
+@receiver(pre_save, sender=User)
+def remember_previous_names(sender, instance, update_fields=None, **kwargs):
+    # вход на сайт сохраняет только last_login: имена не читаем
+    instance._previous_names = None
+    if instance.pk and (
+        update_fields is None or set(NAME_FIELDS) & set(update_fields)
+    ):
+        instance._previous_names = (
+            User.objects.filter(pk=instance.pk)
+            .values_list(*NAME_FIELDS)
+            .first()
+        )
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_pages(sender, instance, **kwargs):
+    """Имя автора выводится в карточках его постов. Карточки кэшируются
+    вместе с именем, поэтому после смены имени нужно обновить страницы,
+    на которых они лежат; смена username меняет и комментарии."""
+    previous = getattr(instance, "_previous_names", None)
+    names = tuple(getattr(instance, field) for field in NAME_FIELDS)
+    if previous is None or previous == names:
+        return
+    group_ids = (
+        Post.objects.filter(author_id=instance.pk)
+        .exclude(group=None)
+        .values_list("group_id", flat=True)
+        .distinct()
+    )
+    feeds = [
+        cache_versions.INDEX,
+        cache_versions.author_feed(instance.pk),
+        *map(cache_versions.group_feed, group_ids),
+    ]
+    if previous[0] != instance.username:
+        post_ids = (
+            Comment.objects.filter(author_id=instance.pk)
+            .values_list("post_id", flat=True)
+            .distinct()
+        )
+        feeds.extend(map(cache_versions.post_page, post_ids))
+    cache_versions.bump(*feeds)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow_feed(sender, instance, **kwargs):
+    cache_versions.bump(
+        cache_versions.follow_feed(instance.user_id),
+        cache_versions.followees(instance.user_id),
+        cache_versions.followers(instance.author_id),
+    )
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or "text" in update_fields:
+        search.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    search.unindex_post(instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+def index_comment(sender, instance, **kwargs):
+    search.index_comment(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def unindex_comment(sender, instance, **kwargs):
+    search.unindex_comment(instance.pk)
+
+
+@receiver(post_migrate)
+def fill_search_index(sender, **kwargs):
+    # таблицы индекса создаёт миграция, а заполняет текущий код поиска
+    if sender.name == "posts" and search.needs_filling():
+        search.rebuild_index()
@@ -0,0 +1,156 @@
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from . import cache_versions
+from .models import AuthorStats, Comment, FeedStats, Follow, Post, User
+
+
+def increment(user_id, field):
+    with transaction.atomic():
+        _, created = AuthorStats.objects.get_or_create(user_id=user_id)
+        if created:
+            rebuild_for_user(user_id)
+        else:
+            AuthorStats.objects.filter(user_id=user_id).update(
+                **{field: F(field) + 1}
+            )
+
+
+def decrement(user_id, field):
+    # строку не создаём: при каскадном удалении пользователя её уже нет
+    AuthorStats.objects.filter(user_id=user_id, **{f"{field}__gt": 0}).update(
+        **{field: F(field) - 1}
+    )
+
+
+def add_comments(post_id, amount):
+    """Меняет Post.comment_count на amount одним UPDATE, не трогая
+    остальные поля поста."""
+    posts = Post.objects.filter(pk=post_id)
+    if amount < 0:
+        posts = posts.filter(comment_count__gte=-amount)
+    posts.update(comment_count=F("comment_count") + amount)
+
+
+def add_feed_posts(feeds, amount):
+    """Меняет счётчики постов лент на amount. Счётчиков, которых ещё
+    нет, не заводит: их посчитает первое чтение (feed_posts_count)."""
+    rows = FeedStats.objects.filter(feed__in=feeds)
+    if amount < 0:
+        rows = rows.filter(posts_count__gte=-amount)
+    rows.update(posts_count=F("posts_count") + amount)
+
+
+def post_feeds(group_id):
+    """Ленты со своими счётчиками постов, в которых виден пост."""
+    feeds = [cache_versions.INDEX]
+    if group_id:
+        feeds.append(cache_versions.group_feed(group_id))
+    return feeds
+
+
+def move_post(from_group_id, to_group_id):
+    """Переносит пост между счётчиками групп, когда у него меняется
+    группа."""
+    if from_group_id:
+        add_feed_posts([cache_versions.group_feed(from_group_id)], -1)
+    if to_group_id:
+        add_feed_posts([cache_versions.group_feed(to_group_id)], 1)
+
+
+def feed_posts_count(feed, posts):
+    """Число постов ленты по счётчику; при первом обращении счётчик
+    заводится подсчётом posts."""
+    count = (
+        FeedStats.objects.filter(feed=feed)
+        .values_list("posts_count", flat=True)
+        .first()
+    )
+    if count is None:
+        count = posts.count()
+        FeedStats.objects.bulk_create(
+            [FeedStats(feed=feed, posts_count=count)], ignore_conflicts=True
+        )
+    return count
+
+
+def followed_posts_count(user_id):
+    """Число постов в ленте подписок: сумма постов авторов, на которых
+    подписан читатель."""
+    total = AuthorStats.objects.filter(
+        user__following__user_id=user_id
+    ).aggregate(total=Sum("posts_count"))["total"]
+    return total or 0
+
+
+def rebuild_feed_counts():
+    groups = _counts_by(Post.objects.exclude(group=None), "group_id")
+    with transaction.atomic():
+        FeedStats.objects.all().delete()
+        FeedStats.objects.bulk_create(
+            [
+                FeedStats(
+                    feed=cache_versions.INDEX,
+                    posts_count=Post.objects.count(),
+                ),
+                *(
+                    FeedStats(
+                        feed=cache_versions.group_feed(group_id),
+                        posts_count=count,
+                    )
+                    for group_id, count in groups.items()
+                ),
+            ]
+        )
+
+
+def rebuild_comment_counts():
+    counts = (
+        Comment.objects.filter(post=OuterRef("pk"))
+        .order_by()
+        .values("post")
+        .annotate(total=Count("pk"))
+        .values("total")
+    )
+    Post.objects.update(comment_count=Coalesce(Subquery(counts), 0))
+
+
+def rebuild_for_user(user_id):
+    AuthorStats.objects.filter(user_id=user_id).update(
+        posts_count=Post.objects.filter(author_id=user_id).count(),
+        comments_count=Comment.objects.filter(author_id=user_id).count(),
+        followers_count=Follow.objects.filter(author_id=user_id).count(),
+        following_count=Follow.objects.filter(user_id=user_id).count(),
+    )
+
+
+def _counts_by(queryset, field):
+    return dict(
+        queryset.values_list(field).annotate(total=Count("pk")).order_by()
+    )
+
+
+def rebuild_all():
+    """Пересчитывает счётчики всех пользователей, лент и комментариев
+    постов с нуля."""
+    rebuild_comment_counts()
+    rebuild_feed_counts()
+    posts = _counts_by(Post.objects.all(), "author_id")
+    comments = _counts_by(Comment.objects.all(), "author_id")
+    followers = _counts_by(Follow.objects.all(), "author_id")
+    following = _counts_by(Follow.objects.all(), "user_id")
+    with transaction.atomic():
+        AuthorStats.objects.all().delete()
+        AuthorStats.objects.bulk_create(
+            (
+                AuthorStats(
+                    user_id=user_id,
+                    posts_count=posts.get(user_id, 0),
+                    comments_count=comments.get(user_id, 0),
+                    followers_count=followers.get(user_id, 0),
+                    following_count=following.get(user_id, 0),
+                )
+                for user_id in User.objects.values_list("pk", flat=True)
+            ),
+        )
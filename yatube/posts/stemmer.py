@@ -0,0 +1,126 @@
+"""Стеммер русского языка по алгоритму Snowball (Портера).
+
+Описание алгоритма: https://snowballstem.org/algorithms/russian/stemmer.html
+"""
+
+from functools import lru_cache
+
+VOWELS = "аеиоуыэюя"
+
+PERFECTIVE_GERUND_1 = ("вшись", "вши", "в")
+PERFECTIVE_GERUND_2 = ("ившись", "ывшись", "ивши", "ывши", "ив", "ыв")
+ADJECTIVE = (
+    "ими", "ыми", "его", "ого", "ему", "ому",
+    "ее", "ие", "ые", "ое", "ей", "ий", "ый", "ой", "ем", "им", "ым",
+    "ом", "их", "ых", "ую", "юю", "ая", "яя", "ою", "ею",
+)  # fmt: skip
+PARTICIPLE_1 = ("ем", "нн", "вш", "ющ", "щ")
+PARTICIPLE_2 = ("ивш", "ывш", "ующ")
+REFLEXIVE = ("ся", "сь")
+VERB_1 = (
+    "ете", "йте", "ешь", "нно",
+    "ла", "на", "ли", "ем", "ло", "но", "ет", "ют", "ны", "ть",
+    "й", "л", "н",
+)  # fmt: skip
+VERB_2 = (
+    "ейте", "уйте",
+    "ила", "ыла", "ена", "ите", "или", "ыли", "ило", "ыло", "ено", "ует",
+    "уют", "ены", "ить", "ыть", "ишь",
+    "ей", "уй", "ил", "ыл", "им", "ым", "ен", "ят", "ит", "ыт", "ую",
+    "ю",
+)  # fmt: skip
+NOUN = (
+    "иями", "ями", "ами", "ией", "иям", "ием", "иях",
+    "ев", "ов", "ие", "ье", "еи", "ии", "ей", "ой", "ий", "ям", "ем",
+    "ам", "ом", "ах", "ях", "ию", "ью", "ия", "ья",
+    "а", "е", "и", "й", "о", "у", "ы", "ь", "ю", "я",
+)  # fmt: skip
+SUPERLATIVE = ("ейше", "ейш")
+DERIVATIONAL = ("ость", "ост")
+
+
+def _regions(word):
+    """Начала областей RV и R2."""
+    rv = len(word)
+    for i, letter in enumerate(word):
+        if letter in VOWELS:
+            rv = i + 1
+            break
+    r1 = _region_after(word, 0)
+    r2 = _region_after(word, r1)
+    return rv, r2
+
+
+def _region_after(word, start):
+    for i in range(start + 1, len(word)):
+        if word[i] not in VOWELS and word[i - 1] in VOWELS:
+            return i + 1
+    return len(word)
+
+
+@lru_cache(maxsize=None)
+def _by_length(endings):
+    return sorted(endings, key=len, reverse=True)
+
+
+def _longest(word, start, endings):
+    """Самое длинное окончание из endings в word[start:] или None."""
+    for ending in _by_length(endings):
+        if word.endswith(ending) and len(word) - len(ending) >= start:
+            return ending
+    return None
+
+
+def _remove(word, start, group_1=(), group_2=()):
+    """Убирает окончание. Окончания первой группы убираются, только если
+    перед ними стоит «а» или «я»; сама буква остаётся."""
+    candidates = []
+    ending = _longest(word, start + 1, group_1)
+    if ending and word[-len(ending) - 1] in "ая":
+        candidates.append(ending)
+    ending = _longest(word, start, group_2)
+    if ending:
+        candidates.append(ending)
+    if not candidates:
+        return word, False
+    ending = max(candidates, key=len)
+    return word[: -len(ending)], True
+
+
+# словарь живого текста невелик, а индексация и поиск стеммят одни и
+# те же слова снова и снова
+@lru_cache(maxsize=100_000)
+def stem(word):
+    word = word.lower().replace("ё", "е")
+    rv, r2 = _regions(word)
+
+    # шаг 1
+    word, removed = _remove(word, rv, PERFECTIVE_GERUND_1, PERFECTIVE_GERUND_2)
+    if not removed:
+        word, _ = _remove(word, rv, group_2=REFLEXIVE)
+        word, removed = _remove(word, rv, group_2=ADJECTIVE)
+        if removed:
+            word, _ = _remove(word, rv, PARTICIPLE_1, PARTICIPLE_2)
+        else:
+            word, removed = _remove(word, rv, VERB_1, VERB_2)
+            if not removed:
+                word, _ = _remove(word, rv, group_2=NOUN)
+
+    # шаг 2
+    if word.endswith("и") and len(word) - 1 >= rv:
+        word = word[:-1]
+
+    # шаг 3
+    word, _ = _remove(word, r2, group_2=DERIVATIONAL)
+
+    # шаг 4
+    if word.endswith("нн") and len(word) - 2 >= rv:
+        word = word[:-1]
+    else:
+        word, removed = _remove(word, rv, group_2=SUPERLATIVE)
+        if removed:
+            if word.endswith("нн") and len(word) - 2 >= rv:
+                word = word[:-1]
+        elif word.endswith("ь") and len(word) - 1 >= rv:
+            word = word[:-1]
+    return word
@@ -0,0 +1,40 @@
+import hashlib
+import os
+import posixpath
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранилище, в котором имя файла — хэш его содержимого:
+    posts/ab/ab12...ef.jpg. Одинаковые загрузки сохраняются один раз и
+    делят между собой миниатюры, которые sorl.thumbnail привязывает к
+    имени исходного файла.
+
+    Файл не удаляется, пока на него ссылается хотя бы один пост, см.
+    posts.media.release."""
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        digest = digest.hexdigest()
+        extension = os.path.splitext(name)[1].lower()
+        name = posixpath.join(
+            posixpath.dirname(name), digest[:2], digest + extension
+        )
+        try:
+            # продлеваем жизнь файла: сборщик мусора не тронет файл,
+            # к которому только что обращались
+            os.utime(self.path(name))
+            return name
+        except FileNotFoundError:
+            return super().save(name, content, max_length)
@@ -0,0 +1,34 @@
+from urllib.parse import quote
+
+from django import template
+
+from .. import thumbnails
+
+register = template.Library()
+
+# ширина карточки: на широких экранах не больше 960px
+SIZES = "(min-width: 992px) 960px, 100vw"
+# заглушка размером с карточку, пока вариантов нет или их не удалось
+# создать: оригинал может весить мегабайты, его не отдаём
+PLACEHOLDER = "data:image/svg+xml," + quote(
+    '<svg xmlns="http://www.w3.org/2000/svg" '
+    f'width="{thumbnails.WIDTH}" height="{thumbnails.HEIGHT}">'
+    '<rect width="100%" height="100%" fill="#e9ecef"/></svg>'
+)
+
+
+@register.inclusion_tag("posts/includes/thumbnail.html")
+def post_thumbnail(post):
+    """Картинка поста с вариантами разных размеров и форматов, если они
+    уже созданы, иначе заглушка того же размера. Варианты создаются при
+    сохранении поста (posts.thumbnails), а не при показе."""
+    variants = thumbnails.srcsets(post.image_variants)
+    return {
+        "post": post,
+        "webp": variants.get("webp"),
+        "jpeg": variants.get("jpeg"),
+        "sizes": SIZES,
+        "placeholder": PLACEHOLDER,
+        "width": thumbnails.WIDTH,
+        "height": thumbnails.HEIGHT,
+    }
@@ -0,0 +1,226 @@
+import json
+
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import ApiToken, Comment, Follow, Group, Post, User
+
+POSTS_AMOUNT = 7
+PAGE_SIZE = 3
+
+
+def read_json(response):
+    if response.streaming:
+        return json.loads(b"".join(response.streaming_content))
+    return response.json()
+
+
+@override_settings(CONST_POST_ON_PAGE=PAGE_SIZE)
+class ApiTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username="author", first_name="Лев", last_name="Толстой"
+        )
+        cls.reader = User.objects.create_user(username="reader")
+        cls.group = Group.objects.create(
+            title="Группа", slug="group", description="Описание"
+        )
+        cls.posts = [
+            Post.objects.create(
+                text=f"Пост {i}", author=cls.author, group=cls.group
+            )
+            for i in range(POSTS_AMOUNT)
+        ]
+        cls.posts.reverse()
+        cls.post = cls.posts[0]
+        Comment.objects.create(post=cls.post, author=cls.reader, text="Ок")
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def read_feed(self, client, url, **params):
+        """Все страницы ленты по курсорам."""
+        ids = []
+        cursor = None
+        while True:
+            if cursor:
+                params["cursor"] = cursor
+            response = client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response["Content-Type"], "application/json")
+            data = read_json(response)
+            ids.extend(post["id"] for post in data["results"])
+            cursor = data["next_cursor"]
+            if cursor is None:
+                return ids
+
+    def test_feeds(self):
+        """Ленты листаются курсором от новых постов к старым."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        expected = [post.pk for post in self.posts]
+        feeds = {
+            "api:index": [],
+            "api:group_posts": [self.group.slug],
+            "api:profile_posts": [self.author.username],
+            "api:follow_posts": [],
+        }
+        for name, args in feeds.items():
+            with self.subTest(feed=name):
+                url = reverse(name, args=args)
+                self.assertEqual(
+                    self.read_feed(self.reader_client, url), expected
+                )
+
+    def test_limit(self):
+        url = reverse("api:index")
+        response = self.client.get(url, {"limit": 2})
+        self.assertEqual(len(read_json(response)["results"]), 2)
+        with override_settings(API_MAX_PAGE_SIZE=5):
+            response = self.client.get(url, {"limit": 1000})
+        self.assertEqual(len(read_json(response)["results"]), 5)
+
+    def test_feed_page_fields(self):
+        """Страница ленты — один запрос постов с автором и группой."""
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("api:index"))
+            data = read_json(response)
+        self.assertEqual(
+            data["results"][0],
+            {
+                "id": self.post.pk,
+                "text": self.post.text,
+                "pub_date": data["results"][0]["pub_date"],
+                "modified": data["results"][0]["modified"],
+                "author": {"username": "author", "name": "Лев Толстой"},
+                "group": "group",
+                "image": None,
+                "comment_count": 1,
+            },
+        )
+        self.assertIsNone(data["previous_cursor"])
+
+    def test_post_detail(self):
+        response = self.client.get(
+            reverse("api:post_detail", args=[self.post.pk])
+        )
+        data = response.json()
+        self.assertEqual(data["id"], self.post.pk)
+        self.assertEqual(
+            data["comments"], reverse("api:comments", args=[self.post.pk])
+        )
+
+    def test_comments(self):
+        """Комментарий создаётся из JSON и появляется первым в списке."""
+        url = reverse("api:comments", args=[self.post.pk])
+        response = self.reader_client.post(
+            url, {"text": "Новый"}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["text"], "Новый")
+        data = read_json(self.client.get(url))
+        self.assertEqual(
+            [comment["text"] for comment in data["results"]], ["Новый", "Ок"]
+        )
+
+    def test_comment_errors(self):
+        url = reverse("api:comments", args=[self.post.pk])
+        response = self.client.post(url, {"text": "Гость"})
+        self.assertEqual(response.status_code, 401)
+        response = self.reader_client.post(
+            url, {"text": ""}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("text", response.json()["errors"])
+        response = self.reader_client.post(
+            url, "[", content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.post.comments.count(), 1)
+
+    def test_follow_and_unfollow(self):
+        url = reverse("api:follow", args=[self.author.username])
+        response = self.reader_client.post(url)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.reader_client.post(url).status_code, 200)
+        self.assertTrue(
+            Follow.objects.filter(user=self.reader, author=self.author)
+        )
+        self.assertEqual(self.reader_client.delete(url).status_code, 204)
+        self.assertFalse(
+            Follow.objects.filter(user=self.reader, author=self.author)
+        )
+        self.assertEqual(self.reader_client.delete(url).status_code, 404)
+        own = reverse("api:follow", args=[self.reader.username])
+        self.assertEqual(self.reader_client.post(own).status_code, 400)
+
+    def test_writes_need_csrf_token(self):
+        """API пишет только с CSRF-токеном сессии, как формы сайта."""
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.reader)
+        url = reverse("api:follow", args=[self.author.username])
+        self.assertEqual(client.post(url).status_code, 403)
+        client.get(reverse("posts:post_create"))
+        token = client.cookies["csrftoken"].value
+        response = client.post(url, HTTP_X_CSRFTOKEN=token)
+        self.assertEqual(response.status_code, 201)
+
+    def test_token_auth(self):
+        """Клиент вне сайта получает токен по паролю и пишет с ним без
+        CSRF; отозванный и неверный токены не принимаются."""
+        # копия из базы: self.reader общий у тестов класса
+        reader = User.objects.get(pk=self.reader.pk)
+        reader.set_password("secret")
+        reader.save()
+        client = Client(enforce_csrf_checks=True)
+        url = reverse("api:token")
+        response = client.post(
+            url,
+            {"username": "reader", "password": "wrong"},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 400)
+        response = client.post(
+            url,
+            {"username": "reader", "password": "secret"},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 201)
+        key = response.json()["token"]
+        self.assertFalse(ApiToken.objects.filter(key=key).exists())
+        auth = {"HTTP_AUTHORIZATION": f"Token {key}"}
+
+        response = client.post(
+            reverse("api:follow", args=[self.author.username]), **auth
+        )
+        self.assertEqual(response.status_code, 201)
+        response = client.get(reverse("api:follow_posts"), **auth)
+        self.assertEqual(len(read_json(response)["results"]), PAGE_SIZE)
+        response = client.get(
+            reverse("api:follow_posts"), HTTP_AUTHORIZATION="Token wrong"
+        )
+        self.assertEqual(response.status_code, 401)
+
+        self.assertEqual(client.delete(url, **auth).status_code, 204)
+        response = client.get(reverse("api:follow_posts"), **auth)
+        self.assertEqual(response.status_code, 401)
+
+    def test_errors_are_json(self):
+        cases = (
+            (self.client.get, reverse("api:follow_posts"), 401),
+            (self.client.post, reverse("api:index"), 405),
+            (self.client.get, reverse("api:post_detail", args=[10**6]), 404),
+            (
+                self.client.get,
+                reverse("api:group_posts", args=["missing"]),
+                404,
+            ),
+        )
+        for method, url, status in cases:
+            with self.subTest(url=url):
+                response = method(url)
+                self.assertEqual(response.status_code, status)
+                self.assertIn("detail", response.json())
@@ -0,0 +1,181 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import cache_versions
+from ..models import Comment, Follow, Group, Post, User
+
+
+class CacheInvalidationTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="author")
+        cls.reader = User.objects.create_user(username="reader")
+        cls.group = Group.objects.create(
+            title="Test title", slug="test-slug", description="-"
+        )
+        cls.other_group = Group.objects.create(
+            title="Other title", slug="other-slug", description="-"
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.post = Post.objects.create(
+            text="text", author=cls.author, group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def assertBumped(self, action, *names, bumped=True):
+        before = cache_versions.get_versions(*names)
+        action()
+        after = cache_versions.get_versions(*names)
+        for name in names:
+            with self.subTest(name=name):
+                if bumped:
+                    self.assertNotEqual(before[name], after[name])
+                else:
+                    self.assertEqual(before[name], after[name])
+
+    def test_new_post_bumps_all_its_feeds(self):
+        """Новый пост меняет версии главной, группы и автора, но не
+        версии лент подписок каждого подписчика."""
+        self.assertBumped(
+            lambda: Post.objects.create(
+                text="new", author=self.author, group=self.group
+            ),
+            cache_versions.INDEX,
+            cache_versions.group_feed(self.group.pk),
+            cache_versions.author_feed(self.author.pk),
+        )
+        self.assertBumped(
+            lambda: Post.objects.create(text="new", author=self.author),
+            cache_versions.follow_feed(self.reader.pk),
+            bumped=False,
+        )
+
+    def test_author_rename_refreshes_cards(self):
+        """Новое имя автора сразу видно в карточках его постов, а вход
+        на сайт версий не меняет."""
+        urls = [
+            reverse("posts:index"),
+            reverse("posts:group_post", args=[self.group.slug]),
+            reverse("posts:profile", args=[self.author.username]),
+        ]
+        client = Client()
+        for url in urls:
+            client.get(url)
+        author = User.objects.get(pk=self.author.pk)
+        author.first_name = "Новое"
+        author.last_name = "Имя"
+        author.save()
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertContains(client.get(url), "Новое Имя")
+        self.assertBumped(
+            lambda: Client().force_login(author),
+            cache_versions.INDEX,
+            cache_versions.author_feed(author.pk),
+            bumped=False,
+        )
+
+    def test_moving_post_bumps_both_groups(self):
+        """Перенос поста в другую группу меняет версии обеих групп."""
+        post = Post.objects.create(
+            text="new", author=self.author, group=self.group
+        )
+
+        def move():
+            post.group = self.other_group
+            post.save()
+
+        self.assertBumped(
+            move,
+            cache_versions.group_feed(self.group.pk),
+            cache_versions.group_feed(self.other_group.pk),
+            cache_versions.post_page(post.pk),
+        )
+
+    def test_deleted_post_bumps_its_feeds(self):
+        """Удаление поста меняет версии его лент."""
+        post = Post.objects.create(
+            text="new", author=self.author, group=self.group
+        )
+        self.assertBumped(
+            post.delete,
+            cache_versions.INDEX,
+            cache_versions.group_feed(self.group.pk),
+            cache_versions.author_feed(self.author.pk),
+        )
+
+    def test_comment_bumps_post_page_only(self):
+        """Комментарий меняет версию страницы поста, но не лент."""
+        self.assertBumped(
+            lambda: Comment.objects.create(
+                post=self.post, author=self.reader, text="text"
+            ),
+            cache_versions.post_page(self.post.pk),
+        )
+        self.assertBumped(
+            lambda: Comment.objects.create(
+                post=self.post, author=self.reader, text="text"
+            ),
+            cache_versions.INDEX,
+            bumped=False,
+        )
+
+    def test_group_change_bumps_cards(self):
+        """Изменение группы меняет версию карточек и ленты группы."""
+
+        group = Group.objects.create(title="-", slug="slug", description="-")
+
+        def rename():
+            group.slug = "new-slug"
+            group.save()
+
+        self.assertBumped(
+            rename,
+            cache_versions.CARDS,
+            cache_versions.group_feed(group.pk),
+        )
+
+    def test_follow_and_unfollow_bump_follow_feed(self):
+        """Подписка и отписка меняют версию ленты подписок читателя."""
+        follow_feed = cache_versions.follow_feed(self.author.pk)
+        follow = None
+
+        def subscribe():
+            nonlocal follow
+            follow = Follow.objects.create(
+                user=self.author, author=self.reader
+            )
+
+        self.assertBumped(subscribe, follow_feed)
+        self.assertBumped(lambda: follow.delete(), follow_feed)
+
+    def test_evicted_version_is_not_reused(self):
+        """Вытесненная из кэша версия заменяется новой."""
+        before = cache_versions.version(cache_versions.INDEX)
+        cache.delete(cache_versions.KEY_PREFIX + cache_versions.INDEX)
+        self.assertNotEqual(
+            cache_versions.version(cache_versions.INDEX), before
+        )
+
+    def test_new_post_is_visible_immediately(self):
+        """Новый пост сразу виден на закэшированных лентах."""
+        client = Client()
+        client.force_login(self.reader)
+        urls = [
+            reverse("posts:index"),
+            reverse("posts:group_post", args=[self.group.slug]),
+            reverse("posts:profile", args=[self.author.username]),
+            reverse("posts:follow_index"),
+        ]
+        for url in urls:
+            client.get(url)
+        Post.objects.create(
+            text="fresh post", author=self.author, group=self.group
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertContains(client.get(url), "fresh post")
@@ -0,0 +1,108 @@
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .. import stats
+from ..models import Comment, Post, User
+
+COMMENTS_ON_PAGE = 3
+
+
+@override_settings(COMMENTS_ON_PAGE=COMMENTS_ON_PAGE)
+class CommentPaginationTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username="author")
+        cls.post = Post.objects.create(text="Пост", author=cls.author)
+        cls.comments = [
+            Comment.objects.create(
+                post=cls.post,
+                author=User.objects.create_user(username=f"reader{i}"),
+                text=f"Комментарий {i}",
+            )
+            for i in range(COMMENTS_ON_PAGE * 2 + 1)
+        ]
+        # от новых к старым
+        cls.comments.reverse()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_comment_count_follows_changes(self):
+        """Счётчик комментариев поста меняется при добавлении и
+        удалении и пересчитывается с нуля."""
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, len(self.comments))
+        Comment.objects.get(pk=self.comments[0].pk).delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, len(self.comments) - 1)
+        Post.objects.update(comment_count=100)
+        stats.rebuild_all()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, len(self.comments) - 1)
+
+    def test_post_page_shows_first_comments(self):
+        """На странице поста только первая порция комментариев, авторы
+        загружаются тем же запросом."""
+        url = reverse("posts:post_detail", args=[self.post.pk])
+        with self.assertNumQueries(4):
+            response = self.client.get(url)
+        page = response.context["comments_page"]
+        self.assertEqual(list(page), self.comments[:COMMENTS_ON_PAGE])
+        self.assertTrue(page.has_next())
+        self.assertContains(response, "Комментарии: 7")
+        self.assertContains(
+            response,
+            reverse("posts:comments", args=[self.post.pk])
+            + f"?cursor={page.next_cursor}",
+        )
+
+    def test_load_more_fragment_and_json(self):
+        """Следующие порции отдаются фрагментом HTML и в JSON, пока
+        комментарии не кончатся."""
+        url = reverse("posts:comments", args=[self.post.pk])
+        response = self.client.get(url)
+        page = response.context["comments_page"]
+        self.assertTemplateUsed(response, "posts/includes/comments.html")
+        self.assertNotContains(response, "<html")
+
+        seen = list(page)
+        cursor = page.next_cursor
+        while cursor:
+            response = self.client.get(
+                url, {"cursor": cursor, "format": "json"}
+            )
+            data = response.json()
+            seen.extend(
+                Comment.objects.get(pk=item["id"]) for item in data["comments"]
+            )
+            cursor = data["next_cursor"]
+        self.assertEqual(seen, self.comments)
+        self.assertEqual(
+            data["comments"][-1],
+            {
+                "id": self.comments[-1].pk,
+                "author": self.comments[-1].author.username,
+                "text": self.comments[-1].text,
+                "created": DjangoJSONEncoder().default(
+                    self.comments[-1].created
+                ),
+            },
+        )
+
+    def test_without_javascript_next_page_opens_on_post_page(self):
+        first = self.client.get(
+            reverse("posts:post_detail", args=[self.post.pk])
+        )
+        cursor = first.context["comments_page"].next_cursor
+        response = self.client.get(
+            reverse("posts:post_detail", args=[self.post.pk]),
+            {"comments": cursor},
+        )
+        second_page = self.comments[COMMENTS_ON_PAGE:][:COMMENTS_ON_PAGE]
+        self.assertEqual(list(response.context["comments_page"]), second_page)
+
+    def test_missing_post(self):
+        response = self.client.get(reverse("posts:comments", args=[10**6]))
+        self.assertEqual(response.status_code, 404)
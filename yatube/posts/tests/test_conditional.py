@@ -0,0 +1,113 @@
+from http import HTTPStatus
+
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, User
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="author")
+        cls.reader = User.objects.create_user(username="reader")
+        cls.group = Group.objects.create(
+            title="Test title", slug="test-slug", description="-"
+        )
+        cls.post = Post.objects.create(
+            text="text", author=cls.author, group=cls.group
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def urls(self):
+        return [
+            reverse("posts:index"),
+            reverse("posts:group_post", args=[self.group.slug]),
+            reverse("posts:profile", args=[self.author.username]),
+            reverse("posts:post_detail", args=[self.post.pk]),
+            reverse("posts:follow_index"),
+        ]
+
+    def revalidate(self, url, response, client=None):
+        return (client or self.reader_client).get(
+            url, HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+
+    def test_unchanged_pages_are_not_modified(self):
+        """Повторный запрос с тем же ETag получает 304 без шаблонов."""
+        for url in self.urls():
+            with self.subTest(url=url):
+                # первый ответ с формой выставляет CSRF-cookie
+                self.reader_client.get(url)
+                response = self.reader_client.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertIn("Last-Modified", response)
+                self.assertIn("private", response["Cache-Control"])
+                response = self.revalidate(url, response)
+                self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+                self.assertEqual(response.templates, [])
+                self.assertEqual(response.content, b"")
+
+    def test_last_modified_revalidation(self):
+        """Без ETag страница сверяется по Last-Modified."""
+        url = reverse("posts:index")
+        response = self.client.get(url)
+        response = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"]
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_new_post_changes_feeds(self):
+        """Новый пост меняет ETag всех лент, где он виден."""
+        responses = {url: self.reader_client.get(url) for url in self.urls()}
+        Post.objects.create(text="new", author=self.author, group=self.group)
+        for url, response in responses.items():
+            with self.subTest(url=url):
+                self.assertEqual(
+                    self.revalidate(url, response).status_code, HTTPStatus.OK
+                )
+
+    def test_comment_changes_post_page(self):
+        """Новый комментарий меняет ETag страницы поста."""
+        url = reverse("posts:post_detail", args=[self.post.pk])
+        response = self.client.get(url)
+        Comment.objects.create(post=self.post, author=self.reader, text="c")
+        self.assertEqual(
+            self.revalidate(url, response, self.client).status_code,
+            HTTPStatus.OK,
+        )
+
+    def test_etag_depends_on_user(self):
+        """У гостя и пользователя разные ETag одной страницы."""
+        url = reverse("posts:index")
+        response = self.client.get(url)
+        self.assertEqual(
+            self.revalidate(url, response).status_code, HTTPStatus.OK
+        )
+
+    def test_unfollow_changes_profile(self):
+        """Отписка меняет ETag профиля автора у читателя."""
+        url = reverse("posts:profile", args=[self.author.username])
+        response = self.reader_client.get(url)
+        Follow.objects.filter(user=self.reader).delete()
+        self.assertEqual(
+            self.revalidate(url, response).status_code, HTTPStatus.OK
+        )
+
+    def test_missing_objects_still_404(self):
+        """Для несуществующих объектов проверка не мешает 404."""
+        for url in (
+            reverse("posts:group_post", args=["missing"]),
+            reverse("posts:profile", args=["missing"]),
+            reverse("posts:post_detail", args=[0]),
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
@@ -0,0 +1,94 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import follow_graph
+from ..models import Follow, User
+
+
+class FollowGraphTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username="reader")
+        cls.authors = [
+            User.objects.create_user(username=f"author{i}") for i in range(4)
+        ]
+        for author in cls.authors[:2]:
+            Follow.objects.create(user=cls.reader, author=author)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_ids_are_sorted_and_cached(self):
+        """Подписки и подписчики читаются из базы один раз."""
+        expected = sorted(author.pk for author in self.authors[:2])
+        self.assertEqual(
+            list(follow_graph.followee_ids(self.reader.pk)), expected
+        )
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                list(follow_graph.followee_ids(self.reader.pk)), expected
+            )
+        self.assertEqual(
+            list(follow_graph.follower_ids(self.authors[0].pk)),
+            [self.reader.pk],
+        )
+        self.assertEqual(list(follow_graph.followee_ids(None)), [])
+
+    def test_is_following_many(self):
+        author_ids = [author.pk for author in self.authors]
+        follow_graph.followee_ids(self.reader.pk)
+        with self.assertNumQueries(0):
+            followed = follow_graph.is_following_many(
+                self.reader.pk, author_ids + [10**6]
+            )
+        self.assertEqual(followed, set(author_ids[:2]))
+        self.assertTrue(
+            follow_graph.is_following(self.reader.pk, author_ids[0])
+        )
+        self.assertFalse(
+            follow_graph.is_following(self.reader.pk, author_ids[2])
+        )
+
+    def test_follow_changes_invalidate_graph(self):
+        """Подписка и отписка сразу видны в графе обоих пользователей."""
+        author = self.authors[2]
+        self.assertFalse(follow_graph.is_following(self.reader.pk, author.pk))
+        self.assertEqual(list(follow_graph.follower_ids(author.pk)), [])
+        self.assertTrue(follow_graph.follow(self.reader, author))
+        self.assertTrue(follow_graph.is_following(self.reader.pk, author.pk))
+        self.assertEqual(
+            list(follow_graph.follower_ids(author.pk)), [self.reader.pk]
+        )
+        self.assertFalse(follow_graph.follow(self.reader, author))
+        Follow.objects.get(user=self.reader, author=author).delete()
+        self.assertFalse(follow_graph.is_following(self.reader.pk, author.pk))
+        self.assertEqual(list(follow_graph.follower_ids(author.pk)), [])
+
+    def test_follow_ignores_stale_graph(self):
+        """Подписку пишет база, даже если граф считает её уже
+        существующей."""
+        author = self.authors[2]
+        with mock.patch.object(
+            follow_graph, "is_following", return_value=True
+        ):
+            self.assertTrue(follow_graph.follow(self.reader, author))
+        self.assertTrue(
+            Follow.objects.filter(user=self.reader, author=author).exists()
+        )
+
+    def test_api_following(self):
+        client = Client()
+        client.force_login(self.reader)
+        author_ids = [author.pk for author in self.authors]
+        url = reverse("api:following")
+        response = client.get(
+            url, {"authors": ",".join(map(str, reversed(author_ids)))}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"following": author_ids[1::-1]})
+        response = client.get(url, {"authors": "1,x"})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Client().get(url).status_code, 401)
@@ -0,0 +1,101 @@
+import hashlib
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+
+from .. import media, thumbnails
+from ..models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b"\x47\x49\x46\x38\x39\x61\x02\x00"
+    b"\x01\x00\x80\x00\x00\x00\x00\x00"
+    b"\xff\xff\xff\x21\xf9\x04\x00\x00"
+    b"\x00\x00\x00\x2c\x00\x00\x00\x00"
+    b"\x02\x00\x01\x00\x00\x02\x02\x0c"
+    b"\x0a\x00\x3b"
+)
+
+
+def upload(name="small.gif"):
+    return SimpleUploadedFile(name, SMALL_GIF, content_type="image/gif")
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ContentAddressedMediaTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="author")
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def create_post(self, image):
+        return Post.objects.create(text="text", author=self.user, image=image)
+
+    def test_identical_uploads_share_one_file(self):
+        """Одинаковые загрузки хранятся в одном файле, названном по хэшу
+        содержимого, и делят миниатюры."""
+        first = self.create_post(upload("first.gif"))
+        second = self.create_post(upload("second.GIF"))
+        digest = hashlib.sha256(SMALL_GIF).hexdigest()
+        self.assertEqual(first.image.name, f"posts/{digest[:2]}/{digest}.gif")
+        self.assertEqual(second.image.name, first.image.name)
+        self.assertEqual(list(media.stored_images()), [first.image.name])
+
+        self.assertTrue(thumbnails.generate(first.image.name))
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(second.image_variants, first.image_variants)
+
+    def test_file_is_kept_while_referenced(self):
+        """Файл удаляется только вместе с последним постом."""
+        first = self.create_post(upload())
+        second = self.create_post(upload())
+        name = first.image.name
+        first.delete()
+        self.assertFalse(media.release(name, grace=0))
+        self.assertTrue(first.image.storage.exists(name))
+
+        second.delete()
+        self.assertTrue(media.release(name, grace=0))
+        self.assertFalse(first.image.storage.exists(name))
+
+    def test_recently_used_file_is_kept(self):
+        """Файл, к которому недавно обращались, не удаляется."""
+        post = self.create_post(upload())
+        name = post.image.name
+        post.delete()
+        self.assertFalse(media.release(name, grace=3600))
+        self.assertTrue(post.image.storage.exists(name))
+
+    def test_upload_after_release_stores_file_again(self):
+        """После удаления файла та же загрузка сохраняет его заново."""
+        post = self.create_post(upload())
+        name = post.image.name
+        post.delete()
+        media.release(name, grace=0)
+        post = self.create_post(upload())
+        self.assertEqual(post.image.name, name)
+        self.assertTrue(post.image.storage.exists(name))
+
+    def test_collect_removes_orphans(self):
+        """Сборщик удаляет только файлы, на которые нет ссылок."""
+        post = self.create_post(upload())
+        storage = post.image.storage
+        orphan = storage.save(
+            "posts/orphan.gif", SimpleUploadedFile("orphan.gif", b"orphan")
+        )
+        self.assertEqual(media.collect(grace=0), [orphan])
+        self.assertFalse(storage.exists(orphan))
+        self.assertTrue(storage.exists(post.image.name))
+
+    def test_files_outside_storage_are_left_alone(self):
+        """Картинки вне хранилища сборщик не трогает."""
+        self.assertFalse(media.release("/tmp/outside.jpg", grace=0))
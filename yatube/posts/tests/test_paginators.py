@@ -0,0 +1,214 @@
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import cache_versions
+from ..models import Group, Post, User
+from ..paginators import (
+    CursorPage,
+    CursorPaginator,
+    FeedPaginator,
+    decode_cursor,
+)
+
+CREATED_POST_AMOUNT = 25
+CONST_POST_ON_PAGE = 10
+
+
+class CursorPaginatorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="testusername")
+        Post.objects.bulk_create(
+            Post(text=f"{i} Test post text", author=cls.user)
+            for i in range(CREATED_POST_AMOUNT)
+        )
+        # одинаковая дата у всех постов: порядок задаёт только id
+        Post.objects.update(pub_date=timezone.now())
+        cls.ordered = list(Post.objects.order_by("-pub_date", "-id"))
+
+    def setUp(self):
+        self.paginator = CursorPaginator(
+            Post.objects.order_by("-pub_date"), CONST_POST_ON_PAGE
+        )
+        cache.clear()
+
+    def test_walk_forward_and_back(self):
+        """Курсоры next/previous обходят ленту без пропусков и повторов."""
+        first = self.paginator.get_page(None)
+        self.assertFalse(first.has_previous())
+        second = self.paginator.get_page(first.next_cursor)
+        third = self.paginator.get_page(second.next_cursor)
+        self.assertFalse(third.has_next())
+        self.assertEqual(
+            list(first) + list(second) + list(third), self.ordered
+        )
+        back = self.paginator.get_page(third.previous_cursor)
+        self.assertEqual(list(back), list(second))
+        back = self.paginator.get_page(back.previous_cursor)
+        self.assertEqual(list(back), list(first))
+        self.assertFalse(back.has_previous())
+
+    def test_streamed_pages_match_pages(self):
+        """Страница потоком читает базу только при обходе и даёт те же
+        записи и курсоры, что и обычная."""
+        cursor = None
+        while True:
+            with self.assertNumQueries(0):
+                streamed = self.paginator.stream_page(cursor)
+            with self.assertNumQueries(1):
+                posts = list(streamed)
+            page = self.paginator.get_page(cursor)
+            self.assertEqual(posts, list(page))
+            self.assertEqual(streamed.next_cursor, page.next_cursor)
+            self.assertEqual(streamed.previous_cursor, page.previous_cursor)
+            if page.next_cursor is None:
+                break
+            cursor = page.next_cursor
+        back = self.paginator.stream_page(page.previous_cursor)
+        self.assertEqual(list(back), self.ordered[10:20])
+
+    def test_invalid_cursor_returns_first_page(self):
+        """Повреждённый курсор приводит к первой странице."""
+        for cursor in ("", "garbage", "bnx8MjAyMA"):
+            with self.subTest(cursor=cursor):
+                self.assertIsNone(decode_cursor(cursor))
+                page = self.paginator.get_page(cursor)
+                self.assertEqual(list(page), self.ordered[:10])
+
+    def test_page_costs_one_query_at_any_depth(self):
+        """Страница любой глубины — один запрос без COUNT(*)."""
+        page = self.paginator.get_page(None)
+        while page.has_next():
+            with self.assertNumQueries(1):
+                page = self.paginator.get_page(page.next_cursor)
+                list(page)
+
+    def test_feed_view_uses_cursor_mode(self):
+        """Параметр cursor переключает ленту в курсорный режим."""
+        client = Client()
+        response = client.get(reverse("posts:index") + "?cursor=")
+        page_obj = response.context["page_obj"]
+        self.assertIsInstance(page_obj, CursorPage)
+        self.assertEqual(len(page_obj), CONST_POST_ON_PAGE)
+        self.assertContains(response, f"?cursor={page_obj.next_cursor}")
+        self.assertNotContains(response, "?page=")
+
+
+class FeedPaginatorTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.group = Group.objects.create(
+            title="Группа", slug="group-1", description="Описание"
+        )
+        for username in ("простой", "user.name+tag@mail"):
+            author = User.objects.create_user(username=username)
+            Post.objects.create(text="Текст", author=author, group=cls.group)
+            Post.objects.create(text="Без группы", author=author)
+
+    def test_posts_get_precomputed_urls(self):
+        """Адреса в карточках совпадают с теми, что строит reverse()."""
+        page = FeedPaginator(Post.objects.for_feed(), 10).get_page(1)
+        for post in page:
+            with self.subTest(post=post.pk):
+                self.assertEqual(
+                    post.detail_url,
+                    reverse("posts:post_detail", args=[post.pk]),
+                )
+                self.assertEqual(
+                    post.author_url,
+                    reverse("posts:profile", args=[post.author.username]),
+                )
+                expected = None
+                if post.group_id:
+                    expected = reverse("posts:group_post", args=["group-1"])
+                self.assertEqual(post.group_url, expected)
+
+    def test_page_is_read_only_when_rendered(self):
+        """Пока посты страницы не нужны (фрагмент ленты взят из кэша),
+        страница не обращается к базе."""
+        paginator = FeedPaginator(Post.objects.for_feed(), 10)
+        self.assertEqual(paginator.count, 4)
+        with self.assertNumQueries(0):
+            page = paginator.get_page(1)
+            page.has_next()
+        with self.assertNumQueries(1):
+            self.assertEqual(len(list(page)), 4)
+
+    def test_elided_page_range(self):
+        """Ссылки — на крайние страницы и окно вокруг текущей."""
+        paginator = FeedPaginator(range(1000), 10)
+        cases = {
+            1: [1, 2, 3, "…", 100],
+            4: [1, 2, 3, 4, 5, 6, "…", 100],
+            50: [1, "…", 48, 49, 50, 51, 52, "…", 100],
+            100: [1, "…", 98, 99, 100],
+        }
+        for number, expected in cases.items():
+            with self.subTest(number=number):
+                self.assertEqual(
+                    paginator.get_elided_page_range(number), expected
+                )
+        small = FeedPaginator(range(50), 10)
+        self.assertEqual(small.get_elided_page_range(3), [1, 2, 3, 4, 5])
+
+    def test_count_is_cached_per_key(self):
+        with self.assertNumQueries(1):
+            FeedPaginator(
+                Post.objects.order_by("pk"), 10, count_key="feed:1"
+            ).count
+        with self.assertNumQueries(0):
+            count = FeedPaginator(
+                Post.objects.order_by("pk"), 10, count_key="feed:1"
+            ).count
+        self.assertEqual(count, 4)
+
+    @override_settings(FEED_EXACT_COUNT_LIMIT=2)
+    def test_drifted_counter_does_not_give_empty_pages(self):
+        """Если счётчик насчитал лишнее, вместо пустой страницы за
+        пределом точного подсчёта отдаётся последняя настоящая, а число
+        постов пересчитывается."""
+
+        def paginator():
+            return FeedPaginator(
+                Post.objects.for_feed(),
+                1,
+                count_key="feed:1",
+                counter=lambda: 30,
+            )
+
+        self.assertEqual(paginator().count, 30)
+        with self.assertNumQueries(0):
+            paginator().get_page(3)
+        page = paginator().get_page(30)
+        self.assertEqual(page.number, 4)
+        self.assertEqual(len(page), 1)
+        self.assertFalse(page.has_next())
+        self.assertEqual(paginator().count, 4)
+
+    @override_settings(CONST_POST_ON_PAGE=1)
+    def test_feed_links_only_window_of_pages(self):
+        """Новый пост меняет версию ленты, и число постов считается
+        заново."""
+        url = reverse("posts:index")
+        response = self.client.get(url, {"page": 2})
+        self.assertEqual(
+            response.context["page_obj"].elided_page_range, [1, 2, 3, 4]
+        )
+        self.assertContains(response, "page=4")
+        author = User.objects.get(username="простой")
+        Post.objects.bulk_create(
+            Post(text=f"Пост {i}", author=author) for i in range(20)
+        )
+        cache_versions.bump(cache_versions.INDEX)
+        response = self.client.get(url, {"page": 2})
+        page = response.context["page_obj"]
+        self.assertEqual(page.paginator.count, 24)
+        self.assertEqual(page.elided_page_range, [1, 2, 3, 4, "…", 24])
+        self.assertContains(response, "page=24")
+        self.assertNotContains(response, "page=10")
@@ -0,0 +1,352 @@
+"""Бюджеты SQL-запросов и времени ответа для всех адресов posts, users,
+about и api.
+
+Число запросов проверяется на нескольких объёмах данных и размерах
+страницы и не должно от них зависеть. Время ответа от машины к машине
+разное, поэтому сравнивается не оно, а его доля от медианного времени
+всех адресов в том же прогоне — с performance_baselines.json; чтобы
+перезаписать его после осознанного изменения, запустите тесты с
+YATUBE_UPDATE_BASELINES=1."""
+
+import json
+import os
+import statistics
+import time
+from types import SimpleNamespace
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client, TestCase, override_settings
+from django.urls import get_resolver, reverse
+
+from .. import seeding, stats, timeline
+from ..benchmark import QueryCounter
+from ..models import Follow, Group, Post, User
+
+BASELINES_PATH = os.path.join(
+    os.path.dirname(__file__), "performance_baselines.json"
+)
+# относительное время ответа считается регрессией, если превышает
+# базовое больше чем в TOLERANCE раз и больше чем на SLACK медианных
+# времён: замеры на общих машинах шумят
+TOLERANCE = float(os.environ.get("YATUBE_PERF_TOLERANCE", 3))
+SLACK = 1
+TIMING_RUNS = 5
+
+SMALL = dict(users=10, groups=2, posts=30, comments=30, follows_per_user=3)
+LARGE = dict(users=40, groups=5, posts=300, comments=600, follows_per_user=8)
+# объём данных, размер страницы; первый набор — самый маленький
+DATASETS = ((SMALL, 10), (LARGE, 10), (LARGE, 25))
+
+# имя адреса: (клиент, метод, адрес по данным)
+ROUTES = {
+    "posts:index": ("guest", "get", lambda d: reverse("posts:index")),
+    "posts:group_post": (
+        "guest",
+        "get",
+        lambda d: reverse("posts:group_post", args=[d.group.slug]),
+    ),
+    "posts:profile": (
+        "reader",
+        "get",
+        lambda d: reverse("posts:profile", args=[d.author.username]),
+    ),
+    "posts:post_detail": (
+        "reader",
+        "get",
+        lambda d: reverse("posts:post_detail", args=[d.post.pk]),
+    ),
+    "posts:comments": (
+        "guest",
+        "get",
+        lambda d: reverse("posts:comments", args=[d.post.pk]),
+    ),
+    "posts:post_create": (
+        "reader",
+        "get",
+        lambda d: reverse("posts:post_create"),
+    ),
+    "posts:post_edit": (
+        "author",
+        "get",
+        lambda d: reverse("posts:post_edit", args=[d.post.pk]),
+    ),
+    "posts:add_comment": (
+        "reader",
+        "post",
+        lambda d: reverse("posts:add_comment", args=[d.post.pk]),
+    ),
+    "posts:follow_index": (
+        "reader",
+        "get",
+        lambda d: reverse("posts:follow_index"),
+    ),
+    "posts:search": (
+        "guest",
+        "get",
+        lambda d: reverse("posts:search") + f"?q={d.word}",
+    ),
+    "posts:profile_follow": (
+        "reader",
+        "get",
+        lambda d: reverse("posts:profile_follow", args=[d.stranger.username]),
+    ),
+    "posts:profile_unfollow": (
+        "reader",
+        "get",
+        lambda d: reverse(
+            "posts:profile_unfollow", args=[d.followed.username]
+        ),
+    ),
+    "users:signup": ("guest", "get", lambda d: reverse("users:signup")),
+    "users:login": ("guest", "get", lambda d: reverse("users:login")),
+    "users:logout": ("reader", "get", lambda d: reverse("users:logout")),
+    "users:password_reset_form": (
+        "guest",
+        "get",
+        lambda d: reverse("users:password_reset_form"),
+    ),
+    "users:password_change_form": (
+        "reader",
+        "get",
+        lambda d: reverse("users:password_change_form"),
+    ),
+    "about:author": ("guest", "get", lambda d: reverse("about:author")),
+    "about:tech": ("guest", "get", lambda d: reverse("about:tech")),
+    "api:index": ("guest", "get", lambda d: reverse("api:index")),
+    "api:group_posts": (
+        "guest",
+        "get",
+        lambda d: reverse("api:group_posts", args=[d.group.slug]),
+    ),
+    "api:profile_posts": (
+        "guest",
+        "get",
+        lambda d: reverse("api:profile_posts", args=[d.author.username]),
+    ),
+    "api:follow_posts": (
+        "reader",
+        "get",
+        lambda d: reverse("api:follow_posts"),
+    ),
+    "api:post_detail": (
+        "guest",
+        "get",
+        lambda d: reverse("api:post_detail", args=[d.post.pk]),
+    ),
+    "api:comments": (
+        "guest",
+        "get",
+        lambda d: reverse("api:comments", args=[d.post.pk]),
+    ),
+    "api:following": (
+        "reader",
+        "get",
+        lambda d: reverse("api:following")
+        + f"?authors={d.followed.pk},{d.stranger.pk}",
+    ),
+    "api:follow": (
+        "reader",
+        "post",
+        lambda d: reverse("api:follow", args=[d.stranger.username]),
+    ),
+    "api:token": ("guest", "post", lambda d: reverse("api:token")),
+}
+PASSWORD = "secret"
+# тело POST-запроса по данным; по умолчанию — текст комментария
+POST_DATA = {
+    "api:token": lambda d: {
+        "username": d.reader.username,
+        "password": PASSWORD,
+    },
+}
+
+# адреса, которые меняют данные и не повторяются одинаково
+ONE_SHOT = {
+    "posts:profile_follow",
+    "posts:profile_unfollow",
+    "api:follow",
+    "api:token",
+}
+
+# имя адреса: запросов при холодном кэше на малом объёме, не больше
+BUDGETS = {
+    "posts:index": 2,
+    "posts:group_post": 4,
+    "posts:profile": 8,
+    "posts:post_detail": 6,
+    "posts:comments": 2,
+    "posts:post_create": 3,
+    "posts:post_edit": 6,
+    "posts:add_comment": 11,
+    # + подписки читателя для версии ленты (posts.follow_graph), при
+    # тёплом кэше запроса нет
+    "posts:follow_index": 7,
+    "posts:search": 3,
+    "posts:profile_follow": 18,
+    "posts:profile_unfollow": 8,
+    "users:signup": 0,
+    "users:login": 0,
+    "users:logout": 4,
+    "users:password_reset_form": 0,
+    "users:password_change_form": 2,
+    "about:author": 0,
+    "about:tech": 0,
+    "api:index": 1,
+    "api:group_posts": 3,
+    "api:profile_posts": 3,
+    "api:follow_posts": 5,
+    "api:post_detail": 2,
+    "api:comments": 2,
+    # автор уже в подписках после posts:profile_follow: повторная вставка
+    # откатывается до точки сохранения вместо отдельного SELECT
+    "api:follow": 7,
+    "api:following": 3,
+    "api:token": 2,
+}
+
+
+def route_names():
+    names = set()
+    resolver = get_resolver()
+    for namespace in ("posts", "users", "about", "api"):
+        _, namespace_resolver = resolver.namespace_dict[namespace]
+        names.update(
+            f"{namespace}:{pattern.name}"
+            for pattern in namespace_resolver.url_patterns
+            if pattern.name
+        )
+    return names
+
+
+def seed(options):
+    seeding.seed(random_seed=1, **options)
+    stats.rebuild_all()
+    for user_id in User.objects.values_list("pk", flat=True):
+        timeline.rebuild_for_user(user_id)
+    reader = (
+        User.objects.annotate(amount=Count("follower"))
+        .order_by("-amount", "pk")
+        .first()
+    )
+    reader.set_password(PASSWORD)
+    reader.save(update_fields=["password"])
+    author = (
+        User.objects.exclude(pk=reader.pk)
+        .annotate(amount=Count("posts"))
+        .order_by("-amount", "pk")
+        .first()
+    )
+    followed = Follow.objects.filter(user=reader).first().author
+    stranger = (
+        User.objects.exclude(pk=reader.pk)
+        .exclude(following__user=reader)
+        .order_by("pk")
+        .first()
+    )
+    post = (
+        Post.objects.filter(author=author)
+        .annotate(amount=Count("comments"))
+        .order_by("-amount", "pk")
+        .first()
+    )
+    group = (
+        Group.objects.annotate(amount=Count("posts"))
+        .order_by("-amount", "pk")
+        .first()
+    )
+    return SimpleNamespace(
+        reader=reader,
+        author=author,
+        followed=followed,
+        stranger=stranger,
+        post=post,
+        group=group,
+        word=post.text.split()[0],
+    )
+
+
+class PerformanceTest(TestCase):
+    def request(self, data, name):
+        # свой клиент на каждый запрос: выход с сайта не должен
+        # разлогинить следующие адреса
+        client_name, method, url = ROUTES[name]
+        client = Client()
+        if client_name != "guest":
+            client.force_login(getattr(data, client_name))
+        params = None
+        if method == "post":
+            params = POST_DATA.get(name, lambda d: {"text": "Комментарий"})
+            params = params(data)
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            started = time.perf_counter()
+            response = getattr(client, method)(url(data), params)
+            # страницы API читают базу, пока отдаются
+            if response.streaming:
+                b"".join(response.streaming_content)
+            elapsed = (time.perf_counter() - started) * 1000
+        self.assertLess(response.status_code, 400, name)
+        return counter.count, elapsed
+
+    def test_every_route_has_budget(self):
+        """Для каждого адреса задан бюджет: новый адрес без бюджета
+        роняет тест."""
+        self.assertEqual(route_names(), set(ROUTES))
+        self.assertEqual(set(BUDGETS), set(ROUTES))
+
+    def test_query_counts_do_not_grow(self):
+        """Число запросов укладывается в бюджет и не растёт с объёмом
+        данных и размером страницы."""
+        counts = {name: [] for name in ROUTES}
+        for options, page_size in DATASETS:
+            with transaction.atomic(), override_settings(
+                CONST_POST_ON_PAGE=page_size
+            ):
+                data = seed(options)
+                for name in ROUTES:
+                    cache.clear()
+                    queries, _ = self.request(data, name)
+                    counts[name].append(queries)
+                transaction.set_rollback(True)
+        for name, route_counts in counts.items():
+            with self.subTest(route=name):
+                first, *rest = route_counts
+                self.assertLessEqual(first, BUDGETS[name])
+                self.assertLessEqual(max(rest), first, route_counts)
+
+    def test_response_times_match_baselines(self):
+        """Время ответа на большом объёме данных относительно остальных
+        адресов не хуже сохранённого."""
+        options, page_size = DATASETS[-1]
+        data = seed(options)
+        timings = {}
+        with override_settings(CONST_POST_ON_PAGE=page_size):
+            for name, (_, method, _) in ROUTES.items():
+                if method != "get" or name in ONE_SHOT:
+                    continue
+                # первый запрос прогревает кэш
+                runs = [
+                    self.request(data, name)[1] for _ in range(1 + TIMING_RUNS)
+                ]
+                timings[name] = statistics.median(runs[1:])
+        reference = statistics.median(timings.values())
+        shares = {
+            name: round(timing / reference, 2)
+            for name, timing in timings.items()
+        }
+        if os.environ.get("YATUBE_UPDATE_BASELINES"):
+            with open(BASELINES_PATH, "w", encoding="utf-8") as baselines:
+                json.dump(shares, baselines, indent=2, sort_keys=True)
+                baselines.write("\n")
+            return
+        with open(BASELINES_PATH, encoding="utf-8") as baselines:
+            baselines = json.load(baselines)
+        for name, share in shares.items():
+            with self.subTest(route=name):
+                self.assertIn(name, baselines, "нет базового времени")
+                limit = max(
+                    baselines[name] * TOLERANCE, baselines[name] + SLACK
+                )
+                self.assertLessEqual(share, limit)
@@ -0,0 +1,44 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from ..management.commands import explain_views
+from ..models import Post, User
+
+
+class QueryPlanTest(TestCase):
+    def test_feed_views_do_not_scan_tables(self):
+        """Запросы лент, профиля, поста и подписок идут по индексам."""
+        out = StringIO()
+        call_command("explain_views", posts=500, stdout=out)
+        self.assertIn("Полных просмотров таблиц нет", out.getvalue())
+        self.assertFalse(Post.objects.exists())
+
+    def test_seeded_pages_do_not_reach_site_cache(self):
+        """Страницы с засеянными постами не остаются в кэше сайта."""
+        cache.clear()
+        author = User.objects.create_user(username="author")
+        post = Post.objects.create(text="Настоящий пост", author=author)
+        call_command("explain_views", posts=300, stdout=StringIO())
+        response = self.client.get(reverse("posts:index"))
+        self.assertContains(response, post.text)
+        self.assertNotContains(response, "Пост 0")
+        self.assertEqual(response.context["page_obj"].paginator.count, 1)
+
+    def test_unbounded_index_scan_is_full_scan(self):
+        """Обход всего индекса без LIMIT считается полным просмотром."""
+        detail = "SCAN posts_post USING COVERING INDEX post_pub_date_idx"
+        sql = 'SELECT "id" FROM "posts_post" ORDER BY "pub_date" DESC'
+        self.assertTrue(explain_views.is_full_scan(detail, sql))
+        self.assertFalse(explain_views.is_full_scan(detail, f"{sql} LIMIT 10"))
+        self.assertTrue(explain_views.is_full_scan("SCAN posts_post", sql))
+        self.assertFalse(
+            explain_views.is_full_scan(
+                "SEARCH posts_post USING INDEX post_author_pub_date_idx "
+                "(author_id=?)",
+                sql,
+            )
+        )
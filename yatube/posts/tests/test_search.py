@@ -0,0 +1,158 @@
+from io import StringIO
+from unittest import mock
+
+from django.apps import apps
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .. import search, signals
+from ..models import Comment, Post, User
+from ..stemmer import stem
+
+
+class StemmerTest(TestCase):
+    def test_word_forms_share_stem(self):
+        """Разные формы слова сводятся к одной основе."""
+        cases = {
+            "книг": ["книга", "книги", "книгами", "книгах"],
+            "красив": ["красивые", "красивая", "красивого"],
+            "чита": ["читать", "читал", "читающий"],
+            "подписчик": ["подписчиков", "подписчики"],
+            "елк": ["ёлка", "елки"],
+        }
+        for expected, forms in cases.items():
+            for word in forms:
+                with self.subTest(word=word):
+                    self.assertEqual(stem(word), expected)
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="author")
+        cls.post = Post.objects.create(
+            text="Сегодня читали красивые книги о горах",
+            author=cls.author,
+        )
+        cls.other = Post.objects.create(
+            text="Пост про велосипеды", author=cls.author
+        )
+        cls.comment = Comment.objects.create(
+            post=cls.other, author=cls.author, text="А я люблю книгу о море"
+        )
+
+    def found(self, query):
+        results = search.SearchResults(query)
+        return results[: results.count()]
+
+    def test_finds_word_forms_in_posts_and_comments(self):
+        """Находятся посты с другими формами слов, в том числе по
+        комментариям; совпадение в тексте поста выше."""
+        self.assertEqual(self.found("книга"), [self.post, self.other])
+        self.assertEqual(self.found("красивую книжку"), [])
+        self.assertEqual(self.found("Красивая КНИГА"), [self.post])
+        self.assertEqual(self.found("велосипед"), [self.other])
+
+    def test_empty_and_punctuation_queries(self):
+        """Запрос без слов ничего не находит и не ломает FTS5."""
+        for query in ("", "  ", '"*)(', "AND OR"):
+            with self.subTest(query=query):
+                results = search.SearchResults(query)
+                self.assertIsInstance(results.count(), int)
+
+    def test_index_follows_changes(self):
+        """Индекс обновляется при правке и удалении поста и
+        комментария."""
+        self.post.text = "Теперь о реках"
+        self.post.save()
+        self.assertEqual(self.found("горы"), [])
+        self.assertEqual(self.found("река"), [self.post])
+
+        self.comment.delete()
+        self.assertEqual(self.found("море"), [])
+        self.other.delete()
+        self.assertEqual(self.found("велосипед"), [])
+
+    def test_snippet_highlights_matches(self):
+        """В отрывке выделены совпавшие слова, HTML экранирован."""
+        snippet = search.snippet("<b>Книги</b> и книжные полки", "книга")
+        self.assertEqual(
+            snippet, "&lt;b&gt;<mark>Книги</mark>&lt;/b&gt; и книжные полки"
+        )
+        long_text = " ".join(["слово"] * 50 + ["книга"] + ["слово"] * 50)
+        snippet = search.snippet(long_text, "книги")
+        self.assertTrue(snippet.startswith("…"))
+        self.assertTrue(snippet.endswith("…"))
+        self.assertIn("<mark>книга</mark>", snippet)
+
+    @override_settings(CONST_POST_ON_PAGE=1)
+    def test_search_page(self):
+        """Страница поиска выводит отрывки и сохраняет запрос в ссылках
+        на страницы."""
+        response = self.client.get(reverse("posts:search"), {"q": "книги"})
+        self.assertEqual(response.context["page_obj"].paginator.count, 2)
+        self.assertContains(response, "<mark>книги</mark>")
+        self.assertContains(
+            response, "?q=%D0%BA%D0%BD%D0%B8%D0%B3%D0%B8&amp;page=2"
+        )
+
+    def test_admin_search_uses_index(self):
+        """Поиск в админке идёт по полнотекстовому индексу."""
+        admin = User.objects.create_superuser("admin", "a@a.ru", "pass")
+        self.client.force_login(admin)
+        response = self.client.get(
+            reverse("admin:posts_post_changelist"), {"q": "горах"}
+        )
+        self.assertEqual(list(response.context["cl"].queryset), [self.post])
+
+    def test_rebuild_command(self):
+        """Команда заново заполняет индекс из базы."""
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {search.POST_TABLE}")
+        self.assertEqual(self.found("горы"), [])
+        call_command("rebuild_search_index", stdout=StringIO())
+        self.assertEqual(self.found("горы"), [self.post])
+
+    def test_empty_index_is_filled_after_migrate(self):
+        """После миграций пустой индекс заполняется, полный не
+        трогается."""
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {search.POST_TABLE}")
+            cursor.execute(f"DELETE FROM {search.COMMENT_TABLE}")
+        self.assertTrue(search.needs_filling())
+        signals.fill_search_index(sender=apps.get_app_config("posts"))
+        self.assertEqual(self.found("горы"), [self.post])
+        self.assertFalse(search.needs_filling())
+
+    def test_works_without_index_on_other_databases(self):
+        """На базе без FTS5 записи не трогают индекс, а поиск идёт
+        через icontains по постам и комментариям."""
+        # другие тесты меняют и удаляют общие объекты в памяти;
+        # LIKE в SQLite не сводит регистр кириллицы, поэтому слова
+        # в текстах со строчной буквы
+        other = Post.objects.get(text="Пост про велосипеды")
+        with mock.patch.object(connection, "vendor", "postgresql"):
+            post = Post.objects.create(
+                text="Книжная полка в горах", author=self.author
+            )
+            Comment.objects.create(
+                post=self.post, author=self.author, text="Отличная полка"
+            )
+            post.delete()
+            post = Post.objects.create(
+                text="Вот полки с книгами", author=self.author
+            )
+            self.assertEqual(self.found("книги"), [post, other, self.post])
+            self.assertEqual(self.found("полка"), [post, self.post])
+            self.assertEqual(self.found("полка горы"), [self.post])
+            response = self.client.get(reverse("posts:search"), {"q": "книг"})
+            self.assertEqual(response.context["page_obj"].paginator.count, 3)
+            with self.assertRaises(CommandError):
+                call_command("rebuild_search_index", stdout=StringIO())
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT rowid FROM {search.POST_TABLE}")
+            indexed = {rowid for (rowid,) in cursor.fetchall()}
+        self.assertEqual(indexed, {self.post.pk, other.pk})
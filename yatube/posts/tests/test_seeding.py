@@ -0,0 +1,92 @@
+import json
+from io import StringIO
+
+from django.core.management import call_command
+from django.db.models import F
+from django.test import TestCase
+
+from .. import benchmark, search
+from ..models import AuthorStats, Comment, Follow, Group, Post, User
+
+
+class SeedContentTest(TestCase):
+    def seed(self, **options):
+        call_command("seed_content", stdout=StringIO(), seed=1, **options)
+
+    def test_creates_requested_amounts(self):
+        """Создаётся столько записей, сколько попросили, с датами в
+        прошлом, без подписок на себя; счётчики и индекс готовы."""
+        self.seed(users=30, groups=3, posts=200, comments=400)
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertEqual(Comment.objects.count(), 400)
+        self.assertGreater(
+            Post.objects.values("pub_date").distinct().count(), 190
+        )
+        self.assertFalse(
+            Comment.objects.filter(created__lt=F("post__pub_date")).exists()
+        )
+        self.assertTrue(Follow.objects.exists())
+        for follow in Follow.objects.all():
+            self.assertNotEqual(follow.user_id, follow.author_id)
+        self.assertEqual(
+            sum(AuthorStats.objects.values_list("posts_count", flat=True)),
+            200,
+        )
+        post = Post.objects.first()
+        word = post.text.split()[0]
+        self.assertIn(post, search.SearchResults(word)[:200])
+
+    def test_popularity_is_skewed(self):
+        """Посты и подписчики распределены неравномерно: у самого
+        популярного автора заметно больше среднего."""
+        self.seed(users=100, groups=0, posts=1000, comments=0)
+        posts = list(AuthorStats.objects.values_list("posts_count", flat=True))
+        self.assertGreater(max(posts), 3 * sum(posts) / len(posts))
+
+    def test_same_seed_repeats_data(self):
+        self.seed(users=5, groups=1, posts=20, comments=10, prefix="a")
+        first = list(Post.objects.order_by("pk").values_list("text"))
+        Post.objects.all().delete()
+        self.seed(users=5, groups=1, posts=20, comments=10, prefix="b")
+        second = list(Post.objects.order_by("pk").values_list("text"))
+        self.assertEqual(first, second)
+
+
+class BenchmarkTest(TestCase):
+    def test_percentile(self):
+        values = [5, 1, 4, 2, 3]
+        self.assertEqual(benchmark.percentile(values, 50), 3)
+        self.assertEqual(benchmark.percentile(values, 99), 5)
+        self.assertEqual(benchmark.percentile(values, 1), 1)
+
+    def test_report_covers_views(self):
+        """Отчёт в JSON с перцентилями и числом запросов для каждой
+        страницы."""
+        call_command(
+            "seed_content",
+            users=10,
+            groups=2,
+            posts=30,
+            comments=30,
+            seed=2,
+            stdout=StringIO(),
+        )
+        out = StringIO()
+        call_command("benchmark_views", requests=3, stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual(report["dataset"]["posts"], 30)
+        self.assertEqual(
+            set(report["views"]),
+            {
+                "posts:index",
+                "posts:profile",
+                "posts:post_detail",
+                "posts:follow_index",
+            },
+        )
+        for result in report["views"].values():
+            self.assertEqual(result["status"], 200)
+            self.assertGreater(result["queries_max"], 0)
+            self.assertLessEqual(result["p50_ms"], result["p99_ms"])
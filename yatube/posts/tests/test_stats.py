@@ -0,0 +1,148 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from .. import stats
+from ..models import AuthorStats, Comment, FeedStats, Follow, Group, Post, User
+
+
+class AuthorStatsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="author")
+        cls.reader = User.objects.create_user(username="reader")
+
+    def assertStats(self, user, **expected):
+        stats = AuthorStats.for_user(user)
+        for field, value in expected.items():
+            with self.subTest(user=user, field=field):
+                self.assertEqual(getattr(stats, field), value)
+
+    def test_counters_follow_creates_and_deletes(self):
+        """Счётчики меняются при создании и удалении постов,
+        комментариев и подписок."""
+        post = Post.objects.create(text="text", author=self.author)
+        Post.objects.create(text="text", author=self.author)
+        Comment.objects.create(post=post, author=self.reader, text="text")
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.assertStats(self.author, posts_count=2, followers_count=1)
+        self.assertStats(self.reader, comments_count=1, following_count=1)
+        post.delete()
+        follow.delete()
+        self.assertStats(self.author, posts_count=1, followers_count=0)
+        self.assertStats(self.reader, comments_count=0, following_count=0)
+
+    def test_user_deletion_cascades_cleanly(self):
+        """Удаление пользователя не оставляет чужих счётчиков в рассинхроне."""
+        post = Post.objects.create(text="text", author=self.author)
+        Comment.objects.create(post=post, author=self.reader, text="text")
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.author.delete()
+        self.assertFalse(AuthorStats.objects.filter(user_id=post.author_id))
+        self.assertStats(self.reader, comments_count=0, following_count=0)
+
+    def test_rebuild_command_recounts_from_scratch(self):
+        """Команда rebuild_author_stats исправляет рассинхрон счётчиков."""
+        Post.objects.bulk_create(
+            Post(text=f"{i}", author=self.author) for i in range(3)
+        )
+        AuthorStats.objects.all().delete()
+        call_command("rebuild_author_stats", stdout=StringIO())
+        self.assertStats(self.author, posts_count=3)
+        self.assertStats(self.reader, posts_count=0)
+
+
+class CounterTransactionTest(TransactionTestCase):
+    def test_failed_counter_rolls_back_save(self):
+        """Пост не сохраняется, если не удалось изменить его счётчики."""
+        author = User.objects.create_user(username="author")
+        with mock.patch.object(
+            stats, "add_feed_posts", side_effect=RuntimeError
+        ), self.assertRaises(RuntimeError):
+            Post.objects.create(text="text", author=author)
+        self.assertFalse(Post.objects.exists())
+        self.assertFalse(AuthorStats.objects.filter(posts_count__gt=0))
+
+
+class FeedStatsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username="author")
+        cls.reader = User.objects.create_user(username="reader")
+        cls.group = Group.objects.create(
+            title="Группа", slug="group", description="Описание"
+        )
+        cls.other_group = Group.objects.create(
+            title="Другая", slug="other", description="Описание"
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def counts(self):
+        return dict(FeedStats.objects.values_list("feed", "posts_count"))
+
+    def test_counters_follow_posts(self):
+        """Счётчики лент меняются при создании, переносе между группами
+        и удалении постов; недостающий счётчик заводится при чтении."""
+        self.assertEqual(stats.feed_posts_count("index", Post.objects), 0)
+        post = Post.objects.create(
+            text="text", author=self.author, group=self.group
+        )
+        self.assertEqual(
+            stats.feed_posts_count(f"group:{self.group.pk}", self.group.posts),
+            1,
+        )
+        Post.objects.create(text="text", author=self.author)
+        self.assertEqual(
+            self.counts(), {"index": 2, f"group:{self.group.pk}": 1}
+        )
+        stats.feed_posts_count(
+            f"group:{self.other_group.pk}", self.other_group.posts
+        )
+        post.group = self.other_group
+        post.save()
+        self.assertEqual(
+            self.counts(),
+            {
+                "index": 2,
+                f"group:{self.group.pk}": 0,
+                f"group:{self.other_group.pk}": 1,
+            },
+        )
+        post.delete()
+        self.other_group.delete()
+        self.assertEqual(
+            self.counts(), {"index": 1, f"group:{self.group.pk}": 0}
+        )
+        FeedStats.objects.update(posts_count=100)
+        stats.rebuild_all()
+        self.assertEqual(self.counts(), {"index": 1})
+
+    def test_followed_posts_count(self):
+        Post.objects.create(text="text", author=self.author)
+        Post.objects.create(text="text", author=self.reader)
+        self.assertEqual(stats.followed_posts_count(self.reader.pk), 0)
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(stats.followed_posts_count(self.reader.pk), 1)
+
+    @override_settings(CONST_POST_ON_PAGE=1)
+    def test_large_feeds_are_counted_by_counters(self):
+        """Большие ленты считаются по счётчику, маленькие — точно."""
+        Post.objects.bulk_create(
+            Post(text=f"{i}", author=self.author) for i in range(3)
+        )
+        stats.rebuild_all()
+        FeedStats.objects.filter(feed="index").update(posts_count=30)
+        response = self.client.get(reverse("posts:index"))
+        self.assertEqual(response.context["page_obj"].paginator.count, 3)
+
+        cache.clear()
+        with override_settings(FEED_EXACT_COUNT_LIMIT=2):
+            response = self.client.get(reverse("posts:index"))
+        self.assertEqual(response.context["page_obj"].paginator.count, 30)
@@ -0,0 +1,171 @@
+import json
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from .. import thumbnails
+from ..models import Post, User
+from ..templatetags.post_images import PLACEHOLDER
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b"\x47\x49\x46\x38\x39\x61\x02\x00"
+    b"\x01\x00\x80\x00\x00\x00\x00\x00"
+    b"\xff\xff\xff\x21\xf9\x04\x00\x00"
+    b"\x00\x00\x00\x2c\x00\x00\x00\x00"
+    b"\x02\x00\x01\x00\x00\x02\x02\x0c"
+    b"\x0a\x00\x3b"
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="author")
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            text="text",
+            author=self.user,
+            image=SimpleUploadedFile(
+                name="small.gif", content=SMALL_GIF, content_type="image/gif"
+            ),
+        )
+
+    def test_placeholder_until_variants_are_ready(self):
+        """Пока вариантов картинки нет, выводится заглушка размером с
+        карточку, а не оригинал; после создания вариантов карточка
+        перерисовывается со srcset."""
+        response = self.client.get(reverse("posts:index"))
+        self.assertContains(
+            response,
+            f'src="{PLACEHOLDER}"\n       width="{thumbnails.WIDTH}" '
+            f'height="{thumbnails.HEIGHT}"',
+        )
+        self.assertNotContains(response, self.post.image.url)
+        self.assertNotContains(response, "<picture>")
+
+        modified = self.post.modified
+        self.assertTrue(thumbnails.generate(self.post.image.name))
+        self.post.refresh_from_db()
+        self.assertGreater(self.post.modified, modified)
+
+        response = self.client.get(reverse("posts:index"))
+        self.assertNotContains(response, f'src="{self.post.image.url}"')
+        sets = thumbnails.srcsets(self.post.image_variants)
+        self.assertContains(
+            response,
+            f'<source type="image/webp" srcset="{sets["webp"]["srcset"]}"',
+        )
+        self.assertContains(response, f'src="{sets["jpeg"]["src"]}"')
+
+    def test_variants_cover_widths_and_formats(self):
+        """Варианты создаются для всех ширин в WebP и JPEG."""
+        thumbnails.generate(self.post.image.name)
+        self.post.refresh_from_db()
+        variants = json.loads(self.post.image_variants)
+        self.assertEqual(
+            {(item["format"], item["width"]) for item in variants},
+            {
+                (image_format.lower(), width)
+                for image_format in thumbnails.FORMATS
+                for width in thumbnails.WIDTHS
+            },
+        )
+        sets = thumbnails.srcsets(self.post.image_variants)
+        self.assertTrue(sets["webp"]["src"].endswith(".webp"))
+        self.assertIn(" 320w, ", sets["jpeg"]["srcset"])
+
+    def test_new_image_resets_variants(self):
+        """Смена картинки сбрасывает варианты старой."""
+        thumbnails.generate(self.post.image.name)
+        self.post.refresh_from_db()
+        self.post.image = SimpleUploadedFile(
+            name="other.gif", content=SMALL_GIF, content_type="image/gif"
+        )
+        self.post.save()
+        self.assertEqual(self.post.image_variants, "")
+        self.post.text = "new text"
+        self.post.save()
+        self.assertEqual(self.post.image_variants, "")
+
+    def test_generate_skips_ready_variants(self):
+        """Готовые варианты не создаются повторно."""
+        self.assertTrue(thumbnails.generate(self.post.image.name))
+        self.assertFalse(thumbnails.generate(self.post.image.name))
+
+    def test_generate_survives_missing_file(self):
+        """Отсутствующая картинка не роняет создание вариантов, неудача
+        запоминается, и картинка больше не обрабатывается."""
+        post = Post.objects.create(
+            text="text", author=self.user, image="posts/missing.gif"
+        )
+        self.assertFalse(thumbnails.generate(post.image.name))
+        post.refresh_from_db()
+        self.assertEqual(post.image_variants, thumbnails.FAILED)
+        with self.assertNumQueries(1):
+            self.assertFalse(thumbnails.generate(post.image.name))
+        response = self.client.get(reverse("posts:index"))
+        self.assertContains(response, f'src="{PLACEHOLDER}"')
+        self.assertNotContains(response, post.image.url)
+
+        out = StringIO()
+        call_command(
+            "warm_thumbnails", "--workers", "0", "--retry-failed", stdout=out
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.image_variants, thumbnails.FAILED)
+
+    def test_rendering_does_not_generate(self):
+        """Показ поста без вариантов не создаёт их."""
+        with mock.patch.object(thumbnails, "make_variants") as make:
+            self.client.get(reverse("posts:index"))
+            self.client.get(reverse("posts:post_detail", args=[self.post.pk]))
+        make.assert_not_called()
+
+    def test_warm_thumbnails_command(self):
+        """Команда создаёт варианты для всех картинок постов."""
+        out = StringIO()
+        call_command("warm_thumbnails", "--workers", "0", stdout=out)
+        self.assertIn("Создано миниатюр: 1", out.getvalue())
+        self.post.refresh_from_db()
+        self.assertNotEqual(self.post.image_variants, "")
+        call_command("warm_thumbnails", "--workers", "0", stdout=out)
+        self.assertIn("Создано миниатюр: 0", out.getvalue())
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class ScheduleTest(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_variants_are_created_after_commit(self):
+        """При THUMBNAIL_WORKERS = 0 варианты создаются в потоке запроса
+        сразу после коммита поста с картинкой."""
+        post = Post.objects.create(
+            text="text",
+            author=User.objects.create_user(username="author"),
+            image=SimpleUploadedFile(
+                name="small.gif", content=SMALL_GIF, content_type="image/gif"
+            ),
+        )
+        post.refresh_from_db()
+        self.assertIn("webp", thumbnails.srcsets(post.image_variants))
@@ -0,0 +1,97 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from ..models import Follow, Post, TimelineEntry, User
+from ..timeline import TimelineFeed
+
+
+class TimelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username="reader")
+        cls.other_reader = User.objects.create_user(username="other")
+        cls.author = User.objects.create_user(username="author")
+        cls.star = User.objects.create_user(username="star")
+
+    def feed(self, user):
+        feed = TimelineFeed(user)
+        return feed[: feed.count()]
+
+    def test_new_post_is_pushed_to_followers(self):
+        """Новый пост попадает в ленты подписчиков при сохранении."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text="text", author=self.author)
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader, post=post).exists()
+        )
+        self.assertEqual(self.feed(self.reader), [post])
+        self.assertEqual(self.feed(self.other_reader), [])
+
+    def test_follow_and_unfollow_update_timeline(self):
+        """Подписка добавляет старые посты автора, отписка убирает их."""
+        old_post = Post.objects.create(text="old", author=self.author)
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.feed(self.reader), [old_post])
+        follow.delete()
+        self.assertEqual(self.feed(self.reader), [])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_popular_author_is_pulled_at_read_time(self):
+        """Посты популярного автора не раскладываются, а подмешиваются
+        при чтении в правильном порядке."""
+        Follow.objects.create(user=self.reader, author=self.star)
+        Follow.objects.create(user=self.other_reader, author=self.star)
+        Follow.objects.create(user=self.reader, author=self.author)
+        first = Post.objects.create(text="1", author=self.author)
+        second = Post.objects.create(text="2", author=self.star)
+        third = Post.objects.create(text="3", author=self.author)
+        self.assertFalse(TimelineEntry.objects.filter(post=second).exists())
+        self.assertEqual(self.feed(self.reader), [third, second, first])
+        self.assertEqual(TimelineFeed(self.reader)[1:2], [second])
+        self.assertEqual(
+            list(TimelineFeed(self.reader).queryset), [third, second, first]
+        )
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_author_dropping_below_limit_is_backfilled(self):
+        """Когда автор перестаёт быть популярным, его посты раскладываются
+        по лентам оставшихся подписчиков."""
+        Follow.objects.create(user=self.reader, author=self.star)
+        follow = Follow.objects.create(
+            user=self.other_reader, author=self.star
+        )
+        post = Post.objects.create(text="text", author=self.star)
+        follow.delete()
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader, post=post).exists()
+        )
+        self.assertEqual(self.feed(self.reader), [post])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_count_up_to_stops_at_limit(self):
+        """Ограниченный подсчёт учитывает обе части ленты и не выходит
+        за предел."""
+        Follow.objects.create(user=self.reader, author=self.star)
+        Follow.objects.create(user=self.other_reader, author=self.star)
+        Follow.objects.create(user=self.reader, author=self.author)
+        for i in range(3):
+            Post.objects.create(text=f"{i}", author=self.author)
+            Post.objects.create(text=f"{i}", author=self.star)
+        feed = TimelineFeed(self.reader)
+        self.assertEqual(feed.count_up_to(10), 6)
+        self.assertEqual(feed.count_up_to(4), 4)
+        self.assertEqual(feed.count_up_to(2), 2)
+
+    def test_rebuild_command_restores_timelines(self):
+        """Команда rebuild_timelines пересобирает ленты с нуля."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        posts = [
+            Post.objects.create(text=f"{i}", author=self.author)
+            for i in range(3)
+        ]
+        TimelineEntry.objects.all().delete()
+        call_command("rebuild_timelines", "reader", stdout=StringIO())
+        self.assertEqual(self.feed(self.reader), posts[::-1])
@@ -0,0 +1,164 @@
+import json
+import os
+import tempfile
+from datetime import datetime, timezone
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from .. import search, transfer
+from ..models import AuthorStats, Comment, Follow, Group, Post, User
+
+OLD_DATE = datetime(2020, 5, 1, 12, 30, tzinfo=timezone.utc)
+
+
+class TransferTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(
+            username="author", first_name="Лев"
+        )
+        self.reader = User.objects.create_user(username="reader")
+        self.group = Group.objects.create(
+            title="Горы", slug="mountains", description="О горах"
+        )
+        self.post = Post.objects.create(
+            text="Поход на вершину", author=self.author, group=self.group
+        )
+        Post.objects.filter(pk=self.post.pk).update(
+            pub_date=OLD_DATE, modified=OLD_DATE
+        )
+        self.comment = Comment.objects.create(
+            post=self.post, author=self.reader, text="Завидую"
+        )
+        Follow.objects.create(user=self.reader, author=self.author)
+
+    def export(self, **options):
+        path = os.path.join(tempfile.mkdtemp(), "content.jsonl")
+        self.addCleanup(os.remove, path)
+        call_command("export_content", output=path, **options)
+        return path
+
+    def test_round_trip_into_empty_database(self):
+        """Выгрузка загружается в пустую базу с теми же id, датами и
+        связями, поиск и счётчики пересобраны."""
+        path = self.export()
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        self.assertFalse(Post.objects.exists())
+
+        call_command("import_content", path, batch_size=1, stdout=StringIO())
+
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertEqual(post.text, self.post.text)
+        self.assertEqual(post.pub_date, OLD_DATE)
+        self.assertEqual(post.modified, OLD_DATE)
+        self.assertEqual(post.author.username, "author")
+        self.assertEqual(post.author.first_name, "Лев")
+        self.assertFalse(post.author.has_usable_password())
+        self.assertEqual(post.group.slug, "mountains")
+        comment = Comment.objects.get(pk=self.comment.pk)
+        self.assertEqual(comment.post, post)
+        self.assertEqual(comment.author.username, "reader")
+        self.assertTrue(
+            Follow.objects.filter(
+                user__username="reader", author__username="author"
+            ).exists()
+        )
+        results = search.SearchResults("вершина")
+        self.assertEqual(results[: results.count()], [post])
+        stats = AuthorStats.objects.get(user=post.author)
+        self.assertEqual((stats.posts_count, stats.followers_count), (1, 1))
+
+    def test_import_is_idempotent(self):
+        """Повторная загрузка той же выгрузки ничего не дублирует."""
+        path = self.export()
+        for _ in range(2):
+            with open(path, encoding="utf-8") as lines:
+                transfer.import_lines(lines)
+        self.assertEqual(User.objects.count(), 2)
+        self.assertEqual(Group.objects.count(), 1)
+        self.assertEqual(Post.objects.count(), 1)
+        self.assertEqual(Comment.objects.count(), 1)
+        self.assertEqual(Follow.objects.count(), 1)
+
+    def test_taken_ids_get_new_ids(self):
+        """Пост выгрузки с занятым id не трогает чужой пост, а получает
+        новый id; комментарии выгрузки переходят к нему."""
+        remote_date = datetime(2001, 1, 1, tzinfo=timezone.utc)
+        lines = [
+            {
+                "model": "post",
+                "id": self.post.pk,
+                "text": "Чужой текст про озеро",
+                "pub_date": remote_date.isoformat(),
+                "author": "author",
+                "group": None,
+            },
+            {
+                "model": "comment",
+                "id": self.comment.pk,
+                "post": self.post.pk,
+                "author": "reader",
+                "text": "Комментарий к чужому посту",
+                "created": remote_date.isoformat(),
+            },
+        ]
+        # повторная загрузка узнаёт перенесённые записи
+        for expected in (1, 0):
+            counts = transfer.import_lines(map(json.dumps, lines))
+            self.assertEqual(
+                (counts["post"], counts["comment"]), (expected, expected)
+            )
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertEqual(post.text, self.post.text)
+        self.assertEqual(post.pub_date, OLD_DATE)
+        self.assertEqual(list(post.comments.all()), [self.comment])
+        remote = Post.objects.get(text="Чужой текст про озеро")
+        self.assertNotEqual(remote.pk, self.post.pk)
+        self.assertEqual(remote.pub_date, remote_date)
+        self.assertEqual(
+            list(remote.comments.values_list("text", flat=True)),
+            ["Комментарий к чужому посту"],
+        )
+        results = search.SearchResults("озеро")
+        self.assertEqual(results[: results.count()], [remote])
+
+    def test_counts_only_inserted_rows(self):
+        """В отчёте — только вставленные записи."""
+        path = self.export()
+        with open(path, encoding="utf-8") as lines:
+            counts = transfer.import_lines(lines)
+        self.assertEqual(set(counts.values()), {0})
+
+    def test_missing_authors_are_created(self):
+        """Авторы, которых нет ни в базе, ни в выгрузке, создаются."""
+        record = {
+            "model": "post",
+            "id": 500,
+            "text": "Новый пост",
+            "pub_date": OLD_DATE.isoformat(),
+            "author": "newcomer",
+            "group": None,
+        }
+        counts = transfer.import_lines([json.dumps(record)])
+        self.assertEqual(counts["post"], 1)
+        self.assertEqual(Post.objects.get(pk=500).author.username, "newcomer")
+
+    def test_selected_models_and_unknown_model(self):
+        path = self.export(models=["group"])
+        with open(path, encoding="utf-8") as lines:
+            records = [json.loads(line) for line in lines]
+        self.assertEqual(
+            records,
+            [
+                {
+                    "model": "group",
+                    "slug": "mountains",
+                    "title": "Горы",
+                    "description": "О горах",
+                }
+            ],
+        )
+        with self.assertRaises(ValueError):
+            transfer.import_lines(['{"model": "like"}'])
@@ -0,0 +1,100 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.template.defaultfilters import filesizeformat
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from ..models import Post, User
+from ..uploads import ImageUploadHandler
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def make_image(size, image_format="PNG", name="image.png"):
+    data = BytesIO()
+    Image.new("1", size).save(data, image_format)
+    return SimpleUploadedFile(name, data.getvalue())
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImageUploadTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="author")
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def create(self, image):
+        return self.client.post(
+            reverse("posts:post_create"), {"text": "text", "image": image}
+        )
+
+    def test_valid_image_is_saved(self):
+        """Картинка в пределах ограничений сохраняется в пост."""
+        response = self.create(make_image((40, 20)))
+        self.assertRedirects(
+            response, reverse("posts:profile", args=[self.user.username])
+        )
+        self.assertTrue(Post.objects.get().image.name.startswith("posts/"))
+
+    @override_settings(POST_IMAGE_MAX_SIZE=1024)
+    def test_too_large_file_is_rejected(self):
+        """Файл больше POST_IMAGE_MAX_SIZE отклоняется при загрузке."""
+        data = BytesIO()
+        Image.effect_noise((200, 200), 100).save(data, "PNG")
+        response = self.create(SimpleUploadedFile("big.png", data.getvalue()))
+        self.assertFormError(
+            response, "form", "image", f"Файл больше {filesizeformat(1024)}."
+        )
+        self.assertFalse(Post.objects.exists())
+
+    @override_settings(POST_IMAGE_MAX_PIXELS=10000)
+    def test_too_many_pixels_are_rejected(self):
+        """Размеры картинки проверяются по заголовку."""
+        response = self.create(make_image((200, 100)))
+        self.assertFormError(
+            response,
+            "form",
+            "image",
+            "Картинка слишком большая: не больше 10000 пикселей.",
+        )
+        self.assertFalse(Post.objects.exists())
+
+    def test_unsupported_format_is_rejected(self):
+        """Картинки в неподдерживаемых форматах отклоняются."""
+        response = self.create(make_image((10, 10), "BMP", "image.bmp"))
+        self.assertFormError(
+            response,
+            "form",
+            "image",
+            "Поддерживаются форматы: JPEG, PNG, GIF, WEBP.",
+        )
+
+    def test_not_an_image_is_rejected(self):
+        """Файл, который не является картинкой, отклоняется."""
+        response = self.create(
+            SimpleUploadedFile("image.png", b"not an image at all")
+        )
+        self.assertFormError(response, "form", "image", "Загрузите картинку.")
+        self.assertFalse(Post.objects.exists())
+
+
+class ImageUploadHandlerTest(SimpleTestCase):
+    def test_other_fields_are_not_checked(self):
+        """Файлы из других полей проходят мимо проверок картинки."""
+        handler = ImageUploadHandler()
+        handler.new_file("document", "notes.txt", "text/plain", 10**9)
+        self.assertEqual(handler.receive_data_chunk(b"text", 0), b"text")
+        self.assertIsNone(handler.file_complete(4))
@@ -0,0 +1,148 @@
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, transaction
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
+
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+# Карточка поста — картинка 960x339 с полями; уменьшенные копии
+# сохраняют те же пропорции.
+WIDTH = 960
+HEIGHT = 339
+WIDTHS = (320, 640, 960)
+# WebP отдаётся браузерам, которые его понимают, JPEG — остальным.
+FORMATS = ("WEBP", "JPEG")
+OPTIONS = {"padding": True, "upscale": True}
+# image_variants картинки, варианты которой создать не удалось: такие
+# картинки больше не обрабатываются (см. warm_thumbnails --retry-failed)
+FAILED = "[]"
+
+_executor = None
+_pending = set()
+_lock = threading.Lock()
+
+
+def variant_height(width):
+    return round(width * HEIGHT / WIDTH)
+
+
+def make_variants(name):
+    """Создаёт уменьшенные копии картинки во всех размерах и форматах.
+    Возвращает их описания или None, если картинку не удалось прочитать.
+    """
+    source = ImageFile(name, Post._meta.get_field("image").storage)
+    variants = []
+    for image_format in FORMATS:
+        for width in WIDTHS:
+            thumbnail = default.backend.get_thumbnail(
+                source,
+                f"{width}x{variant_height(width)}",
+                format=image_format,
+                **OPTIONS,
+            )
+            if default.kvstore.get(thumbnail) is None:
+                return None
+            variants.append(
+                {
+                    "format": image_format.lower(),
+                    "width": width,
+                    "name": thumbnail.name,
+                }
+            )
+    return variants
+
+
+def srcsets(image_variants):
+    """Атрибуты srcset по форматам из сохранённых вариантов. Адреса
+    строятся без обращений к хранилищу за проверкой файлов."""
+    if not image_variants:
+        return {}
+    result = {}
+    for variant in json.loads(image_variants):
+        url = default.storage.url(variant["name"])
+        result.setdefault(variant["format"], []).append(
+            (variant["width"], url)
+        )
+    return {
+        image_format: {
+            "srcset": ", ".join(f"{url} {width}w" for width, url in items),
+            "src": max(items)[1],
+        }
+        for image_format, items in result.items()
+    }
+
+
+def generate(name):
+    """Создаёт варианты картинки и сохраняет их в постах с этой
+    картинкой; у постов меняется дата изменения, поэтому их
+    закэшированные карточки перерисовываются. Неудача запоминается
+    (FAILED), чтобы картинку не обрабатывали снова.
+    Возвращает True, если варианты были созданы."""
+    try:
+        posts = Post.objects.filter(image=name, image_variants="")
+        if not posts.exists():
+            return False
+        try:
+            variants = make_variants(name)
+        except Exception:
+            logger.exception("Не удалось создать миниатюры для %s", name)
+            variants = None
+        if variants is None:
+            # карточки не перерисовываются: в них остаётся заглушка
+            posts.update(image_variants=FAILED)
+            return False
+        for post in posts:
+            post.image_variants = json.dumps(variants)
+            post.save(update_fields=["image_variants", "modified"])
+        return True
+    except Exception:
+        logger.exception("Не удалось создать миниатюры для %s", name)
+        return False
+    finally:
+        with _lock:
+            _pending.discard(name)
+
+
+def generate_in_worker(name):
+    try:
+        return generate(name)
+    finally:
+        connection.close()
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                thread_name_prefix="thumbnails",
+            )
+        return _executor
+
+
+def _submit(name):
+    with _lock:
+        if name in _pending:
+            return
+        _pending.add(name)
+    if settings.THUMBNAIL_WORKERS:
+        _get_executor().submit(generate_in_worker, name)
+    else:
+        generate(name)
+
+
+def schedule(name):
+    """Ставит создание миниатюр в очередь фонового пула после коммита
+    транзакции. При THUMBNAIL_WORKERS = 0 миниатюры создаются сразу в
+    текущем потоке."""
+    if name:
+        name = str(name)
+        transaction.on_commit(lambda: _submit(name))
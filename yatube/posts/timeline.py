@@ -0,0 +1,156 @@
+import heapq
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+from .models import AuthorStats, Follow, Post, TimelineEntry
+
+
+def is_popular(author_id):
+    followers = (
+        AuthorStats.objects.filter(user_id=author_id)
+        .values_list("followers_count", flat=True)
+        .first()
+    )
+    return (followers or 0) > settings.TIMELINE_FANOUT_LIMIT
+
+
+def _insert(entries):
+    # размер пачки выбирает Django: в SQLite одна вставка ограничена
+    # 500 строками
+    TimelineEntry.objects.bulk_create(entries, ignore_conflicts=True)
+
+
+def fan_out(post):
+    """Раскладывает новый пост по лентам подписчиков автора."""
+    if is_popular(post.author_id):
+        return
+    follower_ids = Follow.objects.filter(author_id=post.author_id).values_list(
+        "user_id", flat=True
+    )
+    _insert(
+        TimelineEntry(
+            user_id=user_id,
+            post_id=post.pk,
+            author_id=post.author_id,
+            pub_date=post.pub_date,
+        )
+        for user_id in follower_ids.iterator()
+    )
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту читателя все посты автора."""
+    posts = Post.objects.filter(author_id=author_id).values_list(
+        "pk", "pub_date"
+    )
+    _insert(
+        TimelineEntry(
+            user_id=user_id,
+            post_id=post_id,
+            author_id=author_id,
+            pub_date=pub_date,
+        )
+        for post_id, pub_date in posts.iterator()
+    )
+
+
+def backfill_followers(author_id):
+    """Раскладывает все посты автора по лентам его подписчиков: нужно,
+    когда автор перестаёт быть популярным."""
+    for user_id in Follow.objects.filter(author_id=author_id).values_list(
+        "user_id", flat=True
+    ):
+        backfill(user_id, author_id)
+
+
+def drop(user_id, author_id):
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def rebuild_for_user(user_id):
+    with transaction.atomic():
+        TimelineEntry.objects.filter(user_id=user_id).delete()
+        author_ids = Follow.objects.filter(user_id=user_id).values_list(
+            "author_id", flat=True
+        )
+        for author_id in author_ids:
+            if not is_popular(author_id):
+                backfill(user_id, author_id)
+
+
+class TimelineFeed:
+    """Лента подписок: отсортированные id из материализованной ленты,
+    смешанные с постами популярных авторов, которые читаются напрямую."""
+
+    def __init__(self, user):
+        self.user = user
+
+    @cached_property
+    def popular_author_ids(self):
+        return list(
+            Follow.objects.filter(
+                user=self.user,
+                author__stats__followers_count__gt=(
+                    settings.TIMELINE_FANOUT_LIMIT
+                ),
+            ).values_list("author_id", flat=True)
+        )
+
+    def _entries(self):
+        return (
+            TimelineEntry.objects.filter(user=self.user)
+            .exclude(author_id__in=self.popular_author_ids)
+            .order_by("-pub_date", "-post_id")
+        )
+
+    def _pulled(self):
+        return Post.objects.filter(
+            author_id__in=self.popular_author_ids
+        ).order_by("-pub_date", "-id")
+
+    @property
+    def queryset(self):
+        """Те же посты в виде QuerySet — для курсорной пагинации."""
+        post_ids = TimelineEntry.objects.filter(user=self.user).values(
+            "post_id"
+        )
+        return Post.objects.for_feed().filter(
+            Q(id__in=post_ids) | Q(author_id__in=self.popular_author_ids)
+        )
+
+    def count_up_to(self, limit):
+        """Число постов ленты, но не больше limit. Части ленты считаются
+        отдельно и без сортировки: каждая читает по индексу не больше
+        limit строк."""
+        total = self._entries().order_by()[:limit].count()
+        if self.popular_author_ids and total < limit:
+            total += self._pulled().order_by()[: limit - total].count()
+        return total
+
+    def count(self):
+        total = self._entries().count()
+        if self.popular_author_ids:
+            total += self._pulled().count()
+        return total
+
+    def _post_ids(self, start, stop):
+        if not self.popular_author_ids:
+            entries = self._entries().values_list("post_id", flat=True)
+            return list(entries[start:stop])
+        merged = heapq.merge(
+            self._entries().values_list("pub_date", "post_id")[:stop],
+            self._pulled().values_list("pub_date", "id")[:stop],
+            reverse=True,
+        )
+        return [post_id for _, post_id in islice(merged, start, stop)]
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice):
+            return self[slice(item, item + 1)][0]
+        post_ids = self._post_ids(item.start or 0, item.stop)
+        posts = Post.objects.for_feed().in_bulk(post_ids)
+        return [posts[pk] for pk in post_ids if pk in posts]
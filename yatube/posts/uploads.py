@@ -0,0 +1,101 @@
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+from django.template.defaultfilters import filesizeformat
+from PIL import Image
+
+# Сколько байт начала файла можно держать в памяти, чтобы разобрать
+# заголовок картинки. Заголовок JPEG с EXIF укладывается в 64 КБ.
+HEADER_LIMIT = 256 * 1024
+# Поле формы поста с картинкой; загрузки в другие поля (файлы в админке
+# и других приложениях) обработчик пропускает без проверок.
+IMAGE_FIELD = "image"
+
+
+class RejectedUpload(UploadedFile):
+    """Пустой файл вместо отклонённой загрузки. Причина лежит в
+    upload_error, форма показывает её как ошибку поля."""
+
+    def __init__(self, name, upload_error):
+        super().__init__(BytesIO(), name=name, size=0)
+        self.upload_error = upload_error
+
+
+class ImageUploadHandler(FileUploadHandler):
+    """Проверяет загружаемую картинку по мере поступления данных.
+
+    Размер файла сверяется с POST_IMAGE_MAX_SIZE на каждом куске, формат
+    и размеры картинки — по заголовку, без декодирования пикселей. Как
+    только файл отклонён, следующие обработчики (в памяти или во
+    временном файле) перестают получать его данные. Проверяются только
+    файлы из поля IMAGE_FIELD."""
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.active = self.field_name == IMAGE_FIELD
+        self.header = b""
+        self.checked = False
+        self.upload_error = None
+        if (
+            self.active
+            and self.content_length is not None
+            and self.content_length > settings.POST_IMAGE_MAX_SIZE
+        ):
+            self.reject_too_large()
+
+    def reject_too_large(self):
+        limit = filesizeformat(settings.POST_IMAGE_MAX_SIZE)
+        self.upload_error = f"Файл больше {limit}."
+
+    def receive_data_chunk(self, raw_data, start):
+        if not self.active:
+            return raw_data
+        if self.upload_error:
+            return None
+        if start + len(raw_data) > settings.POST_IMAGE_MAX_SIZE:
+            self.reject_too_large()
+            return None
+        if not self.checked:
+            self.check_header(raw_data)
+            if self.upload_error:
+                return None
+        return raw_data
+
+    def check_header(self, raw_data):
+        # Image.open читает только заголовок; пока его не хватает,
+        # копим начало файла, но не больше HEADER_LIMIT
+        self.header += raw_data
+        try:
+            image = Image.open(BytesIO(self.header))
+        except Image.DecompressionBombError:
+            self.upload_error = self.too_many_pixels_error()
+            return
+        except Exception:
+            if len(self.header) >= HEADER_LIMIT:
+                self.upload_error = "Загрузите картинку."
+            return
+        self.checked = True
+        self.header = b""
+        width, height = image.size
+        if image.format not in settings.POST_IMAGE_FORMATS:
+            formats = ", ".join(settings.POST_IMAGE_FORMATS)
+            self.upload_error = f"Поддерживаются форматы: {formats}."
+        elif width * height > settings.POST_IMAGE_MAX_PIXELS:
+            self.upload_error = self.too_many_pixels_error()
+
+    def too_many_pixels_error(self):
+        return (
+            "Картинка слишком большая: не больше "
+            f"{settings.POST_IMAGE_MAX_PIXELS} пикселей."
+        )
+
+    def file_complete(self, file_size):
+        if not self.active:
+            return None
+        if not self.checked and not self.upload_error:
+            self.upload_error = "Загрузите картинку."
+        if self.upload_error:
+            return RejectedUpload(self.file_name, self.upload_error)
+        return None
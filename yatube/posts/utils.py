@@ -0,0 +1,33 @@
+from django.conf import settings
+
+from . import cache_versions, links
+from .paginators import CursorPaginator, FeedPaginator
+from .timeline import TimelineFeed
+
+
+def get_page_obj(request, post_list, feed=None, counter=None):
+    """Возвращает страницу ленты: курсорную, если в запросе передан
+    ``cursor`` или курсорный режим включён в настройках, иначе обычную.
+    feed — имя версии ленты из posts.cache_versions или список имён,
+    если лента зависит от нескольких версий: под ними кэшируется число
+    постов для обычной навигации, counter — функция, которая возвращает
+    это число по счётчику (см. FeedPaginator)."""
+    cursor = request.GET.get("cursor")
+    if cursor is not None or settings.FEED_PAGINATION == "cursor":
+        if isinstance(post_list, TimelineFeed):
+            post_list = post_list.queryset
+        paginator = CursorPaginator(post_list, settings.CONST_POST_ON_PAGE)
+        page = paginator.get_page(cursor)
+        links.attach_urls(page.object_list)
+        return page
+    count_key = None
+    if feed is not None:
+        names = [feed] if isinstance(feed, str) else feed
+        count_key = f"{names[0]}:{cache_versions.combined_version(*names)}"
+    paginator = FeedPaginator(
+        post_list,
+        settings.CONST_POST_ON_PAGE,
+        count_key=count_key,
+        counter=counter,
+    )
+    return paginator.get_page(request.GET.get("page"))
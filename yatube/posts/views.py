@@ -1,77 +1,193 @@
+from urllib.parse import urlencode
+
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
-from django.views.decorators.cache import cache_page
+from django.utils.functional import SimpleLazyObject
 
+from . import cache_versions, follow_graph, stats
+from .conditional import conditional_page
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
+from .models import AuthorStats, Comment, Follow, Group, Post, User
+from .paginators import CommentPaginator, FeedPaginator
+from .search import SearchResults
+from .serializers import COMMENT_FIELDS, comment_data
+from .timeline import TimelineFeed
+from .utils import get_page_obj
+
+
+def index_versions(request):
+    return [cache_versions.INDEX]
 
 
-@cache_page(settings.SECONDS_TO_CACHE_PAGE)
+@conditional_page(index_versions)
 def index(request):
-    post_list = Post.objects.order_by("-pub_date")
-    paginator = Paginator(post_list, settings.CONST_POST_ON_PAGE)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    post_list = Post.objects.for_feed()
+    page_obj = get_page_obj(
+        request,
+        post_list,
+        cache_versions.INDEX,
+        lambda: stats.feed_posts_count(cache_versions.INDEX, Post.objects),
+    )
     context = {
         "page_obj": page_obj,
+        **cache_versions.feed_context(cache_versions.INDEX),
     }
     return render(request, "posts/index.html", context)
 
 
+def group_versions(request, slug):
+    group_id = (
+        Group.objects.filter(slug=slug).values_list("pk", flat=True).first()
+    )
+    if group_id is None:
+        return None
+    return [cache_versions.group_feed(group_id)]
+
+
+@conditional_page(group_versions)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.order_by("-pub_date")
-    paginator = Paginator(post_list, settings.CONST_POST_ON_PAGE)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    post_list = group.posts.for_feed()
+    feed = cache_versions.group_feed(group.pk)
+    page_obj = get_page_obj(
+        request,
+        post_list,
+        feed,
+        lambda: stats.feed_posts_count(feed, group.posts),
+    )
     context = {
         "group": group,
         "page_obj": page_obj,
+        **cache_versions.feed_context(cache_versions.group_feed(group.pk)),
     }
     return render(request, "posts/group_list.html", context)
 
 
+def profile_versions(request, username):
+    author_id = (
+        User.objects.filter(username=username)
+        .values_list("pk", flat=True)
+        .first()
+    )
+    if author_id is None:
+        return None
+    names = [cache_versions.author_feed(author_id)]
+    if request.user.is_authenticated:
+        # кнопка подписки зависит от подписок читателя
+        names.append(cache_versions.follow_feed(request.user.pk))
+    return names
+
+
+@conditional_page(profile_versions)
 def profile(request, username):
     author = get_object_or_404(User, username=username)
-    post_list = author.posts.order_by("-pub_date")
-    post_count = post_list.count()
-    paginator = Paginator(post_list, settings.CONST_POST_ON_PAGE)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    post_list = author.posts.for_feed()
+    post_count = AuthorStats.for_user(author).posts_count
+    page_obj = get_page_obj(
+        request,
+        post_list,
+        cache_versions.author_feed(author.pk),
+        lambda: post_count,
+    )
     context = {
         "author": author,
         "post_count": post_count,
         "page_obj": page_obj,
+        **cache_versions.feed_context(cache_versions.author_feed(author.pk)),
     }
-    following = (
-        request.user.is_authenticated
-        and Follow.objects.filter(user=request.user, author=author).exists()
-    )
+    following = follow_graph.is_following(request.user.pk, author.pk)
     context["following"] = following
     show_subscribe = request.user != author
     context["show_subscribe"] = show_subscribe
     return render(request, "posts/profile.html", context)
 
 
+def post_detail_versions(request, post_id):
+    author_id = (
+        Post.objects.filter(pk=post_id)
+        .values_list("author_id", flat=True)
+        .first()
+    )
+    if author_id is None:
+        return None
+    # на странице поста выводится число постов автора
+    return [
+        cache_versions.post_page(post_id),
+        cache_versions.author_feed(author_id),
+    ]
+
+
+def comments_for_post(post_id):
+    """Комментарии поста от новых к старым, авторы — тем же запросом."""
+    return (
+        Comment.objects.filter(post_id=post_id)
+        .select_related("author")
+        .only(*COMMENT_FIELDS)
+        .order_by("-created", "-id")
+    )
+
+
+def get_comments_page(post_id, cursor):
+    paginator = CommentPaginator(
+        comments_for_post(post_id), settings.COMMENTS_ON_PAGE
+    )
+    return paginator.get_page(cursor)
+
+
+@conditional_page(post_detail_versions)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
-    post_count = post.author.posts.count()
-    comments = post.comments.order_by("-created")
+    post = get_object_or_404(
+        Post.objects.select_related("author", "group"), id=post_id
+    )
+    post_count = AuthorStats.for_user(post.author).posts_count
+    cursor = request.GET.get("comments")
+    # комментарии читаются, только если их фрагмент не нашёлся в кэше
+    comments_page = SimpleLazyObject(
+        lambda: get_comments_page(post.pk, cursor)
+    )
     title = post.text[:30]
     form = CommentForm()
     context = {
         "post": post,
+        "post_id": post.pk,
         "post_count": post_count,
         "title": title,
         "form": form,
-        "comments": comments,
+        "comments_page": comments_page,
+        "comments_cursor": cursor,
+        "comments_version": cache_versions.version(
+            cache_versions.post_page(post.pk)
+        ),
     }
     return render(request, "posts/post_detail.html", context)
 
 
+def post_comments_versions(request, post_id):
+    return [cache_versions.post_page(post_id)]
+
+
+@conditional_page(post_comments_versions)
+def post_comments(request, post_id):
+    """Следующая страница комментариев для кнопки «Показать ещё»:
+    фрагмент HTML или JSON при ?format=json."""
+    get_object_or_404(Post.objects.only("pk"), pk=post_id)
+    comments_page = get_comments_page(post_id, request.GET.get("cursor"))
+    if request.GET.get("format") == "json":
+        return JsonResponse(
+            {
+                "comments": [
+                    comment_data(comment) for comment in comments_page
+                ],
+                "next_cursor": comments_page.next_cursor,
+            }
+        )
+    context = {"post_id": post_id, "comments_page": comments_page}
+    return render(request, "posts/includes/comments.html", context)
+
+
 @login_required
 def post_create(request):
     template = "posts/create_post.html"
@@ -153,15 +269,30 @@ def add_comment(request, post_id):
     return redirect("posts:post_detail", post_id=post_id)
 
 
+def follow_versions(request):
+    """Лента подписок меняется при подписке и отписке читателя и вместе
+    с лентами авторов, на которых он подписан: новый пост меняет версию
+    только своего автора, а не лент всех его подписчиков."""
+    user_id = request.user.pk
+    return [
+        cache_versions.follow_feed(user_id),
+        *map(cache_versions.author_feed, follow_graph.followee_ids(user_id)),
+    ]
+
+
 @login_required
+@conditional_page(follow_versions)
 def follow_index(request):
-    authors = request.user.follower.all().values("author")
-    post_list = Post.objects.filter(author__in=authors).order_by("-pub_date")
-    paginator = Paginator(post_list, settings.CONST_POST_ON_PAGE)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    feed = follow_versions(request)
+    page_obj = get_page_obj(
+        request,
+        TimelineFeed(request.user),
+        feed,
+        lambda: stats.followed_posts_count(request.user.pk),
+    )
     context = {
         "page_obj": page_obj,
+        **cache_versions.feed_context(*feed),
     }
     return render(request, "posts/follow.html", context)
 
@@ -169,19 +300,27 @@ def follow_index(request):
 @login_required
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
-    following = Follow.objects.filter(
-        user=request.user, author=author
-    ).exists()
-    if request.user != author and not following:
-        Follow.objects.create(
-            user=request.user,
-            author=author,
-        )
+    if request.user != author:
+        follow_graph.follow(request.user, author)
     return redirect("posts:profile", username)
 
 
 @login_required
 def profile_unfollow(request, username):
-    follow = get_object_or_404(Follow, author__username=username)
+    follow = get_object_or_404(
+        Follow, user=request.user, author__username=username
+    )
     follow.delete()
     return redirect("posts:profile", username)
+
+
+def search_posts(request):
+    query = request.GET.get("q", "").strip()
+    results = SearchResults(query)
+    paginator = FeedPaginator(results, settings.CONST_POST_ON_PAGE)
+    context = {
+        "query": query,
+        "page_obj": paginator.get_page(request.GET.get("page")),
+        "page_prefix": urlencode({"q": query}) + "&",
+    }
+    return render(request, "posts/search.html", context)
@@ -29,6 +29,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "core.middleware.MetricsMiddleware",
+    "core.middleware.SlowQueryMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -41,18 +43,40 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = "yatube.urls"
 
+# Шаблоны разбираются один раз на процесс (cached.Loader). Без кэша
+# правки шаблонов видны без перезапуска сервера — так удобнее при
+# разработке, поэтому по умолчанию кэш выключен только при DEBUG.
+TEMPLATE_CACHE = (
+    os.environ.get("YATUBE_TEMPLATE_CACHE", "0" if DEBUG else "1") == "1"
+)
+# загрузчики Django, которые собирают шаблоны с замером времени для
+# TEMPLATE_PROFILING (core.template_loaders)
+TEMPLATE_LOADERS = [
+    "core.template_loaders.FilesystemLoader",
+    "core.template_loaders.AppDirectoriesLoader",
+]
+if TEMPLATE_CACHE:
+    TEMPLATE_LOADERS = [
+        ("core.template_loaders.CachedLoader", TEMPLATE_LOADERS)
+    ]
+
+# debug_toolbar ищет свои шаблоны через APP_DIRS, но app_directories
+# уже есть в TEMPLATE_LOADERS, а вместе с loaders APP_DIRS задать нельзя.
+SILENCED_SYSTEM_CHECKS = ["debug_toolbar.W006"]
+
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        "BACKEND": "core.template_backends.TimedDjangoTemplates",
         "DIRS": [os.path.join(BASE_DIR, "templates")],
-        "APP_DIRS": True,
         "OPTIONS": {
+            "loaders": TEMPLATE_LOADERS,
             "context_processors": [
                 "django.template.context_processors.debug",
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
                 "core.context_processors.year.year",
+                "core.context_processors.cache.ttl",
             ]
         },
     }
@@ -85,9 +109,37 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Бэкенд кэша выбирается переменной окружения YATUBE_CACHE:
+# locmem — свой кэш у каждого процесса (по умолчанию);
+# file, sqlite — общий кэш для всех воркеров на одном сервере;
+# redis — общий кэш на нескольких серверах.
+CACHE_BACKENDS = {
+    "locmem": ("core.cache_backends.stats.LocMemCache", "yatube"),
+    "file": (
+        "core.cache_backends.stats.FileBasedCache",
+        os.path.join(BASE_DIR, "cache"),
+    ),
+    "sqlite": (
+        "core.cache_backends.sqlite.SQLiteCache",
+        os.path.join(BASE_DIR, "cache.sqlite3"),
+    ),
+    "redis": (
+        "core.cache_backends.redis.RedisCache",
+        "redis://127.0.0.1:6379/0",
+    ),
+}
+CACHE_BACKEND, CACHE_LOCATION = CACHE_BACKENDS[
+    os.environ.get("YATUBE_CACHE", "locmem")
+]
+
 CACHES = {
     "default": {
-        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "BACKEND": CACHE_BACKEND,
+        "LOCATION": os.environ.get("YATUBE_CACHE_LOCATION", CACHE_LOCATION),
+        "KEY_PREFIX": os.environ.get("YATUBE_CACHE_NAMESPACE", "yatube"),
+        "OPTIONS": {
+            "MAX_ENTRIES": 100000,
+        },
     }
 }
 
@@ -95,6 +147,33 @@ INTERNAL_IPS = [
     "127.0.0.1",
 ]
 
+# Доля запросов, по которым собираются метрики (core.metrics): 1 — все,
+# 0 — ни одного.
+METRICS_SAMPLE_RATE = float(os.environ.get("YATUBE_METRICS_SAMPLE_RATE", 1))
+# Заголовок Server-Timing раскрывает клиенту устройство страницы, поэтому
+# по умолчанию он есть только при отладке.
+METRICS_SERVER_TIMING = DEBUG
+# /metrics/ отвечает только на запросы с заголовком
+# «Authorization: Bearer <токен>» (bearer_token в scrape_config
+# Prometheus). Без токена адрес закрыт: за прокси REMOTE_ADDR у всех
+# запросов один, и проверка по IP пропустила бы любого.
+METRICS_TOKEN = os.environ.get("YATUBE_METRICS_TOKEN") or None
+# Время отрисовки по каждому шаблону и include в метриках и, при
+# METRICS_SERVER_TIMING, в Server-Timing — TEMPLATE_PROFILING_TOP самых
+# затратных шаблонов запроса.
+TEMPLATE_PROFILING = os.environ.get("YATUBE_TEMPLATE_PROFILING") == "1"
+TEMPLATE_PROFILING_TOP = 10
+# SQL-запросы дольше порога пишутся предупреждением в логгер
+# core.slow_queries. По умолчанию выключено: порог задаёт
+# YATUBE_SLOW_QUERY_THRESHOLD_MS. Если задан и
+# YATUBE_SLOW_QUERY_LOG_FILE, запросы с планами ещё и копятся в этом
+# файле — сводку по нему выводит команда slow_queries.
+SLOW_QUERY_THRESHOLD_MS = os.environ.get("YATUBE_SLOW_QUERY_THRESHOLD_MS")
+SLOW_QUERY_THRESHOLD_MS = (
+    float(SLOW_QUERY_THRESHOLD_MS) if SLOW_QUERY_THRESHOLD_MS else None
+)
+SLOW_QUERY_LOG_FILE = os.environ.get("YATUBE_SLOW_QUERY_LOG_FILE") or None
+
 
 CSRF_FAILURE_VIEW = "core.views.csrf_failure"
 
@@ -127,5 +206,51 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
+# Загрузки больше этого размера пишутся во временный файл по кускам,
+# а не собираются в памяти. ImageUploadHandler проверяет только поле
+# картинки поста (posts.uploads.IMAGE_FIELD) и пропускает остальные
+# файлы: обработчик ставится здесь, а не в представлениях, потому что
+# CsrfViewMiddleware разбирает тело запроса раньше них.
+FILE_UPLOAD_MAX_MEMORY_SIZE = 256 * 1024
+FILE_UPLOAD_HANDLERS = [
+    "posts.uploads.ImageUploadHandler",
+    "django.core.files.uploadhandler.MemoryFileUploadHandler",
+    "django.core.files.uploadhandler.TemporaryFileUploadHandler",
+]
+# Ограничения для картинок постов: проверяются во время загрузки,
+# формат и размеры — по заголовку файла.
+POST_IMAGE_MAX_SIZE = 10 * 1024 * 1024
+POST_IMAGE_MAX_PIXELS = 40_000_000
+POST_IMAGE_FORMATS = ("JPEG", "PNG", "GIF", "WEBP")
+# Картинка без постов удаляется, только если к ней не обращались столько
+# секунд: повторная загрузка того же файла могла ещё не сохранить пост.
+MEDIA_GC_GRACE_SECONDS = 60 * 60
+
 CONST_POST_ON_PAGE = 10
-SECONDS_TO_CACHE_PAGE = 20
+# Ссылки на страницы ленты: столько с каждой стороны от текущей и столько
+# первых и последних, остальные заменяются многоточием.
+PAGINATION_ON_EACH_SIDE = 2
+PAGINATION_ON_ENDS = 1
+# Посты ленты считаются точно, но не дальше этого числа; число постов
+# более длинной ленты берётся из счётчиков (posts.stats).
+FEED_EXACT_COUNT_LIMIT = 1000
+# Комментарии на странице поста подгружаются порциями по столько штук.
+COMMENTS_ON_PAGE = 20
+# Наибольшая страница лент API (?limit=), по умолчанию — CONST_POST_ON_PAGE.
+API_MAX_PAGE_SIZE = 100
+# Карточки постов кэшируются по id и дате изменения поста, страницы лент —
+# по версиям, которые меняются сигналами (posts.cache_versions), поэтому
+# время жизни может быть большим.
+SECONDS_TO_CACHE_POST_CARD = 60 * 60 * 24
+SECONDS_TO_CACHE_FEED = 60 * 60 * 24
+# "offset" — постраничная навигация с номерами страниц,
+# "cursor" — keyset-навигация по (pub_date, id) без COUNT(*) и OFFSET.
+FEED_PAGINATION = "offset"
+# Посты авторов, у которых подписчиков больше порога, не раскладываются
+# по лентам подписчиков при публикации, а подмешиваются при чтении.
+TIMELINE_FANOUT_LIMIT = 1000
+# Фоновые потоки, в которых создаются миниатюры загруженных картинок:
+# ни загрузка, ни показ поста их не ждут, до готовности показывается
+# заглушка. 0 — создавать сразу после коммита в потоке запроса: так
+# миниатюры появляются предсказуемо, этим пользуются тесты.
+THUMBNAIL_WORKERS = int(os.environ.get("YATUBE_THUMBNAIL_WORKERS", 2))
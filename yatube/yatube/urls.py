@@ -3,12 +3,16 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
+from core.views import metrics
+
 urlpatterns = [
     path("", include("posts.urls", namespace="posts")),
     path("admin/", admin.site.urls),
     path("auth/", include("users.urls", namespace="users")),
     path("auth/", include("django.contrib.auth.urls")),
     path("about/", include("about.urls", namespace="about")),
+    path("api/v1/", include("posts.api_urls", namespace="api")),
+    path("metrics/", metrics, name="metrics"),
 ]
 
 handler404 = "core.views.page_not_found"